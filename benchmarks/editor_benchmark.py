@@ -0,0 +1,339 @@
+# ShiCheng_Writer/benchmarks/editor_benchmark.py
+"""
+编辑器性能基准（无界面运行）
+
+在 QT_QPA_PLATFORM=offscreen 下驱动 Editor / MainWindow，按「正文长度 × 素材数量 × 场景」
+逐项测量耗时与峰值内存。全文重新高亮分片进行，耗时计到各片全部完成，另列出最长的单片（界面最长阻塞）。每一项在独立子进程中运行，峰值内存互不干扰、结果可复现。
+
+用法（在项目根目录）：
+    python benchmarks/editor_benchmark.py
+    python benchmarks/editor_benchmark.py --sizes 10000,100000 --materials 10,500 --scenarios load,typing
+    python benchmarks/editor_benchmark.py --output bench.json
+
+场景：
+    load         分块载入整章正文（直到 load_finished）
+    typing       在正文中部逐键输入 200 个字符
+    enter        在段落末尾连续回车 50 次（含自动缩进）
+    paste        粘贴 20,000 字符
+    replace_all  编辑器内全部替换
+    auto_indent  全文取消缩进 + 全文缩进（正文中部含一个带软换行的段落，往返后须与原文一致）
+    rehighlight  更换素材列表后全文重新高亮（分片进行，直到全部完成）
+    window_open  通过 MainWindow 打开章节（临时数据库，含后台读取与分块渲染）
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_MATERIALS = [10, 500, 5_000]
+SCENARIOS = ['load', 'typing', 'enter', 'paste', 'replace_all', 'auto_indent', 'rehighlight', 'window_open']
+
+TYPING_TEXT = "他推开门，看见窗外的雨还没有停。" * 13 # 约 200 字符
+ENTER_PRESSES = 50
+PASTE_CHARS = 20_000
+REPLACE_TARGET = "旧城"
+REPLACE_WITH = "新城"
+# 段内软换行（Shift+Enter 插入 U+2028），取消缩进与缩进都要按文本块逐段对应
+SOFT_BREAK_PARAGRAPH = "　　软换行之前\u2028　　软换行之后"
+
+_FILLER = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状育厂京识适属圆包火住调满县局照参红细引听该铁价严"
+
+
+def _peak_memory_mb():
+    """进程峰值内存（MB），平台不支持时返回 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+    return None
+
+
+def material_names(count):
+    # 使用拉丁字母名称：高亮规则以 \b 界定词边界，中文名紧挨汉字时不会命中，无法体现高亮开销
+    return [f"Name{i:05d}" for i in range(count)]
+
+
+def make_chapter(size, names, seed=42):
+    """生成约 size 字符的合成章节：带首行缩进的段落，随机穿插素材名与替换目标词"""
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < size:
+        parts = []
+        for _ in range(rng.randint(3, 8)):
+            start = rng.randrange(len(_FILLER) - 40)
+            parts.append(_FILLER[start:start + rng.randint(10, 40)])
+            roll = rng.random()
+            if roll < 0.3 and names:
+                parts.append(f" {rng.choice(names)} ")
+            elif roll < 0.35:
+                parts.append(REPLACE_TARGET)
+        paragraph = "　　" + "，".join(parts) + "。"
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 1
+    return "\n".join(paragraphs)[:size]
+
+
+def _pump(app, until=None, timeout=600.0):
+    """处理事件直到 until() 为真（未给出时只处理一轮）"""
+    deadline = time.perf_counter() + timeout
+    app.processEvents()
+    while until is not None and not until():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("等待事件超时")
+        app.processEvents()
+
+
+def _new_editor(app, names, text):
+    from widgets.editor import Editor
+    editor = Editor()
+    editor.resize(1000, 800)
+    editor.show()
+    editor.update_highlighter({name: index + 1 for index, name in enumerate(names)})
+    done = []
+    editor.load_finished.connect(lambda: done.append(True))
+    editor.load_text_progressively(text)
+    _pump(app, lambda: done)
+    _wait_highlighted(app, editor)
+    return editor
+
+
+def _wait_highlighted(app, editor):
+    """等待分片进行的全文重新高亮完成"""
+    _pump(app, lambda: not editor.highlighter.is_rehighlighting)
+
+
+def _move_to_paragraph_end(editor, position):
+    from PySide6.QtGui import QTextCursor
+    cursor = editor.textCursor()
+    cursor.setPosition(min(position, editor.document().characterCount() - 1))
+    cursor.movePosition(QTextCursor.EndOfBlock)
+    editor.setTextCursor(cursor)
+    editor.ensureCursorVisible()
+
+
+def _type_char(editor, char):
+    """模拟输入单个字符（QTest.keyClicks 只支持 ASCII，中文需直接构造按键事件）"""
+    from PySide6.QtGui import QKeyEvent
+    from PySide6.QtCore import QEvent, Qt
+    from PySide6.QtWidgets import QApplication
+    QApplication.sendEvent(editor, QKeyEvent(QEvent.KeyPress, Qt.Key_unknown, Qt.NoModifier, char))
+    QApplication.sendEvent(editor, QKeyEvent(QEvent.KeyRelease, Qt.Key_unknown, Qt.NoModifier, char))
+
+
+def run_scenario(scenario, size, material_count):
+    """在当前进程中执行单个场景，返回结果字典"""
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtTest import QTest
+    from PySide6.QtCore import Qt
+    from modules.perf_monitor import perf_monitor
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    names = material_names(material_count)
+    text = make_chapter(size, names)
+    perf_monitor.set_enabled(True)
+    result = {}
+
+    if scenario == 'window_open':
+        result.update(_run_window_open(app, text, names))
+    else:
+        if scenario == 'load':
+            started = time.perf_counter()
+            editor = _new_editor(app, names, text)
+            result['wall_ms'] = (time.perf_counter() - started) * 1000
+        else:
+            editor = _new_editor(app, names, text)
+            if scenario == 'auto_indent':
+                _move_to_paragraph_end(editor, len(text) // 2)
+                editor.textCursor().insertText("\n" + SOFT_BREAK_PARAGRAPH)
+                original = editor.document().toRawText()
+            perf_monitor.reset()
+            editor.setFocus()
+            started = time.perf_counter()
+            if scenario == 'typing':
+                _move_to_paragraph_end(editor, len(text) // 2)
+                for char in TYPING_TEXT:
+                    _type_char(editor, char)
+                    _pump(app)
+            elif scenario == 'enter':
+                _move_to_paragraph_end(editor, len(text) // 2)
+                for _ in range(ENTER_PRESSES):
+                    QTest.keyClick(editor, Qt.Key_Return)
+                    _pump(app)
+            elif scenario == 'paste':
+                _move_to_paragraph_end(editor, len(text) // 2)
+                QApplication.clipboard().setText(make_chapter(PASTE_CHARS, names, seed=7))
+                QTest.keyClick(editor, Qt.Key_V, Qt.ControlModifier)
+                _pump(app)
+            elif scenario == 'replace_all':
+                result['replaced'] = editor.replace_all(REPLACE_TARGET, REPLACE_WITH)
+                _pump(app)
+            elif scenario == 'auto_indent':
+                editor.auto_unindent_document()
+                _pump(app)
+                result['unindent_ms'] = (time.perf_counter() - started) * 1000
+                editor.auto_indent_document()
+                _pump(app)
+                _wait_highlighted(app, editor)
+                if editor.document().toRawText() != original:
+                    result['error'] = "取消缩进后再缩进，正文与原文不一致"
+            elif scenario == 'rehighlight':
+                # 去掉一半素材：全部段落都要重新匹配、重排
+                editor.update_highlighter({name: index + 1 for index, name in enumerate(names[::2])})
+                result['first_slice_ms'] = (time.perf_counter() - started) * 1000
+                _wait_highlighted(app, editor)
+            else:
+                raise ValueError(f"未知场景: {scenario}")
+            result['wall_ms'] = (time.perf_counter() - started) * 1000
+
+    result['perf'] = perf_monitor.summary()
+    return result
+
+
+def _run_window_open(app, text, names):
+    import modules.database as database
+    import modules.backup as backup
+
+    workdir = tempfile.mkdtemp(prefix="shicheng_bench_")
+    database.DB_FILE = os.path.join(workdir, "bench.db")
+    database.initialize_database()
+
+    from main_window import MainWindow
+    data_manager = database.DataManager()
+    book_id = data_manager.add_book("基准测试", group="基准")
+    chapter_id = data_manager.add_chapter(book_id, "第一卷", "基准章节")
+    data_manager.update_chapter_content(chapter_id, text)
+    for name in names:
+        data_manager.add_material(name, "文本", "", book_id, {"value": name})
+
+    backup_manager = backup.BackupManager(data_manager, base_backup_dir=os.path.join(workdir, "backups"))
+    window = MainWindow(data_manager, backup_manager, 'light')
+    window.show()
+    _pump(app)
+    window.current_book_id = book_id
+    # 章节列表在后台读取，建好章节树后才能选中章节
+    outline_loaded = []
+    window.load_chapters_for_book(book_id, then=lambda: outline_loaded.append(True))
+    window.refresh_editor_highlighter()
+    _pump(app, lambda: outline_loaded)
+
+    done = []
+    window.editor.load_finished.connect(lambda: done.append(True))
+    started = time.perf_counter()
+    window.find_and_select_chapter(chapter_id, force_select=True)
+    _pump(app, lambda: done)
+    return {'wall_ms': (time.perf_counter() - started) * 1000}
+
+
+def _run_child(scenario, size, material_count, timeout):
+    """在子进程中执行单个场景，保证峰值内存互不影响"""
+    command = [sys.executable, os.path.abspath(__file__), '--child', scenario, str(size), str(material_count)]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'error': f"超时（>{timeout}s）"}
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    error = completed.stderr.strip().splitlines()
+    return {'error': error[-1] if error else f"退出码 {completed.returncode}"}
+
+
+def _format_row(scenario, size, material_count, result):
+    if 'error' in result:
+        return f"{scenario:<12}{size:>10}{material_count:>8}  错误: {result['error']}"
+    peak = result.get('peak_memory_mb')
+    peak_text = f"{peak:.0f}" if peak is not None else "-"
+    latency = result.get('perf', {}).get('keypress_to_paint')
+    latency_text = f"{latency['p50']:.1f}/{latency['p95']:.1f}/{latency['p99']:.1f}" if latency else "-"
+    rehighlight = result.get('perf', {}).get('rehighlight')
+    slice_text = f"{rehighlight['max']:.1f}" if rehighlight else "-"
+    return (f"{scenario:<12}{size:>10}{material_count:>8}{result['wall_ms']:>12.1f}{peak_text:>10}"
+            f"{slice_text:>18}  {latency_text}")
+
+
+def _parse_list(value, cast=int):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="诗成写作编辑器性能基准（offscreen）")
+    parser.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)), help="正文字符数列表，逗号分隔")
+    parser.add_argument('--materials', default=",".join(map(str, DEFAULT_MATERIALS)), help="素材数量列表，逗号分隔")
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS), help="场景列表，逗号分隔")
+    parser.add_argument('--timeout', type=float, default=900, help="单个场景的超时时间（秒）")
+    parser.add_argument('--output', help="将完整结果写入 JSON 文件")
+    parser.add_argument('--child', nargs=3, metavar=('SCENARIO', 'SIZE', 'MATERIALS'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        scenario, size, material_count = args.child[0], int(args.child[1]), int(args.child[2])
+        result = run_scenario(scenario, size, material_count)
+        result['peak_memory_mb'] = _peak_memory_mb()
+        sys.stdout.flush()
+        print(json.dumps(result, ensure_ascii=False))
+        sys.stdout.flush()
+        # 跳过 Qt 对象的析构，避免关闭阶段的耗时与噪音
+        os._exit(0)
+
+    scenarios = _parse_list(args.scenarios, str)
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}")
+
+    from PySide6 import __version__ as pyside_version
+    report = {
+        'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'pyside6': pyside_version,
+        'platform': platform.platform(),
+        'results': [],
+    }
+    print(f"{'场景':<10}{'字符数':>8}{'素材数':>6}{'耗时(ms)':>10}{'峰值(MB)':>8}{'高亮最长单片(ms)':>12}  按键到重绘 p50/p95/p99 (ms)")
+    for size in _parse_list(args.sizes):
+        for material_count in _parse_list(args.materials):
+            for scenario in scenarios:
+                result = _run_child(scenario, size, material_count, args.timeout)
+                print(_format_row(scenario, size, material_count, result), flush=True)
+                report['results'].append({'scenario': scenario, 'size': size, 'materials': material_count, **result})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    return 0 if all('error' not in item for item in report['results']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,16 @@
 # ShiCheng_Writer/main.py
+import time
+# 启动计时的起点，早于其他一切导入
+_PROCESS_STARTED = time.perf_counter()
 import sys
 import os
 import logging
+import multiprocessing
+from modules.startup_timing import startup_timeline
+startup_timeline.start(_PROCESS_STARTED)
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import QCoreApplication, Qt
+from PySide6.QtCore import QCoreApplication, Qt, QObject, QEvent, QTimer
+startup_timeline.mark("Qt 导入")
 
 # 导入模块
 from modules.database import initialize_database, DataManager
@@ -11,9 +18,26 @@ from modules.backup import BackupManager
 from modules.theme_manager import set_stylesheet
 from modules.utils import resource_path, get_app_root
 
+
+class FirstPaintProbe(QObject):
+    """窗口第一次绘制完成后调用 callback（只触发一次）"""
+    def __init__(self, window, callback):
+        super().__init__(window)
+        self.callback = callback
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        # 顶层窗口收到 UpdateRequest 时绘制整个窗口，处理完后即已完成首次绘制
+        if event.type() == QEvent.UpdateRequest:
+            obj.removeEventFilter(self)
+            QTimer.singleShot(0, self.callback)
+        return False
+
+
 def main():
     # 将 MainWindow 的导入移至函数内部，确保所有依赖都已加载
     from main_window import MainWindow
+    startup_timeline.mark("模块导入")
 
     # 配置日志系统
     log_dir = os.path.join(get_app_root(), "logs")
@@ -50,6 +74,7 @@ def main():
 
     # 显式传入 base_backup_dir
     backup_manager = BackupManager(data_manager, base_backup_dir=backup_dir)
+    startup_timeline.mark("数据库初始化")
 
     # 4. 启动Qt应用
     app = QApplication(sys.argv)
@@ -61,12 +86,15 @@ def main():
     else:
         # 检测系统主题并加载初始样式
         initial_theme = 'dark' if app.styleHints().colorScheme() == Qt.ColorScheme.Dark else 'light'
-    
-    # 加载样式表
-    set_stylesheet(initial_theme)
 
     # 将 backup_manager 和初始主题传递给主窗口
     window = MainWindow(data_manager, backup_manager, initial_theme)
+    startup_timeline.mark("窗口构建")
+
+    # 样式表在窗口构建完成后再加载：构建过程中每把一批部件放入布局，整棵子树都要按样式表重新计算一遍；
+    # 最后加载只需为每个部件计算一次
+    set_stylesheet(initial_theme)
+    startup_timeline.mark("样式表")
 
     # 监听系统颜色方案的变化 (自动切换)
     def on_color_scheme_changed(scheme):
@@ -79,6 +107,7 @@ def main():
 
     app.styleHints().colorSchemeChanged.connect(on_color_scheme_changed)
 
+    FirstPaintProbe(window, lambda: startup_timeline.finish("首次绘制"))
     window.show()
 
     rc = app.exec()
@@ -86,4 +115,6 @@ def main():
     sys.exit(rc)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    # 批量导出使用子进程，打包为可执行文件后子进程需要由此进入
+    multiprocessing.freeze_support()
+    main()
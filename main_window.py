@@ -1,32 +1,52 @@
 # ShiCheng_Writer/main_window.py
 import sys
-import os
+import logging
 import shutil
 import tempfile
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                                QListWidget, QListWidgetItem, QSplitter, QDockWidget,
-                               QTreeView, QMessageBox, QInputDialog, QFileDialog,
+                               QTreeView, QMessageBox, QInputDialog,
                                QToolBar, QLabel, QMenu, QPushButton, QStatusBar, QToolButton,
                                QDialog, QDialogButtonBox, QApplication, QFormLayout, QLineEdit,
-                               QTextEdit, QMenuBar, QTabWidget, QFrame, QComboBox, QCheckBox,
-                               QTreeWidget, QTreeWidgetItem, QHeaderView, QStackedWidget, QSizePolicy)
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QAction, QKeySequence, QFont, QIcon
+                               QTextEdit, QMenuBar, QFrame, QComboBox, QCheckBox,
+                               QTreeWidget, QTreeWidgetItem, QHeaderView, QStackedWidget, QSizePolicy,
+                               QTabBar)
+from PySide6.QtGui import QAction, QKeySequence, QFont, QIcon
 # 引入 QThread 和 Signal 用于异步备份
-from PySide6.QtCore import Qt, QSize, QTimer, QThread, Signal, QSortFilterProxyModel
+from PySide6.QtCore import Qt, QSize, QTimer, QThread, Signal
 
 from modules.theme_manager import set_stylesheet
-from modules.database import DataManager
+from modules.database import DataManager, DB_FILE
 from widgets.editor import Editor
 # [新增] 导入分离出去的书籍详情页
 from widgets.book_info_page import BookInfoPage
-from modules.material_system import MaterialPanel
+from widgets.chapter_tree import ChapterTreeView
+from widgets.tree_models import BookTreeModel, ChapterTreeModel, LazyFetcher, VOLUME_ID_ROLE, BATCH_SIZE
+from widgets.lazy_tabs import LazyTabWidget
+from modules.material_system import MaterialPanel, MaterialCardCache
 from modules.inspiration import InspirationPanel
 from modules.timeline_system import TimelinePanel
 from modules.utils import resource_path
 from modules.backup import BackupManager
+from modules.chapter_loader import ChapterLoadWorker
+from modules.autosave import AutosaveScheduler
+from modules.write_queue import WriteQueue, FutureBridge
+from modules.async_data import AsyncDataManager
+from modules.book_context import BookContextLoader
+from modules.change_bus import ChangeBus
+from modules.document_cache import DocumentCache
+from modules.content_cache import ChapterContentCache, chapter_content_cache
+from modules.perf_monitor import perf_monitor
+from modules.edit_journal import EditJournal, journal_path, read_journal, replay_entry
 # [Removed WebDAVSettingsDialog import]
 from widgets.dialogs import (BackupDialog, ManageGroupsDialog, 
-                             EditBookDialog, RecycleBinDialog, SearchReplaceDialog)
+                             EditBookDialog, RecycleBinDialog, SearchReplaceDialog,
+                             GlobalSearchDialog, PerfDiagnosticsDialog, ExportDialog,
+                             BatchExportDialog)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BACKUP_DELAY_MS = 5000
 
 class MainWindow(QMainWindow):
     def __init__(self, data_manager, backup_manager, initial_theme):
@@ -35,7 +55,6 @@ class MainWindow(QMainWindow):
         self.backup_manager = backup_manager
         self.current_book_id = None
         self.current_chapter_id = None
-        self.is_text_changed = False
         self.current_theme = initial_theme
         self.left_panel_visible = True
         self.right_panel_visible = True
@@ -67,6 +86,45 @@ class MainWindow(QMainWindow):
         self.wordcount_timer.setInterval(300)  # 300毫秒延迟
         self.wordcount_timer.timeout.connect(self._update_word_count_deferred)
 
+        # 章节异步加载：请求序号用于丢弃过期结果
+        self._chapter_load_request = 0
+        self._chapter_load_workers = set()
+
+        # 章节文档缓存：切换章节时复用已排版的文档，容量（字符数）可通过偏好设置 document_cache_chars 调整
+        try:
+            cache_chars = int(self.data_manager.get_preference('document_cache_chars', DocumentCache.DEFAULT_MAX_CHARS))
+        except ValueError:
+            cache_chars = DocumentCache.DEFAULT_MAX_CHARS
+        self.document_cache = DocumentCache(cache_chars, self)
+        # 正文缓存（数据库层，所有连接共享）：重复打开、导出、备份时少读数据库，容量（字节）见偏好设置 chapter_cache_bytes
+        try:
+            chapter_content_cache.set_max_bytes(int(self.data_manager.get_preference(
+                'chapter_cache_bytes', ChapterContentCache.DEFAULT_MAX_BYTES)))
+        except ValueError:
+            pass
+        self.material_name_index = {}
+
+        # 编辑日志：未保存的修改先以增量写入日志文件，异常退出后可在下次启动时恢复
+        self.edit_journal = EditJournal(journal_path(DB_FILE))
+
+        # 后台写队列：保存正文、偏好设置等写操作不在界面线程等待落盘，完成后经 future_bridge 回到界面线程
+        self.write_queue = WriteQueue()
+        self.future_bridge = FutureBridge(self)
+        # 后台查询：书籍、章节列表等在线程池中读取，界面先显示占位项
+        self.async_data = AsyncDataManager(self.write_queue, parent=self)
+        self._chapter_list_book_id = None # 章节树当前显示的书籍
+        # 切换书籍：一次读取书籍信息、目录、素材与时间轴，按书缓存并预取相邻的书
+        self.book_context = BookContextLoader(self.async_data, parent=self)
+        self._outline_generation = 0 # 每次单独重新载入目录时递增，较早发出的整书读取不再覆盖目录
+        # 数据变更总线：写操作提交后逐行更新书籍树、章节树和右侧面板，不再整体重建
+        self.change_bus = ChangeBus(self)
+        self.change_bus.changed.connect(self.on_data_changed)
+        self._select_chapter_on_insert = None # 新建章节插入章节树后自动打开
+
+        # 性能采样为可选项，开关保存在偏好设置中
+        if self.data_manager.get_preference('perf_monitor_enabled') == '1':
+            perf_monitor.set_enabled(True)
+
         self.setup_ui()
         self.setup_actions()
         self.setup_menu_bar()
@@ -76,7 +134,9 @@ class MainWindow(QMainWindow):
         # [优化] 使用懒加载，提升软件启动速度感
         # 将耗时操作放入事件循环的下一次执行
         QTimer.singleShot(0, self.load_books)
-        QTimer.singleShot(100, self.run_archive_backup)
+        QTimer.singleShot(0, self.recover_unsaved_edits)
+        # 日终归档在启动完成后再检查，不与首次绘制、载入书籍争用磁盘；是否已有今天的归档由备份线程判断
+        QTimer.singleShot(ARCHIVE_BACKUP_DELAY_MS, self.run_archive_backup)
         
         self.setup_snapshot_timer()
         self.setup_stage_point_timer()
@@ -85,6 +145,11 @@ class MainWindow(QMainWindow):
         self.setup_autosave()
 
     
+    @property
+    def is_text_changed(self):
+        """当前章节是否有未保存的修改（由文档自身跟踪，撤销回保存点时自动复原）"""
+        return self.current_chapter_id is not None and self.editor.document().isModified()
+
     def show_status_message(self, message):
         self.statusBar().showMessage(message, 5000)
 
@@ -108,7 +173,8 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(main_widget)
 
         self.editor.textChanged.connect(self.on_text_changed)
-        self.material_panel.materials_changed.connect(self.refresh_editor_highlighter)
+        self.material_card_cache = MaterialCardCache(self.data_manager)
+        self.editor.material_card_provider = self.material_card_cache.get_card
 
     def setup_status_bar(self):
         status_bar = self.statusBar()
@@ -157,13 +223,10 @@ class MainWindow(QMainWindow):
 
         self.book_tree = QTreeView()
         self.book_tree.setHeaderHidden(True)
-        self.book_model = QStandardItemModel()
-        # 创建代理模型用于过滤
-        self.book_proxy_model = QSortFilterProxyModel()
-        self.book_proxy_model.setSourceModel(self.book_model)
-        self.book_proxy_model.setFilterCaseSensitivity(Qt.CaseInsensitive)
-        self.book_proxy_model.setRecursiveFilteringEnabled(True)  # 启用递归过滤以匹配子项
-        self.book_tree.setModel(self.book_proxy_model)
+        # 书籍树模型：按分组分批交给视图，搜索过滤在模型内完成
+        self.book_model = BookTreeModel(self)
+        self.book_tree.setModel(self.book_model)
+        LazyFetcher(self.book_tree)
         self.book_tree.clicked.connect(self.on_book_selected)
         self.book_tree.doubleClicked.connect(self.on_book_double_clicked)
         self.book_tree.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -195,16 +258,14 @@ class MainWindow(QMainWindow):
         chapter_search_widget = QWidget()
         chapter_search_widget.setLayout(chapter_search_layout)
 
-        self.chapter_tree = QTreeView()
+        self.chapter_tree = ChapterTreeView()
         self.chapter_tree.setHeaderHidden(True)
-        self.chapter_model = QStandardItemModel()
-        # 创建代理模型用于过滤
-        self.chapter_proxy_model = QSortFilterProxyModel()
-        self.chapter_proxy_model.setSourceModel(self.chapter_model)
-        self.chapter_proxy_model.setFilterCaseSensitivity(Qt.CaseInsensitive)
-        self.chapter_proxy_model.setRecursiveFilteringEnabled(True)
-        self.chapter_tree.setModel(self.chapter_proxy_model)
-        self.chapter_tree.clicked.connect(self.on_chapter_selected)
+        self.chapter_tree.chapters_dropped.connect(self.move_chapters)
+        self.chapter_tree.volumes_dropped.connect(self.move_volumes)
+        self.chapter_model = ChapterTreeModel(self)
+        self.chapter_tree.setModel(self.chapter_model)
+        LazyFetcher(self.chapter_tree)
+        self.chapter_tree.clicked.connect(self.on_chapter_clicked)
         self.chapter_tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.chapter_tree.customContextMenuRequested.connect(self.open_chapter_menu)
 
@@ -233,22 +294,48 @@ class MainWindow(QMainWindow):
         editor_container = QWidget()
         editor_layout = QVBoxLayout(editor_container)
         editor_layout.setContentsMargins(0, 0, 0, 0)
+        editor_layout.setSpacing(0)
+
+        # 章节标签页：已打开的章节保留在文档缓存中，可快速来回切换
+        self.chapter_tab_bar = QTabBar()
+        self.chapter_tab_bar.setDocumentMode(True)
+        self.chapter_tab_bar.setTabsClosable(True)
+        self.chapter_tab_bar.setMovable(True)
+        self.chapter_tab_bar.setExpanding(False)
+        self.chapter_tab_bar.setElideMode(Qt.ElideRight)
+        self.chapter_tab_bar.currentChanged.connect(self.on_chapter_tab_changed)
+        self.chapter_tab_bar.tabCloseRequested.connect(self.close_chapter_tab)
+        editor_layout.addWidget(self.chapter_tab_bar)
         
         self.editor = Editor()
+        self.editor.load_finished.connect(self.on_editor_load_finished)
         editor_layout.addWidget(self.editor)
         self.central_stack.addWidget(editor_container)
         
         return self.central_stack
 
     def create_right_panel(self):
-        self.right_tabs = QTabWidget()
+        # 各标签页在第一次显示时才创建，未创建的面板为 None；创建时读取当前数据，之前的数据变更无需补发
+        self.material_panel = self.inspiration_panel = self.timeline_panel = None
+        self.right_tabs = LazyTabWidget()
+        self.right_tabs.add_lazy_tab(self._create_material_panel, "素材仓库")
+        self.right_tabs.add_lazy_tab(self._create_inspiration_panel, "灵感中心")
+        self.right_tabs.add_lazy_tab(self._create_timeline_panel, "时间轴")
+        self.right_tabs.currentChanged.connect(self.sync_side_panels)
+        self.right_tabs.page_created.connect(self.sync_side_panels)
+        return self.right_tabs
+
+    def _create_material_panel(self):
         self.material_panel = MaterialPanel(self.data_manager, self)
+        return self.material_panel
+
+    def _create_inspiration_panel(self):
         self.inspiration_panel = InspirationPanel(self.data_manager, self)
+        return self.inspiration_panel
+
+    def _create_timeline_panel(self):
         self.timeline_panel = TimelinePanel(self.data_manager, self)
-        self.right_tabs.addTab(self.material_panel, "素材仓库")
-        self.right_tabs.addTab(self.inspiration_panel, "灵感中心")
-        self.right_tabs.addTab(self.timeline_panel, "时间轴")
-        return self.right_tabs
+        return self.timeline_panel
 
 
     def setup_actions(self):
@@ -296,6 +383,10 @@ class MainWindow(QMainWindow):
         self.find_action.setShortcut(QKeySequence("Ctrl+F"))
         self.find_action.triggered.connect(self.open_find_dialog)
 
+        self.global_find_action = QAction("全书查找与替换", self)
+        self.global_find_action.setShortcut(QKeySequence("Ctrl+Shift+F"))
+        self.global_find_action.triggered.connect(self.open_global_search_dialog)
+
         # 面板控制快捷键
         self.toggle_left_panel_action = QAction("显示/隐藏左侧面板", self)
         self.toggle_left_panel_action.setShortcut(QKeySequence("Ctrl+1"))
@@ -319,6 +410,9 @@ class MainWindow(QMainWindow):
         file_menu.addAction(self.save_action)
         file_menu.addSeparator()
         file_menu.addAction(self.export_action)
+        batch_export_action = QAction("批量导出...", self)
+        batch_export_action.triggered.connect(lambda: self.batch_export())
+        file_menu.addAction(batch_export_action)
         file_menu.addSeparator()
 
         group_manage_action = QAction("分组管理", self)
@@ -343,6 +437,7 @@ class MainWindow(QMainWindow):
         # 最近编辑的章节菜单
         recent_menu = file_menu.addMenu("最近编辑的章节")
         self.recent_menu = recent_menu
+        self.recent_menu.setToolTipsVisible(True) # 悬停显示章节开头的预览
         recent_menu.aboutToShow.connect(self.update_recent_chapters_menu)
 
         file_menu.addSeparator()
@@ -355,6 +450,7 @@ class MainWindow(QMainWindow):
         edit_menu.addAction(self.redo_action)
         edit_menu.addSeparator()
         edit_menu.addAction(self.find_action) 
+        edit_menu.addAction(self.global_find_action)
         edit_menu.addSeparator()
         edit_menu.addAction(self.indent_action)
         edit_menu.addAction(self.unindent_action)
@@ -365,14 +461,24 @@ class MainWindow(QMainWindow):
         view_menu.addAction(self.toggle_left_panel_action)
         view_menu.addAction(self.toggle_right_panel_action)
         view_menu.addAction(self.toggle_focus_mode_action)
+        view_menu.addSeparator()
+        perf_action = QAction("性能诊断", self)
+        perf_action.triggered.connect(self.open_perf_diagnostics)
+        view_menu.addAction(perf_action)
 
     # [Removed open_webdav_settings method]
     
     def update_recent_chapters_menu(self):
-        # 清空菜单
+        # 菜单先显示占位项，数据返回后再填充
+        self.recent_menu.clear()
+        loading_item = QAction("正在加载…", self)
+        loading_item.setEnabled(False)
+        self.recent_menu.addAction(loading_item)
+        self.async_data.fetch('get_recent_chapters', limit=10, key='recent_chapters',
+                              callback=self._populate_recent_chapters_menu)
+
+    def _populate_recent_chapters_menu(self, recent_chapters):
         self.recent_menu.clear()
-        # 获取最近章节
-        recent_chapters = self.data_manager.get_recent_chapters(limit=10)
         if not recent_chapters:
             no_item = QAction("无最近编辑的章节", self)
             no_item.setEnabled(False)
@@ -384,6 +490,8 @@ class MainWindow(QMainWindow):
             title = f"{chapter['title']} ({chapter['book_title']})"
             action = QAction(title, self)
             action.setData(chapter['id'])  # 存储章节ID
+            if chapter.get('snippet'):
+                action.setToolTip(chapter['snippet'])
             action.triggered.connect(lambda checked, ch_id=chapter['id']: self.open_recent_chapter(ch_id))
             self.recent_menu.addAction(action)
     
@@ -398,14 +506,12 @@ class MainWindow(QMainWindow):
         book_id = chapter_info['book_id']
         # 如果当前书籍不是该章节所属书籍，切换到该书籍
         if self.current_book_id != book_id:
-            # 找到书籍项并选中
-            self.current_book_id = book_id
-            self.load_chapters_for_book(book_id)
-            self.material_panel.set_book(book_id)
-            self.inspiration_panel.refresh_all()
-            self.timeline_panel.set_book(book_id)
-            self.refresh_editor_highlighter()
-        
+            self.save_all_chapters()
+            self.clear_chapter_tabs()
+            # 章节列表载入后再选中章节
+            self._switch_book(book_id, then=lambda: self.find_and_select_chapter(chapter_id))
+            return
+
         # 找到章节项并选中
         self.find_and_select_chapter(chapter_id)
     
@@ -478,6 +584,7 @@ class MainWindow(QMainWindow):
         # 强制更新布局
         self.splitter.update()
         self.splitter.updateGeometry()
+        self.sync_side_panels()
     
     def toggle_focus_mode(self):
         if not self.focus_mode:
@@ -518,12 +625,24 @@ class MainWindow(QMainWindow):
             self.focus_mode = False
         self.splitter.update()
         self.splitter.updateGeometry()
+        self.sync_side_panels()
     
     # [新增] 打开回收站
     def open_recycle_bin(self):
+        # 还原操作可能修改已打开的章节，先保存
+        self.save_all_chapters()
+        self.write_queue.flush()
         dialog = RecycleBinDialog(self.data_manager, self)
         dialog.exec()
     
+    def open_perf_diagnostics(self):
+        if hasattr(self, 'perf_dialog') and self.perf_dialog.isVisible():
+            self.perf_dialog.raise_()
+            self.perf_dialog.activateWindow()
+            return
+        self.perf_dialog = PerfDiagnosticsDialog(perf_monitor, self.data_manager, self)
+        self.perf_dialog.show()
+
     def open_find_dialog(self):
         if not self.current_chapter_id:
              QMessageBox.warning(self, "提示", "请先打开一个章节。")
@@ -537,11 +656,51 @@ class MainWindow(QMainWindow):
         self.search_dialog = SearchReplaceDialog(self.editor, self)
         self.search_dialog.show()
 
+    def open_global_search_dialog(self):
+        # 先保存已打开的章节，确保后台扫描读取到的是最新内容
+        self.save_all_chapters()
+        self.write_queue.flush()
+
+        if hasattr(self, 'global_search_dialog') and self.global_search_dialog.isVisible():
+            self.global_search_dialog.current_book_id = self.current_book_id
+            self.global_search_dialog.raise_()
+            self.global_search_dialog.activateWindow()
+            return
+
+        # 对话框不是模态的，打开后仍可继续输入；替换时跳过此刻有未保存修改的章节
+        self.global_search_dialog = GlobalSearchDialog(self.data_manager, self.current_book_id, self,
+                                                       unsaved_chapter_ids=self.unsaved_chapter_ids)
+        self.global_search_dialog.chapters_replaced.connect(self.on_chapters_replaced)
+        self.global_search_dialog.show()
+
+    def unsaved_chapter_ids(self):
+        return [chapter_id for chapter_id, _document in self.document_cache.dirty_documents()]
+
+    def on_chapters_replaced(self, chapter_ids):
+        self.document_cache.discard_clean(chapter_ids)
+        if self.current_chapter_id in chapter_ids:
+            self._reload_current_chapter_if_saved()
+        self.statusBar().showMessage(f"已在 {len(chapter_ids)} 个章节中完成替换，可在回收站中撤销。", 5000)
+
+    def reload_current_chapter(self):
+        """从数据库重新载入当前章节（内容被外部批量修改后调用），其他已缓存的章节文档一并作废"""
+        self.document_cache.discard_clean()
+        if not self.current_chapter_id:
+            return
+        self._reload_current_chapter_if_saved()
+
+    def _reload_current_chapter_if_saved(self):
+        # 有未保存的修改时保留编辑器中的内容，不用数据库中的正文覆盖用户的输入
+        if self.is_text_changed:
+            self.statusBar().showMessage("当前章节有未保存的修改，未重新载入。", 5000)
+            return
+        self.start_chapter_load(self.current_chapter_id)
+
     def update_theme(self, new_theme):
-        self.data_manager.set_preference('theme', new_theme)
+        self.write_queue.submit('set_preference', 'theme', new_theme)
         self.current_theme = new_theme
         if hasattr(self.editor, 'highlighter'):
-             self.editor.highlighter.update_highlight_color()
+             self.editor.refresh_highlight_color()
 
     def toggle_theme(self):
         new_theme = 'dark' if self.current_theme == 'light' else 'light'
@@ -565,7 +724,7 @@ class MainWindow(QMainWindow):
     def on_font_size_changed(self, index):
         size_str = self.font_size_combobox.itemText(index)
         self.editor.set_font_size(size_str)
-        self.data_manager.set_preference('font_size', size_str)
+        self.write_queue.submit('set_preference', 'font_size', size_str)
 
 
     def auto_indent_document(self):
@@ -588,115 +747,90 @@ class MainWindow(QMainWindow):
         dialog = ManageGroupsDialog(self.data_manager, self)
         dialog.exec()
 
-    def load_books(self):
-        self.book_model.clear()
-        books_by_group = self.data_manager.get_books_and_groups()
-        for group_name, books in books_by_group.items():
-            group_item = QStandardItem(group_name)
-            group_item.setEditable(False)
-            group_item.setData("group", Qt.UserRole)
-            self.book_model.appendRow(group_item)
-            for book in books:
-                item = QStandardItem(book['title'])
-                item.setData(book['id'], Qt.UserRole)
-                item.setEditable(False)
-                group_item.appendRow(item)
+    def refresh_book_info_page(self, book_id):
+        """后台读取书籍信息与章节数，返回后更新书籍信息页"""
+        def query(data_manager):
+            return data_manager.get_book_details(book_id), data_manager.count_chapters(book_id)
+        self.async_data.fetch(query, key='book_info', callback=lambda result: self._show_book_info(book_id, *result))
+
+    def _show_book_info(self, book_id, book_details, chapter_count):
+        if book_id != self.current_book_id or not book_details:
+            return
+        # 调用封装好的更新方法
+        self.book_info_page.update_info(
+            book_details['title'],
+            book_details.get('group', '未分组'),
+            chapter_count,
+            book_details.get('description', '')
+        )
+
+    def load_books(self, then=None):
+        """后台读取书籍列表，返回后重建书籍树（首次载入时先显示占位项）；then 在重建完成后调用"""
+        if self.book_model.rowCount() == 0:
+            self.book_model.set_placeholder("正在加载书籍…")
+        self.async_data.fetch('get_books_and_groups', key='books',
+                              callback=lambda books_by_group: self._populate_books(books_by_group, then))
+
+    def _populate_books(self, books_by_group, then=None):
+        self.book_model.set_books(books_by_group)
         self.book_tree.expandAll()
-        # 应用现有搜索过滤
-        self.filter_books()
+        if then is not None:
+            then()
 
     def filter_books(self):
         search_text = self.book_search_input.text()
-        if hasattr(self, 'book_proxy_model'):
-            self.book_proxy_model.setFilterRegularExpression(search_text if search_text else "")
+        self.book_model.set_filter(search_text)
+        if search_text:
             self.book_tree.expandAll()  # 展开所有匹配项
 
     def filter_chapters(self):
         search_text = self.chapter_search_input.text()
-        if hasattr(self, 'chapter_proxy_model'):
-            self.chapter_proxy_model.setFilterRegularExpression(search_text if search_text else "")
+        self.chapter_model.set_filter(search_text)
+        if search_text:
             self.chapter_tree.expandAll()  # 展开所有匹配项
 
     def on_book_selected(self, index):
-        # 映射代理索引到源索引
-        if hasattr(self, 'book_proxy_model'):
-            source_index = self.book_proxy_model.mapToSource(index)
-        else:
-            source_index = index
-        item = self.book_model.itemFromIndex(source_index)
-        if not item or item.data(Qt.UserRole) == "group":
-            return
-            
-        book_id = item.data(Qt.UserRole)
-
+        book_id = index.data(Qt.UserRole)
         if isinstance(book_id, int):
-            if self.is_text_changed:
-                self.save_current_chapter()
+            # 标签页只显示当前书籍的章节，切换书籍前保存所有已打开的章节
+            self.save_all_chapters()
+            self.clear_chapter_tabs()
 
-            self.current_book_id = book_id
-            self.load_chapters_for_book(book_id)
-            self.material_panel.set_book(book_id)
-            self.inspiration_panel.refresh_all()
-            self.timeline_panel.set_book(book_id)
-            self.refresh_editor_highlighter()
-            self.setWindowTitle(f"诗成写作 PC版 - {item.text()}")
-            self.current_book_chapter_label.setText(f"书籍: {item.text()}")
+            self._switch_book(book_id)
+            self.setWindowTitle(f"诗成写作 PC版 - {index.data()}")
+            self.current_book_chapter_label.setText(f"书籍: {index.data()}")
             self.add_chapter_action.setEnabled(True)
             self.add_chapter_toolbar_action.setEnabled(True)
             self.export_action.setEnabled(True)
             
-            # [更新] 更新书籍信息页内容
-            book_details = self.data_manager.get_book_details(book_id)
-            if book_details:
-                chapters = self.data_manager.get_chapters_for_book(book_id)
-                # 调用封装好的更新方法
-                self.book_info_page.update_info(
-                    book_details['title'],
-                    book_details.get('group', '未分组'),
-                    len(chapters),
-                    book_details.get('description', '')
-                )
-            
             # 切换到书籍信息视图
             self.central_stack.setCurrentIndex(0)
             
             # 清理编辑器状态
-            self.current_chapter_id = None
-            self.editor.clear()
+            self.close_chapter_view()
             self.word_count_label.setText("字数: -")
             self.typing_speed_label.setText("速度: -")
 
     def on_book_double_clicked(self, index):
-        # 映射代理索引到源索引
-        if hasattr(self, 'book_proxy_model'):
-            source_index = self.book_proxy_model.mapToSource(index)
-        else:
-            source_index = index
-        item = self.book_model.itemFromIndex(source_index)
-        if not item:
+        if not index.isValid():
             return
-        data = item.data(Qt.UserRole)
+        data = index.data(Qt.UserRole)
         if data == "group":  # 双击分组，在该分组中新建书籍
-            group_name = item.text()
+            group_name = index.data()
             self.add_new_book_to_group(group_name)
         # 双击书籍不做特殊处理，单击已足够
 
     def open_book_menu(self, position):
         index = self.book_tree.indexAt(position)
         if not index.isValid(): return
-        # 映射代理索引到源索引
-        if hasattr(self, 'book_proxy_model'):
-            source_index = self.book_proxy_model.mapToSource(index)
-        else:
-            source_index = index
-        item = self.book_model.itemFromIndex(source_index)
-        data = item.data(Qt.UserRole)
+        if self.book_model.is_placeholder(): return # 加载中的占位项
+        data = index.data(Qt.UserRole)
         menu = QMenu()
         
         if isinstance(data, int):  # 书籍
             edit_action = menu.addAction("编辑书籍信息")
             set_group_action = menu.addAction("设置分组")
-            export_action = menu.addAction("导出为 TXT")
+            export_action = menu.addAction("导出书籍...")
             delete_action = menu.addAction("删除书籍")
             
             action = menu.exec(self.book_tree.viewport().mapToGlobal(position))
@@ -706,33 +840,33 @@ class MainWindow(QMainWindow):
             elif action == set_group_action: self.set_book_group(data)
             elif action == export_action: self.export_book(data)
         else:  # 分组
-            group_name = item.text()
+            group_name = index.data()
             new_book_action = menu.addAction("新建书籍")
             rename_group_action = menu.addAction("重命名分组")
+            export_group_action = menu.addAction("导出本组...")
             delete_group_action = menu.addAction("删除分组")
             
             action = menu.exec(self.book_tree.viewport().mapToGlobal(position))
             
             if action == new_book_action: self.add_new_book_to_group(group_name)
+            elif action == export_group_action: self.batch_export(group_name)
             elif action == rename_group_action: self.rename_group(group_name)
             elif action == delete_group_action: self.delete_group(group_name)
 
     def open_chapter_menu(self, position):
         index = self.chapter_tree.indexAt(position)
         if not index.isValid(): return
-        # 映射代理索引到源索引
-        if hasattr(self, 'chapter_proxy_model'):
-            source_index = self.chapter_proxy_model.mapToSource(index)
-        else:
-            source_index = index
-        item = self.chapter_model.itemFromIndex(source_index)
-        data = item.data(Qt.UserRole)
+        if self.chapter_model.is_placeholder(): return # 加载中的占位项
+        data = index.data(Qt.UserRole)
         menu = QMenu()
         if isinstance(data, int):
             rename_chapter_action = menu.addAction("重命名章节")
             delete_chapter_action = menu.addAction("删除章节")
         else: # Is a volume
             rename_volume_action = menu.addAction("重命名卷")
+            delete_volume_action = menu.addAction("删除卷")
+            volume_id = index.data(VOLUME_ID_ROLE)
+            delete_volume_action.setEnabled(self.chapter_model.child_count(volume_id) == 0) # 只能删除空卷
         
         action = menu.exec(self.chapter_tree.viewport().mapToGlobal(position))
         
@@ -740,27 +874,25 @@ class MainWindow(QMainWindow):
             if action == rename_chapter_action: self.rename_chapter(data)
             elif action == delete_chapter_action: self.delete_chapter(data)
         else:
-            if action == rename_volume_action: self.rename_volume(item.text())
+            if action == rename_volume_action: self.rename_volume(volume_id, index.data())
+            elif action == delete_volume_action: self.delete_volume(volume_id, index.data())
 
     def add_new_book(self):
         title, ok = QInputDialog.getText(self, "新建书籍", "请输入书名:")
         if ok and title:
             self.data_manager.add_book(title, group="未分组")
-            self.load_books()
             self.statusBar().showMessage(f"书籍《{title}》已创建！", 3000)
 
     def add_new_book_to_group(self, group_name):
         title, ok = QInputDialog.getText(self, f"在「{group_name}」中新建书籍", "请输入书名:")
         if ok and title:
             self.data_manager.add_book(title, group=group_name)
-            self.load_books()
             self.statusBar().showMessage(f"书籍《{title}》已在「{group_name}」分组中创建！", 3000)
 
     def rename_group(self, old_name):
         new_name, ok = QInputDialog.getText(self, "重命名分组", "请输入新的分组名称:", text=old_name)
         if ok and new_name and new_name != old_name:
             self.data_manager.rename_group(old_name, new_name)
-            self.load_books()
             self.statusBar().showMessage(f"分组「{old_name}」已重命名为「{new_name}」", 3000)
 
     def delete_group(self, group_name):
@@ -778,7 +910,6 @@ class MainWindow(QMainWindow):
                 return
         
         self.data_manager.delete_group(group_name)
-        self.load_books()
         if books_in_group:
             self.statusBar().showMessage(f"分组「{group_name}」已删除，{len(books_in_group)} 本书籍已移动到「未分组」", 3000)
         else:
@@ -792,20 +923,21 @@ class MainWindow(QMainWindow):
         dialog = EditBookDialog(book_details, self)
         if dialog.exec():
             new_details = dialog.get_details()
-            self.data_manager.update_book(book_id, **new_details)
-            self.load_books()
-            
-            # 如果当前正在查看这本书的信息，实时刷新页面
-            if self.current_book_id == book_id and self.central_stack.currentIndex() == 0:
-                chapters = self.data_manager.get_chapters_for_book(book_id)
-                self.book_info_page.update_info(
-                    new_details['title'],
-                    new_details.get('group', '未分组'),
-                    len(chapters),
-                    new_details.get('description', '')
-                )
-                
-            self.statusBar().showMessage(f"书籍《{new_details['title']}》信息已更新。", 3000)
+            future = self.write_queue.submit('update_book', book_id, **new_details)
+            self.future_bridge.then(future, lambda f: self.on_book_updated(f, book_id, new_details))
+
+    def on_book_updated(self, future, book_id, new_details):
+        try:
+            future.result()
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"更新书籍信息失败：{e}")
+            return
+
+        # 如果当前正在查看这本书的信息，实时刷新页面
+        if self.current_book_id == book_id and self.central_stack.currentIndex() == 0:
+            self.refresh_book_info_page(book_id)
+
+        self.statusBar().showMessage(f"书籍《{new_details['title']}》信息已更新。", 3000)
 
     def delete_book(self, book_id):
         # [修改] 提示语更新，告知用户进入回收站
@@ -813,12 +945,15 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             book_details = self.data_manager.get_book_details(book_id)
             self.data_manager.delete_book(book_id)
-            self.load_books()
             if self.current_book_id == book_id:
                 self.current_book_id = None
-                self.current_chapter_id = None
-                self.editor.clear()
+                self.clear_chapter_tabs()
+                self.close_chapter_view()
+                for chapter_id, _document in self.document_cache.dirty_documents():
+                    self.edit_journal.discard(chapter_id)
+                self.document_cache.clear()
                 self.chapter_model.clear()
+                self._chapter_list_book_id = None
                 self.setWindowTitle("诗成写作 PC版")
                 self.add_chapter_action.setEnabled(False)
                 self.add_chapter_toolbar_action.setEnabled(False)
@@ -835,183 +970,523 @@ class MainWindow(QMainWindow):
         if not book_details: return
         group, ok = QInputDialog.getText(self, "设置分组", "请输入分组名称:", text=book_details.get('group', ''))
         if ok:
-            self.data_manager.update_book(book_id, book_details.get('title'), book_details.get('description'), book_details.get('cover_path'), group)
-            self.load_books()
+            self.write_queue.submit('update_book', book_id, book_details.get('title'), book_details.get('description'), book_details.get('cover_path'), group)
 
     def export_book(self, book_id):
         if not book_id:
             QMessageBox.warning(self, "提示", "请先选择一本书籍进行导出。")
             return
+        # 导出在后台连接中读取数据库，先保存并等待写队列落盘
+        self.save_all_chapters()
+        self.write_queue.flush()
         book_details = self.data_manager.get_book_details(book_id)
         if not book_details:
             QMessageBox.warning(self, "错误", "找不到书籍信息。")
             return
-        file_path, _ = QFileDialog.getSaveFileName(self, "导出为 TXT", f"{book_details['title']}.txt", "文本文件 (*.txt)")
-        if file_path:
-            try:
-                chapters = self.data_manager.get_chapters_for_book(book_id)
-                # 使用 utf-8-sig 编码，兼容 Windows 记事本
-                with open(file_path, 'w', encoding='utf-8-sig') as f:
-                    f.write(f"书名：{book_details['title']}\n")
-                    f.write(f"描述：{book_details.get('description', '')}\n")
-                    f.write("="*20 + "\n\n")
-                    current_volume = None
-                    for chapter_data in chapters:
-                        if chapter_data['volume'] != current_volume:
-                            current_volume = chapter_data['volume']
-                            f.write(f"\n{'#'*2} {current_volume}\n\n")
-                        chapter_id = chapter_data['id']
-                        content, _ = self.data_manager.get_chapter_content(chapter_id)
-                        f.write(f"### {chapter_data['title']}\n\n")
-                        f.write(content)
-                        f.write("\n\n" + "-"*15 + "\n\n")
-                QMessageBox.information(self, "成功", f"书籍已成功导出到 {os.path.basename(file_path)}")
-            except Exception as e:
-                QMessageBox.critical(self, "导出失败", f"发生错误：\n{e}")
-
-    def load_chapters_for_book(self, book_id):
-        self.chapter_model.clear()
-        chapters = self.data_manager.get_chapters_for_book(book_id)
-        volumes = {}
-        for chapter in chapters:
-            vol = chapter['volume'] or "未分卷"
-            if vol not in volumes:
-                volume_item = QStandardItem(vol)
-                volume_item.setEditable(False)
-                volumes[vol] = volume_item
-                self.chapter_model.appendRow(volume_item)
-            chapter_item = QStandardItem(chapter['title'])
-            chapter_item.setData(chapter['id'], Qt.UserRole)
-            chapter_item.setEditable(False)
-            volumes[vol].appendRow(chapter_item)
-        self.chapter_tree.expandAll()
+        dialog = ExportDialog(book_details, self)
+        dialog.exec()
 
-    def on_chapter_selected(self, index):
-        # 映射代理索引到源索引
-        if hasattr(self, 'chapter_proxy_model'):
-            source_index = self.chapter_proxy_model.mapToSource(index)
+    def batch_export(self, group=None):
+        # 子进程以只读连接读取数据库，先保存并等待写队列落盘
+        self.save_all_chapters()
+        self.write_queue.flush()
+        groups = list(self.data_manager.get_books_and_groups())
+        dialog = BatchExportDialog(groups, group, self)
+        dialog.exec()
+
+    def _switch_book(self, book_id, then=None):
+        """
+        切换当前书籍：章节树、书籍信息页、素材高亮与右侧面板的数据由 book_context 一次取出
+        已缓存（预取过）的书立即显示，否则先显示占位项；then 在章节树重建后调用
+        """
+        self.current_book_id = book_id
+        if self.book_context.get(book_id) is None and self._chapter_list_book_id != book_id:
+            self._chapter_list_book_id = book_id
+            self.chapter_model.set_placeholder("正在加载章节…")
+        generation = self._outline_generation
+        self.book_context.load(book_id, lambda context: self._show_book_context(book_id, context, generation, then))
+
+    def _show_book_context(self, book_id, context, generation, then=None):
+        if book_id != self.current_book_id:
+            return # 已切换到其他书籍
+        if context is None:
+            return # 书籍已被删除，由数据变更通知更新书籍树
+        if generation == self._outline_generation:
+            self._chapter_list_book_id = book_id
+            self._populate_chapters(book_id, context['outline'], then)
+        elif then is not None:
+            then()
+        self._show_book_info(book_id, context['book'], context['chapter_count'])
+        self.material_name_index = context['material_name_index']
+        self.editor.update_highlighter(self.material_name_index)
+        self.sync_side_panels()
+        self.book_context.prefetch(self.book_model.neighbour_books(book_id))
+
+    def sync_side_panels(self):
+        """
+        右侧的素材、时间轴面板只在可见时载入当前书籍的数据
+        右侧面板收起、专注模式或标签页未选中时跳过，显示出来时（切换标签、展开面板）再载入
+        """
+        book_id = self.current_book_id
+        if book_id is None or not self.right_panel_visible:
+            return
+        panel = self.right_tabs.current_page()
+        if panel is None or panel not in (self.material_panel, self.timeline_panel) or panel.current_book_id == book_id:
+            return # 未创建的面板在创建（第一次显示）时再同步
+        context = self.book_context.get(book_id)
+        if panel is self.material_panel:
+            self.material_panel.set_book(book_id, context['materials'] if context else None)
         else:
-            source_index = index
-        item = self.chapter_model.itemFromIndex(source_index)
-        if not item or not isinstance(item.data(Qt.UserRole), int):
-             return
-        
-        chapter_id = item.data(Qt.UserRole)
-        if self.is_text_changed and self.current_chapter_id != chapter_id:
-            reply = QMessageBox.question(self, "保存提示", "当前章节已修改，是否保存？", QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Save)
-            if reply == QMessageBox.Save: self.save_current_chapter()
-            elif reply == QMessageBox.Cancel:
-                self.find_and_select_chapter(self.current_chapter_id, force_select=True)
+            self.timeline_panel.set_book(book_id, context['timelines'] if context else None)
+
+    def load_chapters_for_book(self, book_id, then=None):
+        """
+        后台读取章节列表，返回后重建章节树；then 在重建完成后调用（如选中新建的章节）
+        切换到另一本书时先显示占位项，刷新同一本书时保留现有条目直到新数据返回
+        """
+        if self._chapter_list_book_id != book_id:
+            self._chapter_list_book_id = book_id
+            self.chapter_model.set_placeholder("正在加载章节…")
+        self._outline_generation += 1
+        self.async_data.fetch('get_book_outline', book_id, key='chapters',
+                              callback=lambda volumes: self._populate_chapters(book_id, volumes, then))
+
+    def _populate_chapters(self, book_id, volumes, then=None):
+        if book_id != self.current_book_id:
+            return # 已切换到其他书籍
+        self.chapter_model.set_outline(volumes)
+        # 章节不多时全部展开；大书只展开最后一卷（通常是正在写的一卷），其余卷展开时再分批载入
+        if sum(len(volume['chapters']) for volume in volumes) <= BATCH_SIZE or self.chapter_search_input.text():
+            self.chapter_tree.expandAll()
+        elif volumes:
+            self.chapter_tree.expand(self.chapter_model.volume_index(volumes[-1]['id']))
+        if then is not None:
+            then()
+
+    # --- 数据变更：逐行更新书籍树与章节树 ---
+
+    def on_data_changed(self, changes):
+        """应用 DataManager 提交的变更，保留树的展开与选中状态；整体重置时才重新载入"""
+        reload_books = reload_chapters = False
+        for change in changes:
+            if change.entity in ('book', 'group'):
+                if change.op == 'reset' or self.book_model.is_placeholder():
+                    reload_books = True
+                elif not reload_books:
+                    self._apply_book_change(change)
+            elif change.entity in ('chapter', 'volume'):
+                if self.current_book_id is None or self._chapter_list_book_id != self.current_book_id:
+                    continue
+                if change.op == 'reset' or self.chapter_model.is_placeholder():
+                    reload_chapters = True
+                elif not reload_chapters:
+                    self._apply_chapter_change(change)
+        self.book_context.apply_changes(changes)
+        if reload_books:
+            self.load_books()
+        if reload_chapters:
+            self.load_chapters_for_book(self.current_book_id)
+        for panel in (self.material_panel, self.inspiration_panel, self.timeline_panel):
+            if panel is not None:
+                panel.apply_changes(changes)
+        if any(change.entity == 'material' for change in changes):
+            # 素材面板可能尚未创建，素材卡片与高亮在这里统一刷新
+            self.material_card_cache.invalidate()
+            self.refresh_editor_highlighter()
+
+    def _place_book(self, book_id, group_name):
+        self.book_model.move_book(book_id, group_name)
+        self.book_tree.expand(self.book_model.group_index(group_name))
+
+    def _apply_book_change(self, change):
+        if change.entity == 'group':
+            # 分组重命名或删除（删除时其中的书籍移到“未分组”）
+            new_name = change.fields['name'] if change.op == 'update' else "未分组"
+            for book_id in self.book_model.child_ids(change.id):
+                self._place_book(book_id, new_name)
+            return
+
+        if change.op == 'delete':
+            self.book_model.remove_book(change.id)
+            return
+        if self.book_model.book_title(change.id) is None:
+            if change.op == 'insert':
+                group_name = change.fields.get('group') or "未分组"
+                self.book_model.add_book(change.id, change.fields['title'], group_name)
+                self.book_tree.expand(self.book_model.group_index(group_name))
+            return
+        if 'title' in change.fields and self.book_model.book_title(change.id) != change.fields['title']:
+            self.book_model.rename_book(change.id, change.fields['title'])
+            if change.id == self.current_book_id:
+                self.setWindowTitle(f"诗成写作 PC版 - {change.fields['title']}")
+                self.current_book_chapter_label.setText(f"书籍: {change.fields['title']}")
+        if 'group' in change.fields:
+            self._place_book(change.id, change.fields['group'] or "未分组")
+
+    def _apply_volume_change(self, change):
+        if change.fields.get('book_id') != self.current_book_id:
+            return
+        if change.op == 'delete':
+            self.chapter_model.remove_volume(change.id)
+            return
+        if not self.chapter_model.has_volume(change.id):
+            if change.op == 'insert':
+                self.chapter_model.add_volume(change.id, change.fields['name'], change.fields['order_key'])
+            return
+        if 'name' in change.fields:
+            self.chapter_model.rename_volume(change.id, change.fields['name'])
+        if 'order_key' in change.fields:
+            self.chapter_model.move_volume(change.id, change.fields['order_key'])
+
+    def _apply_chapter_change(self, change):
+        if change.entity == 'volume':
+            self._apply_volume_change(change)
+            return
+
+        if change.op == 'delete':
+            self.chapter_model.remove_chapter(change.id)
+            return
+        if 'order_key' in change.fields:
+            if not self.chapter_model.has_chapter(change.id) and (
+                    change.op != 'insert' or change.fields.get('book_id') != self.current_book_id):
                 return
-        
+            # 卷的插入通知总在其章节之前，找不到卷说明目录已过期
+            if not self.chapter_model.add_chapter(change.id, change.fields.get('title') or "",
+                                                  change.fields['volume_id'], change.fields['order_key']):
+                self.load_chapters_for_book(self.current_book_id)
+                return
+            self.chapter_tree.expand(self.chapter_model.volume_index(change.fields['volume_id']))
+        if 'title' in change.fields:
+            self.chapter_model.rename_chapter(change.id, change.fields['title'])
+        if change.op == 'insert' and change.id == self._select_chapter_on_insert:
+            self._select_chapter_on_insert = None
+            self.find_and_select_chapter(change.id, force_select=True)
+
+    def on_chapter_clicked(self, index):
+        # Ctrl / Shift 点击用于多选章节（批量拖动），不切换正在编辑的章节
+        if QApplication.keyboardModifiers() & (Qt.ControlModifier | Qt.ShiftModifier):
+            return
+        self.on_chapter_selected(index)
+
+    def on_chapter_selected(self, index):
+        chapter_id = index.data(Qt.UserRole)
+        if not isinstance(chapter_id, int):
+            return
         # 切换到编辑器视图
         self.central_stack.setCurrentIndex(1)
-        
+        # 其他章节的未保存修改保留在各自的标签页文档中，切换时无需提示保存
+        self.open_chapter(chapter_id, index.data())
+
+    def open_chapter(self, chapter_id, title=None):
+        """在标签页中打开章节：已缓存的文档直接切换显示，否则后台加载"""
+        if title is None:
+            title = self._chapter_tab_title(chapter_id)
+        self._leave_current_document()
         self.current_chapter_id = chapter_id
-        content, count = self.data_manager.get_chapter_content(chapter_id)
-        self.editor.blockSignals(True)
-        self.editor.setPlainText(content)
-        self.editor.blockSignals(False)
-        self.is_text_changed = False
-        self.update_word_count_label(count)
+        self.document_cache.pinned_id = chapter_id
+        self._show_chapter_tab(chapter_id, title)
+
+        document = self.document_cache.get(chapter_id)
+        if document is None:
+            self.start_chapter_load(chapter_id, title)
+            return
+
+        self._chapter_load_request += 1 # 丢弃仍在进行的旧加载
+        self.editor.set_document(document)
+        self.editor.setReadOnly(False)
+        self.editor.update_highlighter(self.material_name_index)
+        self.update_word_count_label()
+        if document.isModified():
+            self.word_count_label.setText(self.word_count_label.text() + '*')
+        self.typing_speed_label.setText("速度: 0 字/分")
+        self.statusBar().showMessage(f"已切换到章节: {title}", 3000)
+        self.last_char_count = len(document.toPlainText().strip())
+        if not self.typing_timer.isActive(): self.typing_timer.start()
+
+    def _leave_current_document(self):
+        # 尚未分块加载完的文档内容不完整，不能留在缓存中
+        if self.current_chapter_id is not None and self.editor.is_loading:
+            chapter_id = self.current_chapter_id
+            self.editor.set_document(None)
+            self.document_cache.remove(chapter_id)
+
+    def close_chapter_view(self):
+        """关闭当前章节，编辑器切回空白文档（章节文档仍保留在缓存中）"""
+        self._leave_current_document()
+        self._chapter_load_request += 1
+        self.current_chapter_id = None
+        self.document_cache.pinned_id = None
+        self.editor.set_document(None)
+        self.document_cache.trim()
+
+    def start_chapter_load(self, chapter_id, title=None):
+        """后台读取章节内容，返回后分块渲染；用户在此期间切换章节时旧结果会被丢弃"""
+        self._chapter_load_request += 1
+        self.editor.set_document(None)
+        self.editor.setReadOnly(True)
+
+        worker = ChapterLoadWorker(self._chapter_load_request, chapter_id, self.current_book_id)
+        worker.loaded.connect(lambda result, t=title: self.on_chapter_loaded(result, t))
+        worker.finished.connect(lambda w=worker: self._chapter_load_workers.discard(w))
+        self._chapter_load_workers.add(worker)
+        worker.start()
+
+    def on_chapter_loaded(self, result, title=None):
+        if result['request_id'] != self._chapter_load_request or result['chapter_id'] != self.current_chapter_id:
+            return # 已切换到其他章节
+
+        chapter_id = result['chapter_id']
+        document = self.editor.create_document()
+        document.modificationChanged.connect(lambda _modified, cid=chapter_id: self.update_chapter_tab_state(cid))
+        self.document_cache.put(chapter_id, document)
+        self.editor.set_document(document)
+        self.editor.update_highlighter(self.material_name_index)
+        self.editor.setReadOnly(False)
+        self.editor.load_text_progressively(result['content'])
+        count = result['word_count']
+        self.update_word_count_label(count, result['book_word_count'])
         self.typing_speed_label.setText("速度: 0 字/分")
-        self.statusBar().showMessage(f"已打开章节: {item.text()}", 3000)
+        if title:
+            self.statusBar().showMessage(f"已打开章节: {title}", 3000)
         self.last_char_count = count
         if not self.typing_timer.isActive(): self.typing_timer.start()
 
+    def on_editor_load_finished(self):
+        # 正文载入完成后，文档与数据库内容一致，从此开始记录修改
+        document = self.editor.document()
+        if self.current_chapter_id is not None and document is self.document_cache.peek(self.current_chapter_id):
+            self.edit_journal.track(self.current_chapter_id, document)
+
+    def _find_chapter_tab(self, chapter_id):
+        for index in range(self.chapter_tab_bar.count()):
+            if self.chapter_tab_bar.tabData(index) == chapter_id:
+                return index
+        return -1
+
+    def _chapter_tab_title(self, chapter_id):
+        index = self._find_chapter_tab(chapter_id)
+        if index >= 0:
+            return self.chapter_tab_bar.tabToolTip(index)
+        info = self.data_manager.get_chapter_info(chapter_id)
+        return info['title'] if info else ""
+
+    def _show_chapter_tab(self, chapter_id, title):
+        """确保章节有对应标签页并设为当前页（不触发 on_chapter_tab_changed）"""
+        index = self._find_chapter_tab(chapter_id)
+        if index < 0:
+            index = self.chapter_tab_bar.addTab(title)
+            self.chapter_tab_bar.setTabData(index, chapter_id)
+        self.chapter_tab_bar.setTabToolTip(index, title)
+        was_blocked = self.chapter_tab_bar.blockSignals(True)
+        self.chapter_tab_bar.setCurrentIndex(index)
+        self.chapter_tab_bar.blockSignals(was_blocked)
+        self.update_chapter_tab_state(chapter_id)
+
+    def update_chapter_tab_state(self, chapter_id):
+        """在标签页标题上标记章节是否有未保存的修改"""
+        index = self._find_chapter_tab(chapter_id)
+        if index < 0:
+            return
+        document = self.document_cache.peek(chapter_id)
+        title = self.chapter_tab_bar.tabToolTip(index)
+        modified = document is not None and document.isModified()
+        self.chapter_tab_bar.setTabText(index, f"{title} *" if modified else title)
+
+    def on_chapter_tab_changed(self, index):
+        chapter_id = self.chapter_tab_bar.tabData(index) if index >= 0 else None
+        if chapter_id is None or chapter_id == self.current_chapter_id:
+            return
+        self.central_stack.setCurrentIndex(1)
+        self.find_and_select_chapter(chapter_id)
+        self.open_chapter(chapter_id)
+
+    def close_chapter_tab(self, index):
+        chapter_id = self.chapter_tab_bar.tabData(index)
+        document = self.document_cache.peek(chapter_id)
+        discard = False
+        if document is not None and document.isModified():
+            title = self.chapter_tab_bar.tabToolTip(index)
+            reply = QMessageBox.question(self, "保存提示", f"章节《{title}》已修改，是否保存？", QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Save)
+            if reply == QMessageBox.Cancel:
+                return
+            if reply == QMessageBox.Save:
+                self.save_chapter_document(chapter_id, document)
+            else:
+                discard = True
+                self.edit_journal.discard(chapter_id)
+
+        self.remove_chapter_tab(chapter_id)
+        if chapter_id == self.current_chapter_id:
+            next_index = self.chapter_tab_bar.currentIndex()
+            if next_index >= 0:
+                self.on_chapter_tab_changed(next_index)
+            else:
+                self.close_chapter_view()
+                self.chapter_tree.clearSelection()
+                self.central_stack.setCurrentIndex(0)
+        if discard:
+            # 放弃修改：丢弃文档，下次打开时从数据库重新载入
+            self.document_cache.remove(chapter_id)
+
+    def remove_chapter_tab(self, chapter_id):
+        index = self._find_chapter_tab(chapter_id)
+        if index < 0:
+            return
+        was_blocked = self.chapter_tab_bar.blockSignals(True)
+        self.chapter_tab_bar.removeTab(index)
+        self.chapter_tab_bar.blockSignals(was_blocked)
+
+    def clear_chapter_tabs(self):
+        was_blocked = self.chapter_tab_bar.blockSignals(True)
+        while self.chapter_tab_bar.count():
+            self.chapter_tab_bar.removeTab(0)
+        self.chapter_tab_bar.blockSignals(was_blocked)
+
     def add_new_chapter(self):
         if self.current_book_id is None:
             QMessageBox.warning(self, "提示", "请先选择一本书籍！")
             return
-        chapters = self.data_manager.get_chapters_for_book(self.current_book_id)
-        current_volumes = sorted(list({c['volume'] for c in chapters if c['volume']}))
+        current_volumes = [volume['name'] for volume in self.data_manager.get_volumes(self.current_book_id)]
         volume, ok_vol = QInputDialog.getItem(self, "分卷", "请选择或输入分卷名：", current_volumes, 0, True)
         if not ok_vol: return
         if not volume: volume = "未分卷"
         title, ok_title = QInputDialog.getText(self, "新建章节", "请输入章节名:")
         if ok_title and title:
-            new_chapter_id = self.data_manager.add_chapter(self.current_book_id, volume, title)
-            self.load_chapters_for_book(self.current_book_id)
-            self.find_and_select_chapter(new_chapter_id, force_select=True)
+            # 新章节经数据变更通知插入章节树后再打开
+            self._select_chapter_on_insert = self.data_manager.add_chapter(self.current_book_id, volume, title)
 
     def rename_chapter(self, chapter_id):
-        chapter_details = self.data_manager.get_chapter_details(chapter_id)
-        if not chapter_details: return
-        new_title, ok = QInputDialog.getText(self, "重命名章节", "请输入新的章节名:", text=chapter_details['title'])
+        chapter_info = self.data_manager.get_chapter_info(chapter_id)
+        if not chapter_info: return
+        new_title, ok = QInputDialog.getText(self, "重命名章节", "请输入新的章节名:", text=chapter_info['title'])
         if ok and new_title:
             self.data_manager.update_chapter_title(chapter_id, new_title)
-            self.load_chapters_for_book(self.current_book_id)
+            tab_index = self._find_chapter_tab(chapter_id)
+            if tab_index >= 0:
+                self.chapter_tab_bar.setTabToolTip(tab_index, new_title)
+                self.update_chapter_tab_state(chapter_id)
             self.statusBar().showMessage(f"章节已重命名为《{new_title}》", 3000)
 
     def delete_chapter(self, chapter_id):
         # [修改] 提示语更新
         reply = QMessageBox.question(self, '确认删除', "确定要删除这个章节吗？\n该操作会将其移入回收站，您可以在“文件 > 回收站”中恢复。", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            chapter_details = self.data_manager.get_chapter_details(chapter_id)
+            chapter_info = self.data_manager.get_chapter_info(chapter_id)
             self.data_manager.delete_chapter(chapter_id)
-            self.load_chapters_for_book(self.current_book_id)
+            self.edit_journal.discard(chapter_id)
+            self.remove_chapter_tab(chapter_id)
             if self.current_chapter_id == chapter_id:
-                self.current_chapter_id = None
-                self.editor.clear()
+                self.close_chapter_view()
                 # 章节删除后，如果没选中其他章节，可以切回书籍信息页
                 self.central_stack.setCurrentIndex(0)
+            self.document_cache.remove(chapter_id)
                 
-            self.statusBar().showMessage(f"章节《{chapter_details['title']}》已移入回收站。", 3000)
+            self.statusBar().showMessage(f"章节《{chapter_info['title']}》已移入回收站。", 3000)
 
-    def rename_volume(self, old_volume_name):
+    def rename_volume(self, volume_id, old_volume_name):
         new_volume_name, ok = QInputDialog.getText(self, "重命名卷", "请输入新的卷名:", text=old_volume_name)
         if ok and new_volume_name and new_volume_name != old_volume_name:
-            self.data_manager.update_volume_name(self.current_book_id, old_volume_name, new_volume_name)
-            self.load_chapters_for_book(self.current_book_id)
+            self.data_manager.update_volume_name(volume_id, new_volume_name)
             self.statusBar().showMessage(f"卷《{old_volume_name}》已重命名为《{new_volume_name}》", 3000)
 
+    def delete_volume(self, volume_id, volume_name):
+        if self.data_manager.delete_volume(volume_id):
+            self.statusBar().showMessage(f"卷《{volume_name}》已删除", 3000)
+
+    def move_chapters(self, chapter_ids, volume_id, before_id):
+        """拖放章节：在写队列中用一个事务写入新的排序键，章节树随之后的变更通知逐行更新"""
+        future = self.write_queue.submit('move_chapters', chapter_ids, volume_id, before_id)
+        self.future_bridge.then(future, lambda f: self._on_move_finished(f, "移动章节"))
+
+    def move_volumes(self, volume_ids, before_id):
+        future = self.write_queue.submit('move_volumes', volume_ids, before_id)
+        self.future_bridge.then(future, lambda f: self._on_move_finished(f, "移动卷"))
+
+    def _on_move_finished(self, future, action):
+        try:
+            future.result()
+        except Exception as e:
+            logger.error(f"{action}失败: {e}", exc_info=True)
+            QMessageBox.warning(self, "错误", f"{action}失败：{e}")
+
     def find_and_select_chapter(self, chapter_id, force_select=False):
         if chapter_id is None: return
-        for row in range(self.chapter_model.rowCount()):
-            parent_item = self.chapter_model.item(row)
-            if not parent_item: continue
-            for child_row in range(parent_item.rowCount()):
-                child_item = parent_item.child(child_row)
-                if child_item and child_item.data(Qt.UserRole) == chapter_id:
-                    source_index = self.chapter_model.indexFromItem(child_item)
-                    
-                    # [修复] 将源模型索引转换为代理模型索引
-                    if hasattr(self, 'chapter_proxy_model'):
-                        proxy_index = self.chapter_proxy_model.mapFromSource(source_index)
-                    else:
-                        proxy_index = source_index
-                        
-                    # 视图和槽函数都需要代理索引
-                    self.chapter_tree.setCurrentIndex(proxy_index)
-                    if force_select: self.on_chapter_selected(proxy_index)
-                    return
-                    
+        index = self.chapter_model.chapter_index(chapter_id)
+        if not index.isValid(): return # 不在当前目录中，或被搜索过滤掉
+        self.chapter_tree.expand(index.parent())
+        self.chapter_tree.setCurrentIndex(index)
+        self.chapter_tree.scrollTo(index)
+        if force_select: self.on_chapter_selected(index)
+
+    def save_chapter_document(self, chapter_id, document):
+        """
+        将章节文档交给写队列保存，不等待写入完成（内容与数据库一致时写线程会跳过）
+        写入完成后，若期间文档没有新的修改，再清除修改标记并记录编辑日志检查点
+        返回 (正文, 写入的 Future)
+        """
+        with perf_monitor.measure('save_chapter'):
+            content = document.toPlainText()
+            # 写入期间的新修改以即将写入的正文为基准记录
+            self.edit_journal.rebase(chapter_id, content)
+            future = self.write_queue.submit('update_chapter_content', chapter_id, content)
+        revision = document.revision()
+        self.future_bridge.then(future, lambda f: self.on_chapter_saved(f, chapter_id, document, revision, content))
+        return content, future
+
+    def on_chapter_saved(self, future, chapter_id, document, revision, content):
+        try:
+            future.result()
+        except Exception as e:
+            self.statusBar().showMessage(f"章节保存失败：{e}", 5000)
+            return
+        # 文档已被关闭或替换、写入期间又有修改时保持未保存状态
+        if self.document_cache.peek(chapter_id) is document and document.revision() == revision:
+            document.setModified(False)
+            self.edit_journal.checkpoint(chapter_id, content)
+            if chapter_id == self.current_chapter_id:
+                self.update_word_count_label()
+        self.document_cache.trim()
+
+    def save_all_chapters(self):
+        """保存所有有未保存修改的章节（当前章节及其他标签页），返回各章写入的 Future 列表（没有要保存的章节时为空）"""
+        futures = []
+        future = self.save_current_chapter()
+        if future is not None:
+            futures.append(future)
+        for chapter_id, document in self.document_cache.dirty_documents():
+            if future is not None and chapter_id == self.current_chapter_id:
+                continue
+            futures.append(self.save_chapter_document(chapter_id, document)[1])
+        self.document_cache.trim()
+        return futures
+
     def save_current_chapter(self):
+        """保存当前章节，返回写入的 Future；没有未保存的修改时返回 None"""
         if self.current_chapter_id and self.is_text_changed:
-            content = self.editor.toPlainText()
-            self.data_manager.update_chapter_content(self.current_chapter_id, content)
-            self.is_text_changed = False
+            content, future = self.save_chapter_document(self.current_chapter_id, self.editor.document())
             self.update_word_count_label(len(content.strip()))
             self.statusBar().showMessage(f"章节已保存！", 2000)
-            return True
+            return future
         elif not self.is_text_changed and self.current_chapter_id:
             # 自动保存时静默处理，只有手动保存提示
             pass
-        return False
+        return None
             
     def refresh_editor_highlighter(self):
+        # 缓存中的其他章节文档在切换显示时再按此索引更新高亮
         if self.current_book_id:
-            materials_names = self.data_manager.get_all_materials_names(self.current_book_id)
-            self.editor.update_highlighter(materials_names)
+            self.material_name_index = self.data_manager.get_material_name_index(self.current_book_id)
         else:
-            self.editor.update_highlighter([])
+            self.material_name_index = {}
+        self.editor.update_highlighter(self.material_name_index)
             
-    def update_word_count_label(self, chapter_word_count=None):
+    def update_word_count_label(self, chapter_word_count=None, total_word_count=None):
         if chapter_word_count is None:
             chapter_word_count = len(self.editor.toPlainText().strip())
         
         if self.current_book_id:
-            total_word_count = self.data_manager.get_book_word_count(self.current_book_id)
+            if total_word_count is None:
+                total_word_count = self.data_manager.get_book_word_count(self.current_book_id)
             if total_word_count > 0:
                 percentage = (chapter_word_count / total_word_count) * 100 if total_word_count > 0 else 0
                 self.word_count_label.setText(f"字数: {chapter_word_count}/{total_word_count} ({percentage:.1f}%)")
@@ -1021,12 +1496,16 @@ class MainWindow(QMainWindow):
             self.word_count_label.setText(f"字数: {chapter_word_count}")
 
     def on_text_changed(self):
+        # 未打开章节时（如切换书籍后清空编辑器）的变化不算作正文修改
+        if self.current_chapter_id is None:
+            return
         if not self.editor.signalsBlocked():
-            self.is_text_changed = True
             # 添加星号表示未保存（立即反馈）
             current_text = self.word_count_label.text()
-            if not current_text.endswith('*'):
-                self.word_count_label.setText(current_text + '*')
+            if self.is_text_changed:
+                if not current_text.endswith('*'):
+                    self.word_count_label.setText(current_text + '*')
+                self.autosave_scheduler.notify_edit()
             # 延迟字数统计计算（节流）
             # 确保wordcount_timer存在
             if not hasattr(self, 'wordcount_timer'):
@@ -1080,18 +1559,33 @@ class MainWindow(QMainWindow):
         self.last_char_count = current_char_count
 
     def closeEvent(self, event):
-        if self.is_text_changed:
-            reply = QMessageBox.question(self, "退出提示", "当前章节有未保存的修改，是否保存？", QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Save)
-            if reply == QMessageBox.Save: self.save_current_chapter()
+        save_futures = []
+        if self.document_cache.dirty_documents():
+            reply = QMessageBox.question(self, "退出提示", "已打开的章节有未保存的修改，是否保存？", QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Save)
+            if reply == QMessageBox.Save: save_futures = self.save_all_chapters()
             elif reply == QMessageBox.Cancel:
                 event.ignore()
                 return
 
         # 关闭时的备份
+        self.write_queue.flush()
         self.show_status_message("正在执行关闭前的阶段点备份...")
         self.backup_manager.create_stage_point_backup()
 
         self.typing_timer.stop()
+        for worker in list(self._chapter_load_workers):
+            worker.wait()
+        self.autosave_scheduler.cancel()
+        self.write_queue.close()
+        self.change_bus.close()
+        self.async_data.shutdown()
+        # 写队列已关闭，退出前的保存都已有结果；全部成功（或选择放弃修改）时不再需要编辑日志，
+        # 有章节保存失败时保留日志，下次启动时由 recover_unsaved_edits 恢复
+        failed = [future for future in save_futures if not future.done() or future.exception() is not None]
+        if failed:
+            logger.error(f"退出前有 {len(failed)} 个章节保存失败，保留编辑日志以便下次启动时恢复。")
+            QMessageBox.warning(self, "保存失败", f"有 {len(failed)} 个章节保存失败。\n修改已记录在编辑日志中，下次启动时会提示恢复。")
+        self.edit_journal.close(remove=not failed)
         self.data_manager.close()
         event.accept()
 
@@ -1108,15 +1602,48 @@ class MainWindow(QMainWindow):
         self.show_status_message("阶段点(Stage Point)定时备份已启动。")
         
     def setup_autosave(self):
-        # 自动保存定时器，每60秒检查一次
-        self.autosave_timer = QTimer(self)
-        self.autosave_timer.setInterval(60000) 
-        self.autosave_timer.timeout.connect(self.auto_save_check)
-        self.autosave_timer.start()
+        # 自动保存：停止输入一段时间后保存，持续输入时也有最长间隔
+        # 秒数可通过偏好设置 autosave_idle_seconds / autosave_max_seconds 调整
+        intervals = {}
+        for key, default_ms in (('autosave_idle_seconds', AutosaveScheduler.DEFAULT_IDLE_MS),
+                                ('autosave_max_seconds', AutosaveScheduler.DEFAULT_MAX_MS)):
+            try:
+                intervals[key] = int(self.data_manager.get_preference(key, default_ms // 1000)) * 1000
+            except ValueError:
+                intervals[key] = default_ms
+        self.autosave_scheduler = AutosaveScheduler(intervals['autosave_idle_seconds'], intervals['autosave_max_seconds'], self)
+        self.autosave_scheduler.triggered.connect(self.auto_save_check)
+
+    def recover_unsaved_edits(self):
+        """启动时检查编辑日志：上次异常退出前未保存的修改，经用户确认后重放并写回数据库"""
+        try:
+            entries = read_journal(self.edit_journal.path)
+        except OSError as e:
+            logger.error(f"读取编辑日志失败: {e}")
+            return
+        recovered = {}
+        for chapter_id, entry in entries.items():
+            if self.data_manager.get_chapter_info(chapter_id) is None:
+                continue # 章节已被删除
+            saved, _ = self.data_manager.get_chapter_content(chapter_id)
+            content = replay_entry(saved, entry)
+            if content is None:
+                logger.warning(f"章节 {chapter_id} 的正文与编辑日志的基准不一致，跳过恢复。")
+            elif content != (saved or ""):
+                recovered[chapter_id] = content
+
+        if recovered:
+            reply = QMessageBox.question(self, "恢复未保存的修改",
+                                         f"上次退出前有 {len(recovered)} 个章节的修改尚未保存，是否恢复？\n恢复前的内容会存入回收站，可随时还原。",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if reply == QMessageBox.Yes:
+                restored = self.data_manager.restore_chapter_contents(recovered, f"异常退出恢复 ({len(recovered)} 个章节)")
+                logger.info(f"已从编辑日志恢复 {len(restored)} 个章节。")
+                self.statusBar().showMessage(f"已恢复 {len(restored)} 个章节的未保存修改。", 5000)
+        self.edit_journal.reset()
 
     def auto_save_check(self):
-        if self.current_chapter_id and self.is_text_changed:
-            self.save_current_chapter()
+        if self.save_all_chapters():
             self.statusBar().showMessage("系统已自动保存草稿", 2000)
 
     def update_timer_interval(self, timer_name, default_interval):
@@ -1128,6 +1655,7 @@ class MainWindow(QMainWindow):
 
     def run_snapshot_backup(self):
         # 快照备份轻量级，依然走同步，或者也可以改为异步
+        self.write_queue.flush()
         self.backup_manager.create_snapshot_backup()
         self.update_timer_interval('snapshot_timer', 1 * 60 * 1000)
         
@@ -1136,6 +1664,7 @@ class MainWindow(QMainWindow):
              self.show_status_message("正在后台执行手动备份...")
         
         # 直接调用 BackupManager，其内部已封装线程
+        self.write_queue.flush()
         self.backup_manager.create_stage_point_backup()
         
         self.update_timer_interval('stage_point_timer', 30 * 60 * 1000)
@@ -1149,13 +1678,19 @@ class MainWindow(QMainWindow):
         self.show_status_message(message)
 
     def open_backup_manager(self):
-        if self.is_text_changed: self.save_current_chapter()
+        self.save_all_chapters()
+        self.write_queue.flush()
         dialog = BackupDialog(self.backup_manager, self)
         dialog.exec()
         if dialog.result() == QDialog.Accepted:
             self.load_books()
+            self.book_context.clear()
             self.chapter_model.clear()
-            self.editor.clear()
+            self._chapter_list_book_id = None
+            # 数据库已被替换，缓存的章节文档全部作废
+            self.clear_chapter_tabs()
+            self.close_chapter_view()
+            self.document_cache.clear()
+            self.edit_journal.reset()
             self.current_book_id = None
-            self.current_chapter_id = None
     
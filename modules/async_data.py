@@ -0,0 +1,73 @@
+# ShiCheng_Writer/modules/async_data.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from PySide6.QtCore import QObject
+
+from .database import DataManager
+from .write_queue import FutureBridge
+
+logger = logging.getLogger(__name__)
+
+class AsyncDataManager(QObject):
+    """
+    DataManager 的异步查询接口
+    查询在线程池中执行，每个线程使用自己的数据库连接；fetch() 的回调在界面线程中执行，
+    界面可以先显示占位内容，数据返回后再填充。
+    - 同一 key 的新请求会使旧请求作废（如快速切换书籍时只显示最后一本书的章节）。
+    - 提供写队列时，查询会先等待此前提交的写操作完成，保证读到自己刚写入的数据。
+    """
+    def __init__(self, write_queue=None, max_workers=2, parent=None):
+        super().__init__(parent)
+        self.write_queue = write_queue
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="DataReader")
+        self._bridge = FutureBridge(self)
+        self._latest = {} # key -> 最新请求的 Future
+
+    def submit(self, query, *args, **kwargs):
+        """
+        在线程池中执行查询，返回 concurrent.futures.Future
+        query 为 DataManager 的方法名，或形如 query(data_manager, *args, **kwargs) 的函数（一次读取多项数据时使用）
+        """
+        barrier = self.write_queue.pending_future() if self.write_queue is not None else None
+        return self._executor.submit(self._run, barrier, query, args, kwargs)
+
+    def fetch(self, query, *args, callback=None, error_callback=None, key=None, **kwargs):
+        """同 submit()，完成后在界面线程中调用 callback(result)；出错时调用 error_callback(exception)"""
+        future = self.submit(query, *args, **kwargs)
+        if key is not None:
+            self._latest[key] = future
+        self._bridge.then(future, lambda f: self._deliver(f, key, callback, error_callback))
+        return future
+
+    def shutdown(self):
+        """取消排队中的查询并等待执行中的查询结束（程序退出时调用）"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, barrier, query, args, kwargs):
+        if barrier is not None:
+            wait([barrier])
+        data_manager = getattr(self._local, 'data_manager', None)
+        if data_manager is None:
+            # 每个工作线程第一次查询时建立自己的连接
+            data_manager = self._local.data_manager = DataManager()
+        if isinstance(query, str):
+            return getattr(data_manager, query)(*args, **kwargs)
+        return query(data_manager, *args, **kwargs)
+
+    def _deliver(self, future, key, callback, error_callback):
+        if key is not None:
+            if self._latest.get(key) is not future:
+                return # 已被同 key 的新请求取代
+            del self._latest[key]
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"后台查询失败: {error}", exc_info=error)
+            if error_callback is not None:
+                error_callback(error)
+            return
+        if callback is not None:
+            callback(future.result())
@@ -0,0 +1,38 @@
+# ShiCheng_Writer/modules/autosave.py
+from PySide6.QtCore import QObject, QTimer, Signal
+
+class AutosaveScheduler(QObject):
+    """
+    空闲防抖的自动保存调度
+    每次修改后重新计时，停止输入 idle_ms 毫秒后触发；持续输入时，距第一次未保存的修改
+    最多 max_ms 毫秒也会触发，避免长时间不落盘。
+    """
+    triggered = Signal()
+
+    DEFAULT_IDLE_MS = 5 * 1000
+    DEFAULT_MAX_MS = 60 * 1000
+
+    def __init__(self, idle_ms=DEFAULT_IDLE_MS, max_ms=DEFAULT_MAX_MS, parent=None):
+        super().__init__(parent)
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(idle_ms)
+        self.idle_timer.timeout.connect(self._trigger)
+        self.max_timer = QTimer(self)
+        self.max_timer.setSingleShot(True)
+        self.max_timer.setInterval(max_ms)
+        self.max_timer.timeout.connect(self._trigger)
+
+    def notify_edit(self):
+        self.idle_timer.start()
+        if not self.max_timer.isActive():
+            self.max_timer.start()
+
+    def cancel(self):
+        self.idle_timer.stop()
+        self.max_timer.stop()
+
+    def _trigger(self):
+        self.cancel()
+        self.triggered.emit()
+
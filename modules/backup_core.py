@@ -0,0 +1,290 @@
+# ShiCheng_Writer/modules/backup_core.py
+"""
+备份的打包、清理、列举与恢复（不依赖 Qt，界面与命令行共用）
+界面中由 backup.BackupWorker / BackupManager 在后台线程调用；进度与结果通过 log(message) 回调报告。
+"""
+import os
+import shutil
+import json
+import zipfile
+import tempfile
+import logging
+import traceback
+from datetime import datetime
+
+from . import database
+
+logger = logging.getLogger(__name__)
+
+# (文件名前缀, 保留的份数)
+BACKUP_RETENTION = [("backup_snapshot_", 15), ("backup_stage_", 5), ("backup_archive_", 15)]
+
+
+def _ignore_log(message):
+    pass
+
+
+def create_backup_archive(data_manager, backup_dir, task_type, log=None):
+    """把全部书籍、章节与其他模块的数据打包为 backup_<task_type>_<时间>.zip，返回文件路径"""
+    log = log or _ignore_log
+    with tempfile.TemporaryDirectory() as temp_dir:
+        book_root_path = os.path.join(temp_dir, 'book')
+        os.makedirs(book_root_path)
+
+        all_books = data_manager.get_all_books()
+        book_list_data = []
+
+        for book in all_books:
+            book_folder_name = str(book['id'])
+            book_path = os.path.join(book_root_path, book_folder_name)
+            content_path = os.path.join(book_path, 'content')
+            os.makedirs(content_path)
+
+            # 章节列表不含正文，正文逐章单独读取
+            chapters = data_manager.get_chapters_for_book(book['id'])
+            total_word_count = 0
+            last_edit_chapter = "无章节"
+            volumes_structure = {}
+
+            for chapter in chapters:
+                content_text, _ = data_manager.get_chapter_content(chapter['id'])
+
+                total_word_count += chapter['word_count']
+                last_edit_chapter = chapter['title']
+
+                chapter_content_data = {
+                    "content": content_text,
+                    "count": chapter['word_count'],
+                    "hash": chapter.get('hash', '')
+                }
+                chapter_filename = os.path.join(content_path, f"{chapter['createTime']}.json")
+                with open(chapter_filename, 'w', encoding='utf-8') as f:
+                    json.dump(chapter_content_data, f, ensure_ascii=False, indent=4)
+
+                vol_name = chapter['volume'] or "未分卷"
+                if vol_name not in volumes_structure:
+                    volumes_structure[vol_name] = {"name": vol_name, "children": [], "createTime": None}
+                volumes_structure[vol_name]['children'].append({
+                    "name": chapter['title'], "count": chapter['word_count'],
+                    "createTime": chapter['createTime'], "volumeName": vol_name
+                })
+
+            book_data_for_json = data_manager.get_book_details(book['id'])
+            book_data_for_json['name'] = book_data_for_json.pop('title')
+            book_data_for_json['summary'] = book_data_for_json.pop('description')
+            book_data_for_json['children'] = list(volumes_structure.values())
+
+            book_json_path = os.path.join(book_path, 'book.json')
+            with open(book_json_path, 'w', encoding='utf-8') as f:
+                json.dump(book_data_for_json, f, ensure_ascii=False, indent=4)
+
+            book_list_data.append({
+                "name": book['title'], "author": "", "createTime": book['createTime'],
+                "totalCount": total_word_count, "lastEditInfo": last_edit_chapter, "id": book['id']
+            })
+
+        booklist_path = os.path.join(book_root_path, 'bookList.json')
+        with open(booklist_path, 'w', encoding='utf-8') as f:
+            json.dump(book_list_data, f, ensure_ascii=False, indent=4)
+
+        # 导出其他模块数据
+        _dump_table(data_manager.get_all_materials, os.path.join(temp_dir, 'materials.json'))
+        _dump_table(data_manager.get_all_inspiration_items, os.path.join(temp_dir, 'inspiration_items.json'))
+        _dump_table(data_manager.get_all_inspiration_fragments, os.path.join(temp_dir, 'inspiration_fragments.json'))
+        _dump_table(data_manager.get_all_timelines, os.path.join(temp_dir, 'timelines.json'))
+        _dump_table(data_manager.get_all_timeline_events, os.path.join(temp_dir, 'timeline_events.json'))
+
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        zip_filename = f"backup_{task_type}_{timestamp}.zip"
+        zip_filepath = os.path.join(backup_dir, zip_filename)
+
+        with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for root, _, files in os.walk(temp_dir):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    arcname = os.path.relpath(file_path, temp_dir)
+                    zipf.write(file_path, arcname)
+
+        log(f"本地打包成功: {zip_filename}")
+        return zip_filepath
+
+
+def _dump_table(fetch_func, filepath):
+    data = fetch_func()
+    if data:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def write_snapshot(data_manager, backup_dir, snapshot_data):
+    """快照备份：为 snapshot_data 中的章节补上正文后写为 backup_snapshot_<时间>.json，返回文件名"""
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    backup_filename = f"backup_snapshot_{timestamp}.json"
+    for chapter in snapshot_data["chapters"]:
+        chapter["content"], _ = data_manager.get_chapter_content(chapter["id"])
+    with open(os.path.join(backup_dir, backup_filename), 'w', encoding='utf-8') as f:
+        json.dump(snapshot_data, f, ensure_ascii=False, indent=2)
+    return backup_filename
+
+
+def cleanup_backups(backup_dir, log=None):
+    """每种备份只保留最近的若干份（见 BACKUP_RETENTION）"""
+    log = log or _ignore_log
+    for prefix, limit in BACKUP_RETENTION:
+        try:
+            files = [f for f in os.listdir(backup_dir) if f.startswith(prefix)]
+            files.sort(key=lambda name: os.path.getmtime(os.path.join(backup_dir, name)), reverse=True)
+            for f in files[limit:]:
+                os.remove(os.path.join(backup_dir, f))
+        except Exception as e:
+            log(f"清理 {prefix} 备份失败: {e}")
+
+
+def list_backups(backup_dir):
+    backups = []
+    try:
+        files = os.listdir(backup_dir)
+        for file in files:
+            backup_info = {"file": file, "dir": backup_dir, "source": "local"}
+            if file.startswith('backup_stage_'): backup_info["type"] = "Stage"
+            elif file.startswith('backup_archive_'): backup_info["type"] = "Archive"
+            elif file.lower().endswith('.bcb'): backup_info["type"] = "BCB 备份"
+            elif file.startswith('backup_snapshot_'): backup_info["type"] = "Snapshot"
+            else: continue
+            backups.append(backup_info)
+    except OSError: pass
+    backups.sort(key=lambda x: x['file'], reverse=True)
+    return backups
+
+
+def has_archive_for_today(backup_dir):
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    return any(f.startswith(f"backup_archive_{today_str}") for f in os.listdir(backup_dir))
+
+
+def restore_snapshot(data_manager, backup_path, log=None):
+    """把快照中的章节正文写回数据库（只覆盖快照包含的章节），返回是否成功"""
+    log = log or _ignore_log
+    if not os.path.exists(backup_path): return False
+    try:
+        with open(backup_path, 'r', encoding='utf-8') as f:
+            snapshot_data = json.load(f)
+        chapters_to_restore = snapshot_data.get("chapters", [])
+        for chapter_data in chapters_to_restore:
+            data_manager.update_chapter_content(chapter_data['id'], chapter_data['content'])
+        log(f"成功从快照恢复 {len(chapters_to_restore)} 个章节。")
+        return True
+    except Exception as e:
+        log(f"从快照恢复失败: {e}")
+        return False
+
+
+def restore_backup_archive(data_manager, backup_path, log=None, backup_type="ZIP"):
+    """
+    清空现有的写作数据，再从 ZIP 备份写入，返回是否成功
+    开始前把数据库文件复制为 .backup，恢复失败时复制回去。
+    """
+    log = log or _ignore_log
+    if not os.path.exists(backup_path):
+        log("备份文件不存在。")
+        return False
+
+    backed_up_files = []
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with zipfile.ZipFile(backup_path, 'r') as zipf:
+                zipf.extractall(temp_dir)
+
+            log(f"正在从 {backup_type} 备份 '{os.path.basename(backup_path)}' 恢复...")
+
+            # 备份当前数据库文件，防止恢复失败导致数据丢失
+            # 备份文件放在同一目录，使用 .backup 后缀
+            db_file = database.DB_FILE
+            for path in [db_file, db_file + '-shm', db_file + '-wal']:
+                if os.path.exists(path):
+                    backup_file = path + '.backup'
+                    shutil.copy2(path, backup_file)
+                    backed_up_files.append((path, backup_file))
+                    log(f"已备份数据库文件: {os.path.basename(path)} -> {os.path.basename(backup_file)}")
+
+            log("正在清空本地数据库...")
+            data_manager.clear_all_writing_data()
+            log("本地数据库已清空，准备写入备份数据...")
+
+            book_root_path = os.path.join(temp_dir, 'book')
+            booklist_path = os.path.join(book_root_path, 'bookList.json')
+            if os.path.exists(booklist_path):
+                with open(booklist_path, 'r', encoding='utf-8') as f:
+                    book_list = json.load(f)
+
+                for book_item in book_list:
+                    book_id = book_item['id']
+                    book_json_path = os.path.join(book_root_path, str(book_id), 'book.json')
+                    if os.path.exists(book_json_path):
+                        with open(book_json_path, 'r', encoding='utf-8') as f:
+                            book_data = json.load(f)
+
+                        restored_book_id = data_manager.add_book_from_backup(book_data)
+                        log(f"正在恢复书籍: {book_data.get('name')}")
+
+                        if 'children' in book_data:
+                            for volume in book_data['children']:
+                                for chapter_meta in volume['children']:
+                                    content_filename = f"{chapter_meta['createTime']}.json"
+                                    content_path = os.path.join(book_root_path, str(book_id), 'content', content_filename)
+                                    if os.path.exists(content_path):
+                                        with open(content_path, 'r', encoding='utf-8') as f:
+                                            content_data = json.load(f)
+                                        data_manager.add_chapter_from_backup(restored_book_id, chapter_meta, content_data)
+
+            # 恢复其他数据
+            materials_path = os.path.join(temp_dir, 'materials.json')
+            if not os.path.exists(materials_path): materials_path = os.path.join(temp_dir, 'settings.json')
+            if os.path.exists(materials_path):
+                with open(materials_path, 'r', encoding='utf-8') as f:
+                    for m in json.load(f): data_manager.add_material_from_backup(m)
+
+            insp_items_path = os.path.join(temp_dir, 'inspiration_items.json')
+            if os.path.exists(insp_items_path):
+                with open(insp_items_path, 'r', encoding='utf-8') as f:
+                    for i in json.load(f): data_manager.add_inspiration_item_from_backup(i)
+
+            insp_fragments_path = os.path.join(temp_dir, 'inspiration_fragments.json')
+            if os.path.exists(insp_fragments_path):
+                with open(insp_fragments_path, 'r', encoding='utf-8') as f:
+                    for frag in json.load(f): data_manager.add_inspiration_fragment_from_backup(frag)
+
+            timelines_path = os.path.join(temp_dir, 'timelines.json')
+            if os.path.exists(timelines_path):
+                with open(timelines_path, 'r', encoding='utf-8') as f:
+                    for t in json.load(f): data_manager.add_timeline_from_backup(t)
+
+            events_path = os.path.join(temp_dir, 'timeline_events.json')
+            if os.path.exists(events_path):
+                with open(events_path, 'r', encoding='utf-8') as f:
+                    for e in json.load(f): data_manager.add_timeline_event_from_backup(e)
+
+        log("数据库恢复成功。请重启应用以刷新界面。")
+        return True
+    except Exception as e:
+        # 恢复失败，尝试恢复备份的数据库文件
+        log(f"恢复失败: {e}")
+        if backed_up_files:
+            log("正在恢复备份的数据库文件...")
+            restore_success = True
+            for original_file, backup_file in backed_up_files:
+                try:
+                    shutil.copy2(backup_file, original_file)
+                    log(f"已恢复数据库文件: {os.path.basename(original_file)}")
+                except Exception as restore_error:
+                    log(f"恢复数据库文件 {os.path.basename(original_file)} 失败: {restore_error}")
+                    restore_success = False
+            if restore_success:
+                log("数据库文件已恢复至恢复前的状态。")
+            else:
+                log("警告：部分数据库文件恢复失败，数据可能不一致。")
+        else:
+            log("警告：没有可用的数据库备份文件，数据可能已丢失。")
+
+        logger.error(traceback.format_exc())
+        return False
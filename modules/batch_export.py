@@ -0,0 +1,275 @@
+# ShiCheng_Writer/modules/batch_export.py
+"""
+批量导出整个书库（或一个分组）到目标目录（不依赖 Qt，界面与命令行共用）
+每本书在独立的子进程中用只读数据库连接导出，多本书并行；目标为“目录/分组/书名.扩展名”。
+目标目录下的 manifest.json 记录每本书上次导出的格式、文件与指纹（书籍信息、目录结构与各章 hash），
+指纹未变且文件仍在的书直接跳过，只导出改过的书。
+
+命令行用法：python -m modules.batch_export 目标目录 [--group 分组] [--format txt] [--workers N] [--force]
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from . import database
+from .export_engine import EXPORT_FORMATS, ExportCancelled, export_book, safe_file_name
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+UNGROUPED = "未分组" # 与书籍树一致：没有分组的书归入“未分组”
+
+# --- 子进程 ---
+_cancel_event = None
+
+def _init_worker(cancel_event):
+    global _cancel_event
+    _cancel_event = cancel_event
+
+def _export_in_worker(db_file, book_id, target, format_name):
+    """在子进程中导出一本书：自己打开只读连接，用完即关"""
+    data_manager = database.DataManager(read_only=True, db_file=db_file)
+    try:
+        return export_book(data_manager, book_id, target, format_name, is_cancelled=_cancel_event.is_set)
+    finally:
+        data_manager.close()
+
+
+# --- 清单 ---
+def book_fingerprint(book, outline, format_name):
+    """书籍内容的指纹：书籍信息、卷的顺序与名称、各章的标题与正文 hash（只读目录元数据，不读正文）"""
+    digest = hashlib.md5()
+    fields = [format_name, book['title'], book.get('description'), book.get('cover_path'), book.get('lastEditTime')]
+    digest.update(json.dumps(fields, ensure_ascii=False).encode('utf-8'))
+    for volume in outline:
+        digest.update(json.dumps([volume['id'], volume['name']], ensure_ascii=False).encode('utf-8'))
+        for chapter in volume['chapters']:
+            digest.update(json.dumps([chapter['id'], chapter['title'], chapter['hash']], ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_manifest(target_dir):
+    path = os.path.join(target_dir, MANIFEST_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"导出清单 {path} 无法读取，将全部重新导出: {e}")
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('books', {})
+
+
+def save_manifest(target_dir, books):
+    """先写临时文件再替换，中途出错不会留下损坏的清单"""
+    path = os.path.join(target_dir, MANIFEST_NAME)
+    fd, temp_path = tempfile.mkstemp(prefix=".manifest-", suffix=".part", dir=target_dir)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'books': books}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _remove_stale_files(target_dir, old_files, new_files):
+    """书名、分组或格式改变后，删掉上次导出留下、本次不再使用的文件（及随之变空的目录）"""
+    for relative in set(old_files) - set(new_files):
+        path = os.path.join(target_dir, relative)
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        directory = os.path.dirname(path)
+        while os.path.normcase(os.path.abspath(directory)) != os.path.normcase(os.path.abspath(target_dir)):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+def _up_to_date(entry, fingerprint, target_dir):
+    return (entry is not None and entry.get('fingerprint') == fingerprint
+            and all(os.path.exists(os.path.join(target_dir, relative)) for relative in entry.get('files', [])))
+
+
+# --- 批量导出 ---
+def _plan(data_manager, target_dir, format_name, group):
+    """列出要导出的书：(book, group_name, 目标路径, 指纹)，按分组、书名排序；同一分组中重名的书在文件名后加上 id"""
+    export_format = EXPORT_FORMATS[format_name]
+    books = sorted(data_manager.get_all_books(), key=lambda book: (book['group'] or UNGROUPED, book['title'], book['id']))
+    jobs = []
+    used_names = set()
+    for book in books:
+        group_name = book['group'] or UNGROUPED
+        if group is not None and group_name != group:
+            continue
+        folder = safe_file_name(group_name)
+        name = safe_file_name(book['title'])
+        if (folder, name.casefold()) in used_names:
+            name = f"{name}_{book['id']}"
+        used_names.add((folder, name.casefold()))
+        if not export_format.directory:
+            name += export_format.extension
+        target = os.path.join(target_dir, folder, name)
+        fingerprint = book_fingerprint(book, data_manager.get_book_outline(book['id']), format_name)
+        jobs.append((book, group_name, target, fingerprint))
+    return jobs
+
+
+def export_library(target_dir, format_name='txt', group=None, workers=None, force=False,
+                   progress=None, is_cancelled=None, db_file=None):
+    """
+    把书库中的全部书籍（group 不为 None 时只导出该分组）导出到 target_dir
+    每本书一个子进程任务（最多 workers 个并行，默认 CPU 核数）；未修改的书按清单跳过，force 为 True 时全部重新导出。
+    progress(done, total, title) 每处理完一本书调用一次；is_cancelled() 返回 True 时停止派发、通知子进程中止，
+    已完成的书仍写入清单，然后抛出 ExportCancelled。
+    返回 {'exported': [...], 'skipped': [...], 'failed': [...], 'manifest': 清单路径}
+    """
+    if format_name not in EXPORT_FORMATS:
+        raise ValueError(f"未知的导出格式: {format_name}")
+    db_file = os.path.abspath(db_file or database.DB_FILE)
+    target_dir = os.path.abspath(target_dir)
+    os.makedirs(target_dir, exist_ok=True)
+
+    data_manager = database.DataManager(read_only=True, db_file=db_file)
+    try:
+        with data_manager._read_snapshot():
+            jobs = _plan(data_manager, target_dir, format_name, group)
+    finally:
+        data_manager.close()
+
+    manifest = load_manifest(target_dir)
+    summary = {'exported': [], 'skipped': [], 'failed': [], 'manifest': os.path.join(target_dir, MANIFEST_NAME)}
+    total = len(jobs)
+    done = 0
+    pending = []
+    for book, group_name, target, fingerprint in jobs:
+        if not force and _up_to_date(manifest.get(str(book['id'])), fingerprint, target_dir):
+            summary['skipped'].append({'id': book['id'], 'title': book['title']})
+            done += 1
+            if progress is not None:
+                progress(done, total, book['title'])
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            pending.append((book, group_name, target, fingerprint))
+
+    def record(job, result=None, error=None):
+        nonlocal done
+        book, group_name, target, fingerprint = job
+        done += 1
+        if error is not None:
+            logger.error(f"批量导出《{book['title']}》失败: {error}")
+            summary['failed'].append({'id': book['id'], 'title': book['title'], 'error': str(error)})
+        else:
+            files = [os.path.relpath(path, target_dir) for path in result['files']]
+            old_entry = manifest.get(str(book['id']))
+            if old_entry:
+                _remove_stale_files(target_dir, old_entry.get('files', []), files)
+            manifest[str(book['id'])] = {
+                'title': book['title'], 'group': group_name, 'format': format_name, 'files': files,
+                'fingerprint': fingerprint, 'lastEditTime': book.get('lastEditTime'),
+                'exported_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            summary['exported'].append({'id': book['id'], 'title': book['title'], 'files': files,
+                                        'chapters': result['chapters'], 'characters': result['characters']})
+        if progress is not None:
+            progress(done, total, book['title'])
+
+    try:
+        if pending:
+            workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+            if workers == 1:
+                _export_serially(pending, db_file, format_name, record, is_cancelled)
+            else:
+                _export_in_processes(pending, db_file, format_name, workers, record, is_cancelled)
+    finally:
+        if pending:
+            save_manifest(target_dir, manifest)
+    logger.info(f"批量导出到 {target_dir}: 导出 {len(summary['exported'])} 本, 跳过 {len(summary['skipped'])} 本, "
+                f"失败 {len(summary['failed'])} 本")
+    return summary
+
+
+def _export_serially(jobs, db_file, format_name, record, is_cancelled):
+    """只有一本要导出或只允许一个并行任务时，在当前进程中导出，省去启动子进程的开销"""
+    data_manager = database.DataManager(read_only=True, db_file=db_file)
+    try:
+        for job in jobs:
+            book, _group_name, target, _fingerprint = job
+            try:
+                result = export_book(data_manager, book['id'], target, format_name, is_cancelled=is_cancelled)
+            except ExportCancelled:
+                raise
+            except Exception as e:
+                record(job, error=e)
+            else:
+                record(job, result)
+    finally:
+        data_manager.close()
+
+
+def _export_in_processes(jobs, db_file, format_name, workers, record, is_cancelled):
+    # spawn：子进程不继承父进程的数据库连接、锁与 Qt 状态，各平台行为一致
+    context = multiprocessing.get_context('spawn')
+    cancel_event = context.Event()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(cancel_event,)) as executor:
+        futures = {executor.submit(_export_in_worker, db_file, job[0]['id'], job[2], format_name): job for job in jobs}
+        remaining = set(futures)
+        cancelled = False
+        while remaining:
+            finished, remaining = wait(remaining, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future.cancelled():
+                    continue
+                error = future.exception()
+                if isinstance(error, ExportCancelled):
+                    continue
+                if error is not None:
+                    record(futures[future], error=error)
+                else:
+                    record(futures[future], future.result())
+            if not cancelled and is_cancelled is not None and is_cancelled():
+                cancelled = True
+                cancel_event.set() # 正在导出的书中止并删除临时文件
+                for future in remaining:
+                    future.cancel()
+        if cancelled:
+            raise ExportCancelled()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules.batch_export", description="批量导出书库中的书籍")
+    parser.add_argument("target", help="导出目录")
+    parser.add_argument("--group", help="只导出该分组（没有分组的书为“未分组”）")
+    parser.add_argument("--format", default='txt', choices=sorted(EXPORT_FORMATS), help="导出格式，默认 txt")
+    parser.add_argument("--workers", type=int, help="并行的导出进程数，默认为 CPU 核数")
+    parser.add_argument("--force", action='store_true', help="未修改的书也重新导出")
+    parser.add_argument("--db", help="数据库文件，默认为程序目录下的 ShiCheng_Writer.db")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    summary = export_library(args.target, args.format, group=args.group, workers=args.workers, force=args.force,
+                             db_file=args.db)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
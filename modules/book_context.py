@@ -0,0 +1,139 @@
+# ShiCheng_Writer/modules/book_context.py
+from collections import OrderedDict
+from PySide6.QtCore import QObject
+
+# 这些字段以外的章节更新（移动、换卷）会改变目录结构，缓存项直接作废
+_CHAPTER_PATCH_FIELDS = {'title', 'word_count', 'lastEditTime', 'hash', 'snippet'}
+
+class _Entry:
+    """一本书的缓存数据，附带按 id 查找章节与素材的索引"""
+    __slots__ = ('context', 'chapters', 'volume_ids', 'material_ids')
+
+    def __init__(self, context):
+        self.context = context
+        self.chapters = {chapter['id']: chapter for volume in context['outline'] for chapter in volume['chapters']}
+        self.volume_ids = {volume['id'] for volume in context['outline']}
+        self.material_ids = {material['id'] for material in context['materials']}
+
+
+class BookContextLoader(QObject):
+    """
+    切换书籍时的数据载入
+    书籍信息、目录、素材与时间轴由 DataManager.get_book_context() 在一个读事务中取出，按书缓存（LRU）；
+    显示一本书后在后台预取书籍树中与它相邻的书，上下切换时直接使用缓存。
+    数据变更时修补或丢弃受影响的缓存项；正在显示的书由各面板按变更逐行更新，不依赖缓存。
+    """
+    def __init__(self, async_data, capacity=8, parent=None):
+        super().__init__(parent)
+        self.async_data = async_data
+        self.capacity = capacity
+        self._entries = OrderedDict() # book_id -> _Entry
+        self._pending = {} # book_id -> 正在预取的 Future
+        # 缓存项作废时递增；查询返回时代数已变（期间数据有变更）则结果不放入缓存
+        self._generations = {}
+        self._epoch = 0
+
+    def get(self, book_id):
+        """已缓存的数据，未缓存时返回 None"""
+        entry = self._entries.get(book_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(book_id)
+        return entry.context
+
+    def load(self, book_id, callback):
+        """
+        取一本书的数据，callback(context) 在界面线程中调用（书籍不存在时 context 为 None）
+        已缓存时立即回调；否则后台读取，同一时刻只保留最后一次 load 的回调（快速切换书籍时）
+        """
+        context = self.get(book_id)
+        if context is not None:
+            callback(context)
+            return
+        stamp = self._stamp(book_id)
+        def deliver(result):
+            self._store(book_id, stamp, result)
+            callback(result)
+        self.async_data.fetch('get_book_context', book_id, key='book_context', callback=deliver)
+
+    def prefetch(self, book_ids):
+        """后台预取尚未缓存的书"""
+        for book_id in book_ids:
+            if book_id in self._entries or book_id in self._pending:
+                continue
+            stamp = self._stamp(book_id)
+            self._pending[book_id] = self.async_data.fetch(
+                'get_book_context', book_id,
+                callback=lambda result, book_id=book_id, stamp=stamp: self._prefetched(book_id, stamp, result),
+                error_callback=lambda error, book_id=book_id: self._pending.pop(book_id, None))
+
+    def invalidate(self, book_id):
+        self._entries.pop(book_id, None)
+        self._generations[book_id] = self._generations.get(book_id, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    def apply_changes(self, changes):
+        """按数据变更修补或丢弃缓存项"""
+        for change in changes:
+            entity, fields = change.entity, change.fields
+            if entity not in ('book', 'group', 'chapter', 'volume', 'material', 'timeline'):
+                continue
+            if change.op == 'reset' or entity == 'group':
+                self.clear()
+            elif entity == 'book':
+                entry = self._entries.get(change.id)
+                if change.op == 'update' and entry is not None and set(fields) <= {'lastEditTime'}:
+                    entry.context['book'].update(fields) # 保存正文时只更新了编辑时间
+                else:
+                    self.invalidate(change.id)
+            elif entity == 'chapter':
+                book_id = fields.get('book_id')
+                if book_id is None:
+                    book_id = next((book_id for book_id, entry in self._entries.items() if change.id in entry.chapters), None)
+                if book_id is None:
+                    self._epoch += 1 # 不知属于哪本书：只让查询中的结果作废
+                    continue
+                entry = self._entries.get(book_id)
+                if change.op == 'update' and entry is not None and set(fields) <= _CHAPTER_PATCH_FIELDS:
+                    entry.chapters[change.id].update(fields)
+                else:
+                    self.invalidate(book_id)
+            elif entity == 'volume':
+                book_id = fields.get('book_id')
+                if book_id is None:
+                    book_id = next((book_id for book_id, entry in self._entries.items() if change.id in entry.volume_ids), None)
+                if book_id is None:
+                    self._epoch += 1
+                else:
+                    self.invalidate(book_id)
+            elif entity == 'material':
+                if 'book_id' in fields:
+                    if fields['book_id'] is None:
+                        self.clear() # 全局素材属于每一本书
+                    else:
+                        self.invalidate(fields['book_id'])
+                    continue
+                for book_id in [book_id for book_id, entry in self._entries.items() if change.id in entry.material_ids]:
+                    self.invalidate(book_id)
+            elif entity == 'timeline':
+                if fields.get('book_id') is not None:
+                    self.invalidate(fields['book_id'])
+
+    def _stamp(self, book_id):
+        return self._epoch, self._generations.get(book_id, 0)
+
+    def _store(self, book_id, stamp, context):
+        if context is None or stamp != self._stamp(book_id):
+            return
+        self._entries[book_id] = _Entry(context)
+        self._entries.move_to_end(book_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def _prefetched(self, book_id, stamp, context):
+        self._pending.pop(book_id, None)
+        self._store(book_id, stamp, context)
@@ -0,0 +1,88 @@
+# ShiCheng_Writer/modules/book_search.py
+import re
+import logging
+from PySide6.QtCore import QThread, Signal
+
+from .database import DataManager
+
+logger = logging.getLogger(__name__)
+
+def compile_search_pattern(text, case_sensitive=False, whole_words=False):
+    """根据查找选项构造正则（查找内容按字面匹配）"""
+    if not text:
+        return None
+    pattern = re.escape(text)
+    if whole_words:
+        pattern = rf"\b{pattern}\b"
+    flags = 0 if case_sensitive else re.IGNORECASE
+    return re.compile(pattern, flags)
+
+def find_matches(pattern, content, context=15):
+    """
+    在正文中查找所有匹配项
+    返回 [{'start', 'length', 'preview'}]，偏移量以 Python 字符为单位，
+    与 DataManager.replace_in_chapters 的替换偏移一致。
+    """
+    matches = []
+    if not content:
+        return matches
+    for match in pattern.finditer(content):
+        start, end = match.span()
+        if start == end:
+            continue
+        before = content[max(0, start - context):start].replace('\n', ' ')
+        after = content[end:end + context].replace('\n', ' ')
+        matches.append({
+            'start': start,
+            'length': end - start,
+            'preview': f"…{before}【{match.group(0)}】{after}…",
+        })
+    return matches
+
+
+class BookSearchWorker(QThread):
+    """
+    全书/全库搜索工作线程
+    使用独立的数据库连接逐章扫描，命中结果按章节流式发送给界面。
+    """
+    chapter_matched = Signal(dict) # 章节信息 + 命中列表
+    progress = Signal(int, int) # scanned, total
+    search_finished = Signal(int, int) # 命中章节数, 命中总数
+
+    def __init__(self, pattern, book_id=None, parent=None):
+        super().__init__(parent)
+        self.pattern = pattern
+        self.book_id = book_id # None 表示搜索全部书籍
+
+    def run(self):
+        # 在线程内部实例化 DataManager，确保数据库连接线程安全
+        local_data_manager = DataManager()
+        matched_chapters = 0
+        total_hits = 0
+        try:
+            total = local_data_manager.count_chapters(self.book_id)
+            scanned = 0
+            for chapter in local_data_manager.iter_chapter_contents(self.book_id):
+                if self.isInterruptionRequested():
+                    break
+                scanned += 1
+                hits = find_matches(self.pattern, chapter['content'])
+                if hits:
+                    matched_chapters += 1
+                    total_hits += len(hits)
+                    self.chapter_matched.emit({
+                        'id': chapter['id'],
+                        'book_id': chapter['book_id'],
+                        'book_title': chapter['book_title'],
+                        'volume': chapter['volume'] or "未分卷",
+                        'title': chapter['title'],
+                        'hash': chapter['hash'],
+                        'hits': hits,
+                    })
+                if scanned % 20 == 0 or scanned == total:
+                    self.progress.emit(scanned, total)
+        except Exception as e:
+            logger.error(f"全书搜索失败: {e}", exc_info=True)
+        finally:
+            local_data_manager.close()
+            self.search_finished.emit(matched_chapters, total_hits)
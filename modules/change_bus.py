@@ -0,0 +1,28 @@
+# ShiCheng_Writer/modules/change_bus.py
+from PySide6.QtCore import QObject, Signal, Qt
+
+from .database import add_change_listener, remove_change_listener
+
+class ChangeBus(QObject):
+    """
+    数据变更总线
+    DataManager 在事务提交后通知变更（可能在写队列、查询线程池等后台线程中），
+    总线把变更排队转发到本对象所在的（界面）线程，按提交顺序以 changed(list[DataChange]) 发出。
+    界面线程自身的写操作同样经事件循环转发，接收方不会在 DataManager 方法返回之前被调用。
+    面板据此逐行插入、更新、删除条目，不必整体重建模型。
+    """
+    changed = Signal(object) # DataChange 列表
+    _posted = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._posted.connect(self._deliver, Qt.QueuedConnection)
+        self._listener = self._posted.emit
+        add_change_listener(self._listener)
+
+    def close(self):
+        """停止接收通知（程序退出时调用）"""
+        remove_change_listener(self._listener)
+
+    def _deliver(self, changes):
+        self.changed.emit(changes)
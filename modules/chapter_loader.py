@@ -0,0 +1,43 @@
+# ShiCheng_Writer/modules/chapter_loader.py
+import logging
+from PySide6.QtCore import QThread, Signal
+
+from .database import DataManager
+
+logger = logging.getLogger(__name__)
+
+class ChapterLoadWorker(QThread):
+    """
+    章节异步加载线程
+    在独立连接中读取章节正文及所属书籍的总字数，避免大章节读取阻塞界面。
+    request_id 由调用方生成，用于丢弃已被新请求取代的结果（用户快速切换章节时）。
+    """
+    loaded = Signal(dict) # {'request_id', 'chapter_id', 'content', 'word_count', 'book_word_count'}
+
+    def __init__(self, request_id, chapter_id, book_id=None, parent=None):
+        super().__init__(parent)
+        self.request_id = request_id
+        self.chapter_id = chapter_id
+        self.book_id = book_id
+
+    def run(self):
+        # 在线程内部实例化 DataManager，确保数据库连接线程安全
+        local_data_manager = DataManager()
+        result = {
+            'request_id': self.request_id,
+            'chapter_id': self.chapter_id,
+            'content': "",
+            'word_count': 0,
+            'book_word_count': None,
+        }
+        try:
+            content, word_count = local_data_manager.get_chapter_content(self.chapter_id)
+            result['content'] = content or ""
+            result['word_count'] = word_count or 0
+            if self.book_id and not self.isInterruptionRequested():
+                result['book_word_count'] = local_data_manager.get_book_word_count(self.book_id)
+        except Exception as e:
+            logger.error(f"加载章节 {self.chapter_id} 失败: {e}", exc_info=True)
+        finally:
+            local_data_manager.close()
+        self.loaded.emit(result)
@@ -0,0 +1,161 @@
+# ShiCheng_Writer/modules/content_cache.py
+"""
+章节正文 LRU 缓存（进程内共享，不依赖 Qt）
+所有 DataManager 实例（界面线程、写队列、查询线程池、章节加载线程）共用一个缓存，按章节 id 存放正文及其 hash。
+本进程内的写操作在事务提交后直接更新或作废缓存条目；其他连接（其他线程或进程）提交的修改由
+DataManager 通过 PRAGMA data_version 发现，此时调用 invalidate()，之前的条目在下次命中时先按 hash 校验。
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ('hash', 'content', 'word_count', 'size', 'epoch')
+
+    def __init__(self, content_hash, content, word_count, epoch):
+        self.hash = content_hash
+        self.content = content
+        self.word_count = word_count
+        self.size = sys.getsizeof(content)
+        self.epoch = epoch
+
+
+class ChapterContentCache:
+    """
+    容量按正文占用的内存字节数计算（sys.getsizeof），超出 max_bytes 时淘汰最久未用的条目。
+    条目记录放入时的纪元（epoch）；invalidate() 使纪元加一，旧纪元的条目命中时需按 hash 校验，一致才返回。
+    """
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # chapter_id -> _Entry，末尾为最近使用
+        self._bytes = 0
+        self._epoch = 0
+        self._mutations = 0 # 写入、作废的次数，用于识别读取期间发生的修改
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.validations = 0 # 旧纪元条目经 hash 校验后命中
+        self.stale = 0 # 校验不一致而作废
+        self.evictions = 0
+
+    def set_max_bytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._trim()
+
+    def get(self, chapter_id, fetch_hash, validate=False):
+        """
+        返回缓存的 (content, word_count)，未命中返回 None
+        条目属于旧纪元或 validate 为 True 时调用 fetch_hash() 读取数据库中的 hash 校验（不持有锁）。
+        """
+        with self._lock:
+            entry = self._entries.get(chapter_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            epoch = self._epoch
+            fresh = entry.epoch == epoch and not validate
+        if not fresh:
+            if fetch_hash() != entry.hash:
+                with self._lock:
+                    self.stale += 1
+                    self.misses += 1
+                    if self._entries.get(chapter_id) is entry:
+                        self._remove(chapter_id)
+                return None
+            with self._lock:
+                self.validations += 1
+                entry.epoch = max(entry.epoch, epoch)
+        with self._lock:
+            self.hits += 1
+            if self._entries.get(chapter_id) is entry:
+                self._entries.move_to_end(chapter_id)
+        return entry.content, entry.word_count
+
+    def begin_fill(self):
+        """从数据库读取正文之前调用，返回的标记交给 fill()"""
+        with self._lock:
+            return self._epoch, self._mutations
+
+    def fill(self, token, chapter_id, content_hash, content, word_count):
+        """
+        放入从数据库读到的正文
+        读取期间若有其他写入或作废（可能是同一章节较新的内容），条目标记为需要校验，避免以旧内容覆盖新内容后被直接信任。
+        """
+        epoch, mutations = token
+        with self._lock:
+            if mutations != self._mutations:
+                existing = self._entries.get(chapter_id)
+                if existing is not None and existing.hash != content_hash:
+                    return # 保留写入方放入的条目，由校验决定取舍
+                epoch = -1
+            self._store(chapter_id, _Entry(content_hash, content, word_count, epoch))
+
+    def store(self, chapter_id, content_hash, content, word_count):
+        """写操作提交后放入最新的正文"""
+        with self._lock:
+            self._mutations += 1
+            self._store(chapter_id, _Entry(content_hash, content, word_count, self._epoch))
+
+    def discard(self, chapter_id):
+        with self._lock:
+            self._mutations += 1
+            if chapter_id in self._entries:
+                self._remove(chapter_id)
+
+    def clear(self):
+        with self._lock:
+            self._mutations += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def invalidate(self):
+        """其他连接提交了修改：现有条目在下次命中时都需按 hash 校验"""
+        with self._lock:
+            self._epoch += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'validations': self.validations,
+                'stale': self.stale,
+                'evictions': self.evictions,
+            }
+
+    # --- 以下须持有锁 ---
+
+    def _store(self, chapter_id, entry):
+        if chapter_id in self._entries:
+            self._remove(chapter_id)
+        if entry.size > self.max_bytes:
+            return # 单个章节超过容量，不缓存
+        self._entries[chapter_id] = entry
+        self._bytes += entry.size
+        self._trim()
+
+    def _remove(self, chapter_id):
+        entry = self._entries.pop(chapter_id)
+        self._bytes -= entry.size
+
+    def _trim(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _chapter_id, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+
+chapter_content_cache = ChapterContentCache()
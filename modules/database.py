@@ -1,173 +1,185 @@
 # ShiCheng_Writer/modules/database.py
 import sqlite3
 import os
+import pathlib
 import json
 from datetime import datetime
 import threading
 import hashlib
 import logging
+from contextlib import contextmanager
+from collections import namedtuple
 from .utils import get_app_root
+from .content_cache import chapter_content_cache
+from .text_utils import chapter_snippet
+from .migrations import migrate
+from .order_keys import key_between, keys_between
 
 DB_FILE = os.path.join(get_app_root(), "ShiCheng_Writer.db")
+# 章节元数据列（均包含在覆盖索引 idx_chapters_meta 中，读取时不触及正文）
+CHAPTER_META_COLUMNS = ('id', 'book_id', 'volume_id', 'order_key', 'title', 'word_count', 'createTime', 'lastEditTime',
+                        'hash', 'snippet')
+# 可排序的条目：(表, 按组内顺序的索引, 按 id 读取排序键用的索引, 排序组的列)；章节在卷内排序，卷在书内排序
+_ORDER_SCOPES = {
+    'chapter': ('chapters', 'idx_chapters_order', 'INDEXED BY idx_chapters_meta', ('book_id', 'volume_id')),
+    'volume': ('volumes', 'idx_volumes_book_order', '', ('book_id',)),
+}
 logger = logging.getLogger(__name__)
 
 def calculate_hash(content):
     return hashlib.md5(content.encode('utf-8')).hexdigest()
 
-def get_db_connection():
-    """获取数据库连接"""
-    conn = sqlite3.connect(DB_FILE)
+# --- 数据变更通知 ---
+# entity: 'book' / 'group' / 'chapter' / 'volume' / 'material' / 'inspiration_fragment' / 'inspiration_item'
+#         / 'timeline' / 'timeline_event' / 'recycle_bin' / 'preference'
+# op: 'insert' / 'update' / 'delete'，以及 'reset'（大量数据被整体改写，id 为 None，fields 给出范围，接收方应重新读取）
+# fields: 变更后的字段值（不含正文等大字段）
+DataChange = namedtuple('DataChange', ['entity', 'id', 'op', 'fields'])
+
+_change_listeners = []
+
+
+def add_change_listener(listener):
+    """
+    注册数据变更监听器 listener(changes)，changes 为 DataChange 列表
+    事务提交后在执行写操作的线程中调用（写队列、查询线程池中的 DataManager 同样会通知），回滚的变更不会通知。
+    """
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener):
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+
+def get_db_connection(read_only=False, db_file=None):
+    """获取数据库连接；read_only 时以只读方式打开（批量导出的子进程等只读取数据的场合）"""
+    path = os.path.abspath(db_file or DB_FILE)
+    if read_only:
+        conn = sqlite3.connect(f"{pathlib.Path(path).as_uri()}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+    conn = sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
     return conn
 
 def initialize_database():
-    """初始化数据库"""
+    """初始化数据库：按 PRAGMA user_version 执行尚未应用的结构迁移（见 migrations.py）"""
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS books (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT,
-        cover_path TEXT,
-        "group" TEXT,
-        createTime INTEGER,
-        lastEditTime INTEGER
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS chapters (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        book_id INTEGER NOT NULL,
-        volume TEXT,
-        title TEXT NOT NULL,
-        content TEXT,
-        word_count INTEGER DEFAULT 0,
-        createTime INTEGER,
-        lastEditTime INTEGER,
-        hash TEXT,
-        FOREIGN KEY (book_id) REFERENCES books (id) ON DELETE CASCADE
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS materials (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        type TEXT NOT NULL,
-        description TEXT,
-        content TEXT,
-        book_id INTEGER,
-        FOREIGN KEY (book_id) REFERENCES books (id) ON DELETE CASCADE,
-        UNIQUE(name, book_id)
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS recycle_bin (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        item_type TEXT NOT NULL,
-        item_id INTEGER NOT NULL,
-        item_data TEXT,
-        deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS inspiration_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        content TEXT,
-        tags TEXT,
-        parent_id INTEGER,
-        FOREIGN KEY (parent_id) REFERENCES inspiration_items (id) ON DELETE CASCADE
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS inspiration_fragments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        type TEXT NOT NULL,
-        content TEXT NOT NULL,
-        source TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS preferences (
-        key TEXT PRIMARY KEY,
-        value TEXT
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS timelines (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        book_id INTEGER NOT NULL,
-        name TEXT NOT NULL,
-        description TEXT,
-        FOREIGN KEY (book_id) REFERENCES books (id) ON DELETE CASCADE
-    )
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS timeline_events (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timeline_id INTEGER NOT NULL,
-        parent_id INTEGER,
-        title TEXT NOT NULL,
-        content TEXT,
-        event_time TEXT,
-        order_index INTEGER DEFAULT 0,
-        status TEXT,
-        referenced_materials TEXT,
-        FOREIGN KEY (timeline_id) REFERENCES timelines (id) ON DELETE CASCADE,
-        FOREIGN KEY (parent_id) REFERENCES timeline_events (id) ON DELETE CASCADE
-    )
-    """)
-
-    # 创建性能索引
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_book_id ON chapters(book_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_last_edit ON chapters(lastEditTime DESC)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_volume ON chapters(volume)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_group ON books(\"group\")")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_materials_book_id ON materials(book_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_timelines_book_id ON timelines(book_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_timeline_events_timeline_id ON timeline_events(timeline_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recycle_bin_deleted_at ON recycle_bin(deleted_at DESC)")
-
-    # 迁移逻辑
     try:
-        cursor.execute("PRAGMA table_info(settings)")
-        if cursor.fetchone():
-            cursor.execute("ALTER TABLE settings RENAME TO materials")
-    except sqlite3.OperationalError:
-        pass 
-        
-    cursor.execute("PRAGMA table_info(books)")
-    columns = [row['name'] for row in cursor.fetchall()]
-    if 'cover_path' not in columns:
-        cursor.execute("ALTER TABLE books ADD COLUMN cover_path TEXT")
-    if 'group' not in columns:
-        cursor.execute("ALTER TABLE books ADD COLUMN 'group' TEXT")
-    if 'createTime' not in columns:
-        cursor.execute("ALTER TABLE books ADD COLUMN createTime INTEGER")
-    if 'lastEditTime' not in columns:
-        cursor.execute("ALTER TABLE books ADD COLUMN lastEditTime INTEGER")
-        
-    cursor.execute("PRAGMA table_info(chapters)")
-    columns = [row['name'] for row in cursor.fetchall()]
-    if 'createTime' not in columns:
-        cursor.execute("ALTER TABLE chapters ADD COLUMN createTime INTEGER")
-    if 'hash' not in columns:
-        cursor.execute("ALTER TABLE chapters ADD COLUMN hash TEXT")
-    if 'lastEditTime' not in columns:
-        cursor.execute("ALTER TABLE chapters ADD COLUMN lastEditTime INTEGER")
-
-    conn.commit()
-    conn.close()
+        migrate(conn)
+    finally:
+        conn.close()
+
+
+def _recycle_metadata(item_type, item_id, item_data):
+    """回收站条目的元数据列 (title, book_id, chapter_count)，在写入时与 item_data 一并保存"""
+    if item_type == 'book':
+        return item_data.get('title'), item_id, None
+    if item_type == 'chapter':
+        return item_data.get('title'), item_data.get('book_id'), None
+    # revision：只涉及一本书时 item_id 即书籍 id，否则为 0
+    return item_data.get('title'), item_id or None, len(item_data.get('chapters', []))
+
 
 class DataManager:
     """数据管理类，封装所有数据库操作"""
-    def __init__(self):
-        self.conn = get_db_connection()
-        self.lock = threading.Lock()
+    def __init__(self, read_only=False, db_file=None):
+        self.conn = get_db_connection(read_only, db_file)
+        # 可重入锁：delete_book / delete_chapter 等方法会在持锁时调用其他查询方法
+        self.lock = threading.RLock()
+        self._batch_depth = 0 # batch() 的嵌套层数，大于 0 时写操作改用 SAVEPOINT
+        self._savepoint_id = 0
+        self._pending_changes = [] # 当前事务中记录的 DataChange，提交后统一通知
+        self._pending_contents = {} # chapter_id -> (hash, 正文)：当前事务写入的正文，提交后放入正文缓存
+        self._data_version = None # 上次读取的 PRAGMA data_version，变化表示其他连接提交过修改
+
+    def _notify(self, entity, item_id, op, **fields):
+        """记录一条数据变更（须在 _transaction() 内调用），事务提交后通知监听器"""
+        self._pending_changes.append(DataChange(entity, item_id, op, fields))
+
+    def _discard_changes(self, mark=0):
+        # 事务或 SAVEPOINT 回滚：丢弃其中记录的变更与正文
+        for change in self._pending_changes[mark:]:
+            if change.entity == 'chapter':
+                self._pending_contents.pop(change.id, None)
+        del self._pending_changes[mark:]
+
+    def _publish_changes(self):
+        changes, self._pending_changes = self._pending_changes, []
+        contents, self._pending_contents = self._pending_contents, {}
+        if not changes:
+            return
+        self._update_content_cache(changes, contents)
+        for listener in list(_change_listeners):
+            try:
+                listener(changes)
+            except Exception as e:
+                logger.error(f"数据变更通知出错: {e}", exc_info=True)
+
+    @contextmanager
+    def _transaction(self):
+        """
+        写操作的事务
+        单独调用时自成一个事务并提交；在 batch() 中改用 SAVEPOINT，失败时只回滚当前操作，整批最后一起提交。
+        """
+        with self.lock:
+            mark = len(self._pending_changes)
+            if not self._batch_depth:
+                try:
+                    with self.conn:
+                        yield
+                except BaseException:
+                    self._discard_changes(mark)
+                    raise
+                self._publish_changes()
+                return
+            self._savepoint_id += 1
+            name = f"op_{self._savepoint_id}"
+            self.conn.execute(f"SAVEPOINT {name}")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute(f"ROLLBACK TO {name}")
+                self.conn.execute(f"RELEASE {name}")
+                self._discard_changes(mark)
+                raise
+            self.conn.execute(f"RELEASE {name}")
+
+    @contextmanager
+    def _read_snapshot(self):
+        """多条查询在同一个读事务中执行，读到同一时刻的数据（WAL 模式下不阻塞写连接）"""
+        with self.lock:
+            if self.conn.in_transaction:
+                yield
+                return
+            self.conn.execute("BEGIN")
+            try:
+                yield
+            finally:
+                self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """将多个写操作合并为一个事务（只提交、落盘一次），供后台写队列使用"""
+        with self.lock:
+            outermost = self._batch_depth == 0
+            if outermost:
+                self.conn.execute("BEGIN")
+            self._batch_depth += 1
+            try:
+                yield
+            except BaseException:
+                self._batch_depth -= 1
+                if outermost:
+                    self.conn.rollback()
+                    self._discard_changes()
+                raise
+            self._batch_depth -= 1
+            if outermost:
+                self.conn.commit()
+                self._publish_changes()
 
     def get_preference(self, key, default=None):
         with self.lock:
@@ -178,9 +190,10 @@ class DataManager:
 
     def set_preference(self, key, value):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("INSERT OR REPLACE INTO preferences (key, value) VALUES (?, ?)", (key, value))
+                self._notify('preference', key, 'update', value=value)
 
 
     def get_books_and_groups(self):
@@ -211,24 +224,30 @@ class DataManager:
     def get_book_word_count(self, book_id):
         with self.lock:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT SUM(word_count) as total FROM chapters WHERE book_id = ?", (book_id,))
+            cursor.execute("""
+                SELECT SUM(m.word_count) as total
+                FROM chapters c INDEXED BY idx_chapters_order
+                JOIN chapters m INDEXED BY idx_chapters_meta ON m.id = c.id
+                WHERE c.book_id = ?
+            """, (book_id,))
             result = cursor.fetchone()
             return result['total'] if result and result['total'] is not None else 0
 
     def add_book(self, title, description="", cover_path="", group=""):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 current_time = int(datetime.now().timestamp() * 1000)
                 cursor = self.conn.cursor()
                 cursor.execute("""
                     INSERT INTO books (title, description, cover_path, "group", createTime, lastEditTime)
                     VALUES (?, ?, ?, ?, ?, ?)
                     """, (title, description, cover_path, group, current_time, current_time))
+                self._notify('book', cursor.lastrowid, 'insert', title=title, group=group)
                 return cursor.lastrowid
 
     def add_book_from_backup(self, book_data):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 backup_id = book_data.get('id')
                 cursor.execute("""
@@ -242,19 +261,22 @@ class DataManager:
                     book_data.get('createTime'),
                     book_data.get('lastEditTime', book_data.get('createTime'))
                 ))
-                if backup_id is None:
-                    return cursor.lastrowid
-                return backup_id
+                book_id = cursor.lastrowid if backup_id is None else backup_id
+                self._notify('book', book_id, 'insert',
+                             title=book_data.get('name', '无标题'), group=book_data.get('group', '未分组'))
+                return book_id
 
     def update_book(self, book_id, title, description, cover_path, group):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("""
                     UPDATE books
                     SET title = ?, description = ?, cover_path = ?, `group` = ?
                     WHERE id = ?
                 """, (title, description, cover_path, group, book_id))
+                self._notify('book', book_id, 'update', title=title, description=description,
+                             cover_path=cover_path, group=group)
 
     def delete_book(self, book_id):
         with self.lock:
@@ -262,133 +284,664 @@ class DataManager:
             if not book_data:
                 return
             
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
-                cursor.execute("INSERT INTO recycle_bin (item_type, item_id, item_data) VALUES (?, ?, ?)",
-                            ('book', book_id, json.dumps(dict(book_data))))
+                self._insert_recycle_item(cursor, 'book', book_id, dict(book_data))
                 cursor.execute("DELETE FROM books WHERE id = ?", (book_id,))
+                self._notify('book', book_id, 'delete')
+
+    def get_book_context(self, book_id):
+        """
+        切换书籍时所需的全部数据，在同一个读事务中读取：
+        {'book', 'outline', 'chapter_count', 'materials', 'material_name_index', 'timelines'}；书籍不存在时返回 None
+        """
+        with self._read_snapshot():
+            book = self.get_book_details(book_id)
+            if book is None:
+                return None
+            outline = self.get_book_outline(book_id)
+            materials = self.get_materials(book_id)
+            timelines = self.get_timelines_for_book(book_id)
+        # 与 get_material_name_index 一致：本书素材与全局素材重名时以本书素材为准
+        material_name_index = {material['name']: material['id'] for material in materials if material['book_id'] is None}
+        material_name_index.update((material['name'], material['id']) for material in materials if material['book_id'] is not None)
+        return {
+            'book': book,
+            'outline': outline,
+            'chapter_count': sum(len(volume['chapters']) for volume in outline),
+            'materials': materials,
+            'material_name_index': material_name_index,
+            'timelines': timelines,
+        }
+
+    def get_volumes(self, book_id):
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT id, book_id, name, order_key FROM volumes WHERE book_id = ? ORDER BY order_key, id",
+                           (book_id,))
+            return [dict(row) for row in cursor.fetchall()]
 
-    def get_chapters_for_book(self, book_id):
+    def get_book_outline(self, book_id):
+        """
+        书籍目录：按顺序排列的卷（含空卷），每卷的 'chapters' 为按顺序排列的章节元数据
+        章节按 idx_chapters_order 的顺序扫描，再从元数据索引取各列，不排序、不触及正文。
+        """
         with self.lock:
+            volumes = self.get_volumes(book_id)
             cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT id, book_id, volume, title, word_count, createTime, lastEditTime, hash 
-                FROM chapters WHERE book_id = ? ORDER BY volume, id
+            cursor.execute(f"""
+                SELECT {self._meta_columns('m')}
+                FROM chapters c INDEXED BY idx_chapters_order
+                JOIN chapters m INDEXED BY idx_chapters_meta ON m.id = c.id
+                WHERE c.book_id = ? ORDER BY c.book_id, c.volume_id, c.order_key
             """, (book_id,))
-            return [dict(row) for row in cursor.fetchall()]
+            by_volume = {}
+            for row in cursor.fetchall():
+                by_volume.setdefault(row['volume_id'], []).append(dict(row))
+        for volume in volumes:
+            volume['chapters'] = by_volume.pop(volume['id'], [])
+            for chapter in volume['chapters']:
+                chapter['volume'] = volume['name']
+        # 不属于任何现有卷的章节（正常情况下不会出现）放在最后，不致从目录中消失
+        for volume_id, chapters in by_volume.items():
+            for chapter in chapters:
+                chapter['volume'] = "未分卷"
+            volumes.append({'id': volume_id, 'book_id': book_id, 'name': "未分卷", 'order_key': None, 'chapters': chapters})
+        return volumes
+
+    def get_chapters_for_book(self, book_id):
+        """按目录顺序排列的章节元数据（'volume' 为卷名）"""
+        return [chapter for volume in self.get_book_outline(book_id) for chapter in volume['chapters']]
+
+    @staticmethod
+    def _meta_columns(alias):
+        return ", ".join(f"{alias}.{column}" for column in CHAPTER_META_COLUMNS)
 
     def get_chapter_details(self, chapter_id):
+        """章节的全部数据（含正文与卷名），删除章节时整体存入回收站"""
         with self.lock:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM chapters WHERE id = ?", (chapter_id,))
+            cursor.execute("""
+                SELECT c.id, c.book_id, c.volume_id, v.name AS volume, c.order_key, c.title, c.content, c.word_count,
+                       c.createTime, c.lastEditTime, c.hash, c.snippet
+                FROM chapters c LEFT JOIN volumes v ON v.id = c.volume_id
+                WHERE c.id = ?
+            """, (chapter_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
 
     def get_chapter_content(self, chapter_id):
+        """返回 (正文, 字数)；优先取正文缓存，缓存可能过期时先按 hash 校验"""
         with self.lock:
+            trusted = self._sync_data_version()
+            cached = chapter_content_cache.get(chapter_id, lambda: self._get_chapter_hash(chapter_id),
+                                               validate=not trusted)
+            if cached is not None:
+                return cached
+            token = chapter_content_cache.begin_fill()
             cursor = self.conn.cursor()
-            cursor.execute("SELECT content, word_count FROM chapters WHERE id = ?", (chapter_id,))
+            cursor.execute("SELECT content, word_count, hash FROM chapters WHERE id = ?", (chapter_id,))
             result = cursor.fetchone()
-            return (result['content'], result['word_count']) if result else ("", 0)
+            if not result:
+                return ("", 0)
+            if result['hash']:
+                chapter_content_cache.fill(token, chapter_id, result['hash'], result['content'], result['word_count'])
+            return (result['content'], result['word_count'])
+
+    def _sync_data_version(self):
+        """
+        检查其他连接（其他线程或进程）是否提交过修改，有则让正文缓存的现有条目在命中时按 hash 校验
+        本连接自己的提交不改变 data_version。返回 False 表示本连接首次检查、无从判断，本次命中也需校验。
+        """
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        known = self._data_version is not None
+        if known and version != self._data_version:
+            chapter_content_cache.invalidate()
+        self._data_version = version
+        return known
+
+    def _get_chapter_hash(self, chapter_id):
+        row = self.conn.execute("SELECT hash FROM chapters INDEXED BY idx_chapters_meta WHERE id = ?",
+                                (chapter_id,)).fetchone()
+        return row['hash'] if row else None
+
+    def _update_content_cache(self, changes, contents):
+        # 事务已提交：本事务写入的正文放入缓存，其他被修改或删除的章节作废
+        latest = {}
+        for change in changes:
+            if change.entity != 'chapter':
+                continue
+            if change.op == 'reset':
+                chapter_content_cache.clear()
+                latest.clear()
+            elif change.op == 'delete':
+                latest[change.id] = None
+            elif 'hash' in change.fields:
+                latest[change.id] = change.fields
+        for chapter_id, fields in latest.items():
+            written = contents.get(chapter_id)
+            if fields is not None and written is not None and written[0] == fields['hash']:
+                chapter_content_cache.store(chapter_id, fields['hash'], written[1], fields['word_count'])
+            else:
+                chapter_content_cache.discard(chapter_id)
+
+    def get_chapter_hashes(self, chapter_ids):
+        """返回 {chapter_id: 正文 hash}（经覆盖索引读取，不触及正文）"""
+        hashes = {}
+        with self.lock:
+            cursor = self.conn.cursor()
+            chapter_ids = list(chapter_ids)
+            for i in range(0, len(chapter_ids), 500):
+                batch = chapter_ids[i:i + 500]
+                placeholders = ", ".join("?" for _ in batch)
+                cursor.execute(f"SELECT id, hash FROM chapters INDEXED BY idx_chapters_meta WHERE id IN ({placeholders})",
+                               batch)
+                hashes.update((row['id'], row['hash']) for row in cursor.fetchall())
+        return hashes
 
     def get_chapter_info(self, chapter_id):
+        """章节元数据（不含正文，正文用 get_chapter_content 按需读取）"""
         with self.lock:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT id, book_id, volume, title, content, word_count, createTime, lastEditTime, hash FROM chapters WHERE id = ?", (chapter_id,))
+            cursor.execute(f"SELECT {', '.join(CHAPTER_META_COLUMNS)} FROM chapters INDEXED BY idx_chapters_meta WHERE id = ?",
+                           (chapter_id,))
             result = cursor.fetchone()
             return dict(result) if result else None
 
     def add_chapter(self, book_id, volume, title):
+        """在卷（按卷名，不存在时新建于末尾）的末尾新建章节"""
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 current_time = int(datetime.now().timestamp() * 1000)
                 content = f"# {title}\n\n　　"
                 word_count = len(content.strip())
                 content_hash = calculate_hash(content)
                 
                 cursor = self.conn.cursor()
+                volume_id = self._ensure_volume(cursor, book_id, volume)
+                order_key = key_between(self._last_chapter_key(cursor, book_id, volume_id), None)
                 cursor.execute("""
-                    INSERT INTO chapters (book_id, volume, title, content, word_count, createTime, lastEditTime, hash)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (book_id, volume, title, content, word_count, current_time, current_time, content_hash))
+                    INSERT INTO chapters (book_id, volume_id, order_key, title, content, word_count, createTime, lastEditTime, hash, snippet)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (book_id, volume_id, order_key, title, content, word_count, current_time, current_time, content_hash,
+                          chapter_snippet(content)))
                 
                 last_row_id = cursor.lastrowid
                 book_edit_time = int(datetime.now().timestamp() * 1000)
                 cursor.execute("UPDATE books SET lastEditTime = ? WHERE id = ?", (book_edit_time, book_id))
+                self._notify('chapter', last_row_id, 'insert', book_id=book_id, volume_id=volume_id, order_key=order_key,
+                             title=title, word_count=word_count, hash=content_hash)
+                self._pending_contents[last_row_id] = (content_hash, content)
+                self._notify('book', book_id, 'update', lastEditTime=book_edit_time)
                 return last_row_id
 
     def add_chapter_from_backup(self, book_id, chapter_data, content_data):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 last_edit_time = chapter_data.get('lastEditTime', chapter_data.get('createTime'))
+                volume_id = self._ensure_volume(cursor, book_id, chapter_data.get('volumeName', '未分卷'))
+                order_key = key_between(self._last_chapter_key(cursor, book_id, volume_id), None)
                 cursor.execute("""
-                    INSERT INTO chapters (book_id, volume, title, content, word_count, createTime, lastEditTime, hash)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO chapters (book_id, volume_id, order_key, title, content, word_count, createTime, lastEditTime, hash, snippet)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     book_id,
-                    chapter_data.get('volumeName', '未分卷'),
+                    volume_id,
+                    order_key,
                     chapter_data.get('name', '无标题'),
                     content_data.get('content', ''),
                     content_data.get('count', 0),
                     chapter_data.get('createTime'),
                     last_edit_time,
-                    content_data.get('hash', '')
+                    content_data.get('hash', ''),
+                    chapter_snippet(content_data.get('content', ''))
                 ))
+                self._notify('chapter', cursor.lastrowid, 'insert', book_id=book_id, volume_id=volume_id,
+                             order_key=order_key, title=chapter_data.get('name', '无标题'),
+                             word_count=content_data.get('count', 0), hash=content_data.get('hash', ''))
                 return cursor.lastrowid
 
     def update_chapter_content(self, chapter_id, content):
+        """保存章节正文；内容的 hash 与已保存的相同时不写入。返回是否实际写入"""
         with self.lock:
-            with self.conn:
-                word_count = len(content.strip())
+            with self._transaction():
                 content_hash = calculate_hash(content)
-                current_time_ms = int(datetime.now().timestamp() * 1000)
-                
                 cursor = self.conn.cursor()
-                cursor.execute("UPDATE chapters SET content = ?, word_count = ?, lastEditTime = ?, hash = ? WHERE id = ?",
-                            (content, word_count, current_time_ms, content_hash, chapter_id))
-                if cursor.rowcount == 0:
-                    return  # 章节不存在，无需更新书籍时间戳
+                cursor.execute("SELECT book_id, hash FROM chapters INDEXED BY idx_chapters_meta WHERE id = ?", (chapter_id,))
+                row = cursor.fetchone()
+                if row is None or row['hash'] == content_hash:
+                    return False # 章节不存在，或改动后又改回了原样
+
+                word_count = len(content.strip())
+                current_time_ms = int(datetime.now().timestamp() * 1000)
+                cursor.execute("UPDATE chapters SET content = ?, word_count = ?, lastEditTime = ?, hash = ?, snippet = ? WHERE id = ?",
+                            (content, word_count, current_time_ms, content_hash, chapter_snippet(content), chapter_id))
+                cursor.execute("UPDATE books SET lastEditTime = ? WHERE id = ?", (current_time_ms, row['book_id']))
+                self._notify('chapter', chapter_id, 'update', word_count=word_count,
+                             lastEditTime=current_time_ms, hash=content_hash)
+                self._notify('book', row['book_id'], 'update', lastEditTime=current_time_ms)
+                self._pending_contents[chapter_id] = (content_hash, content)
+                return True
 
-                cursor.execute("SELECT book_id FROM chapters WHERE id = ?", (chapter_id,))
-                book_id_result = cursor.fetchone()
-                if book_id_result:
-                    book_id = book_id_result['book_id']
-                    cursor.execute("UPDATE books SET lastEditTime = ? WHERE id = ?", (current_time_ms, book_id))
+    def count_chapters(self, book_id=None):
+        with self.lock:
+            cursor = self.conn.cursor()
+            if book_id:
+                cursor.execute("SELECT COUNT(*) AS total FROM chapters WHERE book_id = ?", (book_id,))
+            else:
+                cursor.execute("SELECT COUNT(*) AS total FROM chapters")
+            return cursor.fetchone()['total']
+
+    def iter_chapter_contents(self, book_id=None, batch_size=50):
+        """
+        逐批遍历章节正文（用于全书/全库搜索等后台扫描）
+        注意：遍历期间持有本实例的锁，请在独立的 DataManager 实例（如工作线程内）中使用。
+        """
+        with self.lock:
+            cursor = self.conn.cursor()
+            query = """
+                SELECT c.id, c.book_id, v.name AS volume, c.title, c.content, c.hash, b.title AS book_title
+                FROM chapters c
+                JOIN books b ON c.book_id = b.id
+                LEFT JOIN volumes v ON v.id = c.volume_id
+            """
+            if book_id:
+                cursor.execute(query + " WHERE c.book_id = ? ORDER BY v.order_key, c.order_key", (book_id,))
+            else:
+                cursor.execute(query + " ORDER BY b.\"group\", b.title, c.book_id, v.order_key, c.order_key")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+
+    def iter_book_chapters(self, book_id, batch_size=20):
+        """
+        按目录顺序逐批遍历一本书的章节（含正文与卷名），用于导出
+        整个遍历在一个读事务中完成，读到的是同一时刻的全书；每卷沿 idx_chapters_order 扫描，不排序，
+        每批只取 batch_size 章，内存占用与书的大小无关。
+        与 iter_chapter_contents 一样在遍历期间持有锁，请在独立的 DataManager 实例中使用。
+        """
+        columns = "m.id, m.volume_id, m.title, m.content, m.word_count, m.hash, m.lastEditTime"
+        with self._read_snapshot():
+            cursor = self.conn.cursor()
+            for volume in self.get_volumes(book_id):
+                cursor.execute(f"""
+                    SELECT {columns}
+                    FROM chapters c INDEXED BY idx_chapters_order
+                    JOIN chapters m ON m.id = c.id
+                    WHERE c.book_id = ? AND c.volume_id = ? ORDER BY c.book_id, c.volume_id, c.order_key
+                """, (book_id, volume['id']))
+                yield from self._fetch_chapter_batches(cursor, batch_size, volume['id'], volume['name'])
+            # 与 get_book_outline 一致：不属于任何现有卷的章节排在最后
+            cursor.execute(f"""
+                SELECT {columns} FROM chapters m
+                WHERE m.book_id = ? AND (m.volume_id IS NULL OR m.volume_id NOT IN (SELECT id FROM volumes WHERE book_id = ?))
+                ORDER BY m.order_key, m.id
+            """, (book_id, book_id))
+            yield from self._fetch_chapter_batches(cursor, batch_size, None, "未分卷")
+
+    @staticmethod
+    def _fetch_chapter_batches(cursor, batch_size, volume_id, volume_name):
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                chapter = dict(row)
+                chapter['volume_id'], chapter['volume'] = volume_id, volume_name
+                yield chapter
+
+    def replace_in_chapters(self, selections, replacement, description=""):
+        """
+        在一个事务内批量替换多个章节中的指定片段
+        selections: {chapter_id: {'hash': 扫描时的内容hash, 'spans': [(start, length), ...]}}
+        替换前的原文以 'revision' 类型写入回收站，可在回收站中"还原"以撤销本次替换。
+        扫描之后内容又发生变化（hash 不一致）的章节会被跳过。
+        返回实际被修改的章节 id 列表。
+        """
+        if not selections:
+            return []
+        with self.lock:
+            with self._transaction():
+                cursor = self.conn.cursor()
+                rows = self._select_chapters(cursor, list(selections.keys()))
+                new_contents = {}
+                for row in rows:
+                    selection = selections[row['id']]
+                    if selection.get('hash') and selection['hash'] != row['hash']:
+                        logger.warning(f"章节 {row['id']} 在扫描后已被修改，跳过替换。")
+                        continue
+                    # 从后往前替换，保证前面片段的偏移不受影响
+                    new_content = row['content'] or ""
+                    for start, length in sorted(selection['spans'], reverse=True):
+                        new_content = new_content[:start] + replacement + new_content[start + length:]
+                    new_contents[row['id']] = new_content
+                return self._rewrite_chapters(cursor, rows, new_contents, "批量替换", description)
+
+    def restore_chapter_contents(self, contents, description=""):
+        """
+        用给定正文整体覆盖多个章节（如异常退出后从编辑日志恢复的内容）
+        contents: {chapter_id: 新正文}；覆盖前的原文以 'revision' 类型写入回收站，可随时还原。
+        返回实际被修改的章节 id 列表。
+        """
+        if not contents:
+            return []
+        with self.lock:
+            with self._transaction():
+                cursor = self.conn.cursor()
+                rows = self._select_chapters(cursor, list(contents.keys()))
+                return self._rewrite_chapters(cursor, rows, contents, "恢复内容", description)
+
+    @staticmethod
+    def _select_chapters(cursor, chapter_ids):
+        # SQLite 单条语句的参数个数有限制，分批读取
+        rows = []
+        for i in range(0, len(chapter_ids), 500):
+            batch = chapter_ids[i:i + 500]
+            placeholders = ", ".join("?" for _ in batch)
+            cursor.execute(f"""
+                SELECT id, book_id, title, content, word_count, lastEditTime, hash
+                FROM chapters WHERE id IN ({placeholders})
+            """, batch)
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def _rewrite_chapters(self, cursor, originals, new_contents, reason=None, description=""):
+        """
+        用 new_contents {chapter_id: 新正文} 整体覆盖 originals（_select_chapters 读出的行）中的章节，
+        不在 new_contents 中或正文未变的章节跳过。章节及所属书籍的最后编辑时间记为当前时间（快照备份据此发现修改），
+        并发出变更通知；给出 reason 时，覆盖前的原文以 'revision' 类型写入回收站，标题默认为「reason (N 个章节)」。
+        返回实际被修改的章节 id 列表。
+        """
+        changed = [row for row in originals
+                   if row['id'] in new_contents and new_contents[row['id']] != (row['content'] or "")]
+        if not changed:
+            return []
+        current_time_ms = int(datetime.now().timestamp() * 1000)
+        updates = []
+        book_ids = set()
+        for row in changed:
+            new_content = new_contents[row['id']]
+            updates.append((new_content, len(new_content.strip()), current_time_ms,
+                            calculate_hash(new_content), chapter_snippet(new_content), row['id']))
+            book_ids.add(row['book_id'])
+
+        cursor.executemany("UPDATE chapters SET content = ?, word_count = ?, lastEditTime = ?, hash = ?, snippet = ? WHERE id = ?",
+                           updates)
+        cursor.executemany("UPDATE books SET lastEditTime = ? WHERE id = ?",
+                           [(current_time_ms, book_id) for book_id in book_ids])
+        # updates 的每一项为 (content, word_count, lastEditTime, hash, snippet, chapter_id)
+        for _content, word_count, last_edit_time, content_hash, _snippet, chapter_id in updates:
+            self._notify('chapter', chapter_id, 'update', word_count=word_count,
+                         lastEditTime=last_edit_time, hash=content_hash)
+        for book_id in book_ids:
+            self._notify('book', book_id, 'update', lastEditTime=current_time_ms)
+
+        if reason is not None:
+            originals = [dict(row) for row in changed]
+            self._insert_revision(cursor, originals, book_ids, description or f"{reason} ({len(originals)} 个章节)")
+        return [row['id'] for row in changed]
+
+    def _insert_revision(self, cursor, originals, book_ids, title):
+        # 被整体修改前的章节原文存为一条回收站记录，还原时一并写回
+        revision_data = {
+            'title': title,
+            'book_ids': sorted(book_ids),
+            'chapters': originals,
+        }
+        item_id = originals[0]['book_id'] if len(book_ids) == 1 else 0
+        self._insert_recycle_item(cursor, 'revision', item_id, revision_data)
+
+    def _insert_recycle_item(self, cursor, item_type, item_id, item_data):
+        # 元数据列与 item_data 一并写入，回收站列表只读元数据
+        title, book_id, chapter_count = _recycle_metadata(item_type, item_id, item_data)
+        cursor.execute("""
+            INSERT INTO recycle_bin (item_type, item_id, item_data, title, book_id, chapter_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (item_type, item_id, json.dumps(item_data), title, book_id, chapter_count))
+        self._notify('recycle_bin', cursor.lastrowid, 'insert', item_type=item_type, title=title)
 
     def update_chapter_title(self, chapter_id, new_title):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("UPDATE chapters SET title = ? WHERE id = ?", (new_title, chapter_id))
+                self._notify('chapter', chapter_id, 'update', title=new_title)
 
     def delete_chapter(self, chapter_id):
         with self.lock:
             chapter_data = self.get_chapter_details(chapter_id)
             if not chapter_data: return
             
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
-                cursor.execute("INSERT INTO recycle_bin (item_type, item_id, item_data) VALUES (?, ?, ?)",
-                            ('chapter', chapter_id, json.dumps(dict(chapter_data))))
+                self._insert_recycle_item(cursor, 'chapter', chapter_id, chapter_data)
                 cursor.execute("DELETE FROM chapters WHERE id = ?", (chapter_id,))
+                self._notify('chapter', chapter_id, 'delete', book_id=chapter_data['book_id'])
+
+    def _ensure_volume(self, cursor, book_id, name):
+        """返回书中同名卷的 id，没有则在最后新建（须在 _transaction() 内调用）"""
+        name = name or "未分卷"
+        cursor.execute("SELECT id FROM volumes WHERE book_id = ? AND name = ?", (book_id, name))
+        row = cursor.fetchone()
+        if row:
+            return row['id']
+        cursor.execute("SELECT order_key FROM volumes WHERE book_id = ? ORDER BY order_key DESC LIMIT 1", (book_id,))
+        last = cursor.fetchone()
+        order_key = key_between(last['order_key'] if last else None, None)
+        cursor.execute("INSERT INTO volumes (book_id, name, order_key, createTime) VALUES (?, ?, ?, ?)",
+                       (book_id, name, order_key, int(datetime.now().timestamp() * 1000)))
+        self._notify('volume', cursor.lastrowid, 'insert', book_id=book_id, name=name, order_key=order_key)
+        return cursor.lastrowid
+
+    def _last_chapter_key(self, cursor, book_id, volume_id):
+        # 卷中最后一章的排序键
+        cursor.execute("""
+            SELECT order_key FROM chapters INDEXED BY idx_chapters_order
+            WHERE book_id = ? AND volume_id = ? ORDER BY order_key DESC LIMIT 1
+        """, (book_id, volume_id))
+        row = cursor.fetchone()
+        return row['order_key'] if row else None
+
+    def _order_gap(self, cursor, entity, scope, before_id, exclude_ids):
+        """
+        返回排序组 scope 中条目 before_id 之前（None 为末尾）的空隙 (previous_key, next_key)，跳过 exclude_ids（正在移动的条目）
+        before_id 的排序键与其他条目重复（如旧数据）时先重新分配整组的键。须在 _transaction() 内调用。
+        """
+        table, order_index, id_index, columns = _ORDER_SCOPES[entity]
+        where = " AND ".join(f"{column} = ?" for column in columns)
+        excluded = f" AND id NOT IN ({', '.join('?' * len(exclude_ids))})" if exclude_ids else ""
+        next_key = None
+        if before_id is not None:
+            cursor.execute(f"SELECT order_key FROM {table} {id_index} WHERE id = ? AND {where}",
+                           (before_id, *scope))
+            row = cursor.fetchone()
+            if row is not None and before_id in exclude_ids:
+                # before_id 本身也在移动：改为放在它之后第一个不移动的条目之前
+                cursor.execute(f"""
+                    SELECT order_key FROM {table} INDEXED BY {order_index}
+                    WHERE {where} AND order_key >= ?{excluded} ORDER BY order_key LIMIT 1
+                """, (*scope, row['order_key'], *exclude_ids))
+                row = cursor.fetchone()
+            next_key = row['order_key'] if row else None
+        if next_key is None:
+            cursor.execute(f"""
+                SELECT order_key FROM {table} INDEXED BY {order_index}
+                WHERE {where}{excluded} ORDER BY order_key DESC LIMIT 1
+            """, (*scope, *exclude_ids))
+            row = cursor.fetchone()
+            return (row['order_key'] if row else None), None
+        cursor.execute(f"SELECT COUNT(*) AS total FROM {table} INDEXED BY {order_index} WHERE {where} AND order_key = ?",
+                       (*scope, next_key))
+        if cursor.fetchone()['total'] > 1:
+            self._rebalance_order_keys(cursor, entity, scope)
+            return self._order_gap(cursor, entity, scope, before_id, exclude_ids)
+        cursor.execute(f"""
+            SELECT order_key FROM {table} INDEXED BY {order_index}
+            WHERE {where} AND order_key < ?{excluded} ORDER BY order_key DESC LIMIT 1
+        """, (*scope, next_key, *exclude_ids))
+        row = cursor.fetchone()
+        return (row['order_key'] if row else None), next_key
+
+    def _rebalance_order_keys(self, cursor, entity, scope):
+        # 组内出现重复的排序键时重新分配整组的键，之后即可继续在任意两个条目之间插入
+        table, order_index, _id_index, columns = _ORDER_SCOPES[entity]
+        where = " AND ".join(f"{column} = ?" for column in columns)
+        cursor.execute(f"SELECT id FROM {table} INDEXED BY {order_index} WHERE {where} ORDER BY order_key, id", scope)
+        item_ids = [row['id'] for row in cursor.fetchall()]
+        updates = list(zip(keys_between(None, None, len(item_ids)), item_ids))
+        cursor.executemany(f"UPDATE {table} SET order_key = ? WHERE id = ?", updates)
+        for order_key, item_id in updates:
+            self._notify(entity, item_id, 'update', **dict(zip(columns, scope)), order_key=order_key)
+
+    def _move_ordered(self, cursor, entity, scope, rows, before_id):
+        """
+        把 rows（按目标顺序排列的 id、原 order_key、原排序组）连续地放到组 scope 中 before_id 之前
+        只改写被移动条目自己的行；它们已按此顺序连续地位于目标位置时不写入。返回新的 [(order_key, id)]。
+        """
+        item_ids = [row['id'] for row in rows]
+        previous_key, next_key = self._order_gap(cursor, entity, scope, before_id, item_ids)
+        current_keys = [row['order_key'] for row in rows]
+        if (all(row['scope'] == tuple(scope) for row in rows) and None not in current_keys
+                and all(a < b for a, b in zip(current_keys, current_keys[1:]))
+                and (previous_key is None or previous_key < current_keys[0])
+                and (next_key is None or current_keys[-1] < next_key)):
+            return []
+        table, _order_index, _id_index, columns = _ORDER_SCOPES[entity]
+        updates = list(zip(keys_between(previous_key, next_key, len(item_ids)), item_ids))
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        cursor.executemany(f"UPDATE {table} SET {assignments}, order_key = ? WHERE id = ?",
+                           [(*scope, order_key, item_id) for order_key, item_id in updates])
+        for order_key, item_id in updates:
+            self._notify(entity, item_id, 'update', **dict(zip(columns, scope)), order_key=order_key)
+        return updates
+
+    def add_volume(self, book_id, name):
+        """在书的最后新建卷（同名卷已存在时直接返回它的 id）"""
+        with self.lock:
+            with self._transaction():
+                return self._ensure_volume(self.conn.cursor(), book_id, name)
+
+    def update_volume_name(self, volume_id, new_volume_name):
+        """重命名卷；书中已有同名的卷时，本卷的章节按原顺序并入该卷末尾，本卷删除"""
+        with self.lock:
+            with self._transaction():
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT book_id, name FROM volumes WHERE id = ?", (volume_id,))
+                volume = cursor.fetchone()
+                if volume is None or volume['name'] == new_volume_name:
+                    return
+                book_id = volume['book_id']
+                cursor.execute("SELECT id FROM volumes WHERE book_id = ? AND name = ?", (book_id, new_volume_name))
+                target = cursor.fetchone()
+                if target is None:
+                    cursor.execute("UPDATE volumes SET name = ? WHERE id = ?", (new_volume_name, volume_id))
+                    self._notify('volume', volume_id, 'update', book_id=book_id, name=new_volume_name)
+                    return
+                target_id = target['id']
+                cursor.execute("""
+                    SELECT id FROM chapters INDEXED BY idx_chapters_order
+                    WHERE book_id = ? AND volume_id = ? ORDER BY order_key, id
+                """, (book_id, volume_id))
+                chapter_ids = [row['id'] for row in cursor.fetchall()]
+                keys = keys_between(self._last_chapter_key(cursor, book_id, target_id), None, len(chapter_ids))
+                cursor.executemany("UPDATE chapters SET volume_id = ?, order_key = ? WHERE id = ?",
+                                   [(target_id, key, chapter_id) for key, chapter_id in zip(keys, chapter_ids)])
+                for key, chapter_id in zip(keys, chapter_ids):
+                    self._notify('chapter', chapter_id, 'update', volume_id=target_id, order_key=key)
+                cursor.execute("DELETE FROM volumes WHERE id = ?", (volume_id,))
+                self._notify('volume', volume_id, 'delete', book_id=book_id)
+
+    def delete_volume(self, volume_id):
+        """删除空卷；卷中还有章节时不删除，返回 False"""
+        with self.lock:
+            with self._transaction():
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT book_id FROM volumes WHERE id = ?", (volume_id,))
+                volume = cursor.fetchone()
+                if volume is None:
+                    return False
+                if self._last_chapter_key(cursor, volume['book_id'], volume_id) is not None:
+                    return False
+                cursor.execute("DELETE FROM volumes WHERE id = ?", (volume_id,))
+                self._notify('volume', volume_id, 'delete', book_id=volume['book_id'])
+                return True
 
-    def update_volume_name(self, book_id, old_volume_name, new_volume_name):
+    def move_chapter(self, chapter_id, volume_id, before_id=None):
+        """把章节移到卷 volume_id 中、章节 before_id 之前（None 表示卷末），只改写它自己的一行"""
+        return self.move_chapters([chapter_id], volume_id, before_id) > 0
+
+    def move_chapters(self, chapter_ids, volume_id, before_id=None):
+        """
+        把多个章节按给定顺序连续地移到卷 volume_id 中、章节 before_id 之前（None 表示卷末）
+        整批在一个事务中完成，只改写被移动章节各自的 volume_id 与 order_key；不属于该卷所在书籍的章节被忽略。
+        返回放到目标位置的章节数。
+        """
+        chapter_ids = list(dict.fromkeys(chapter_ids))
+        if not chapter_ids:
+            return 0
+        with self.lock:
+            with self._transaction():
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT book_id FROM volumes WHERE id = ?", (volume_id,))
+                volume = cursor.fetchone()
+                if volume is None:
+                    return 0
+                book_id = volume['book_id']
+                cursor.execute(f"""
+                    SELECT id, book_id, volume_id, order_key FROM chapters INDEXED BY idx_chapters_meta
+                    WHERE id IN ({', '.join('?' * len(chapter_ids))}) AND book_id = ?
+                """, (*chapter_ids, book_id))
+                found = {row['id']: row for row in cursor.fetchall()}
+                rows = [{'id': chapter_id, 'order_key': found[chapter_id]['order_key'],
+                         'scope': (book_id, found[chapter_id]['volume_id'])}
+                        for chapter_id in chapter_ids if chapter_id in found]
+                if rows:
+                    self._move_ordered(cursor, 'chapter', (book_id, volume_id), rows, before_id)
+                return len(rows)
+
+    def move_volumes(self, volume_ids, before_id=None):
+        """
+        把同一本书中的多个卷（连同其章节）按给定顺序连续地移到卷 before_id 之前（None 表示最后）
+        只改写被移动的卷自己的 order_key，章节不受影响。返回放到目标位置的卷数。
+        """
+        volume_ids = list(dict.fromkeys(volume_ids))
+        if not volume_ids:
+            return 0
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
-                cursor.execute("UPDATE chapters SET volume = ? WHERE book_id = ? AND volume = ?",
-                            (new_volume_name, book_id, old_volume_name))
+                cursor.execute(f"SELECT id, book_id, order_key FROM volumes WHERE id IN ({', '.join('?' * len(volume_ids))})",
+                               volume_ids)
+                found = {row['id']: row for row in cursor.fetchall()}
+                if volume_ids[0] not in found:
+                    return 0
+                book_id = found[volume_ids[0]]['book_id']
+                rows = [{'id': volume_id, 'order_key': found[volume_id]['order_key'], 'scope': (book_id,)}
+                        for volume_id in volume_ids
+                        if volume_id in found and found[volume_id]['book_id'] == book_id]
+                self._move_ordered(cursor, 'volume', (book_id,), rows, before_id)
+                return len(rows)
 
     def get_recycle_bin_items(self):
+        """回收站列表：只含元数据列与所属书籍的书名，不读取 item_data（整本书或整章正文），还原时才读取"""
         with self.lock:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM recycle_bin ORDER BY deleted_at DESC")
+            cursor.execute("""
+                SELECT r.id, r.item_type, r.item_id, r.title, r.book_id, r.chapter_count, r.deleted_at,
+                       b.title AS book_title
+                FROM recycle_bin r INDEXED BY idx_recycle_bin_listing
+                LEFT JOIN books b ON b.id = r.book_id
+                ORDER BY r.deleted_at DESC
+            """)
             return [dict(row) for row in cursor.fetchall()]
 
     def restore_recycle_item(self, recycle_id):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("SELECT * FROM recycle_bin WHERE id = ?", (recycle_id,))
                 row = cursor.fetchone()
@@ -412,6 +965,8 @@ class DataManager:
                         """, (item_data['title'], item_data.get('description'), 
                               item_data.get('cover_path'), item_data.get('group'), 
                               item_data.get('createTime'), item_data.get('lastEditTime')))
+                    self._notify('book', cursor.lastrowid, 'insert',
+                                 title=item_data['title'], group=item_data.get('group'))
                     
                 elif item_type == 'chapter':
                     book_id = item_data['book_id']
@@ -419,36 +974,68 @@ class DataManager:
                     if not cursor.fetchone():
                         return "parent_missing"
 
+                    volume_id, order_key = self._restored_chapter_position(cursor, book_id, item_data)
+                    values = (item_data['book_id'], volume_id, order_key,
+                              item_data['title'], item_data['content'], item_data['word_count'],
+                              item_data['createTime'], item_data['lastEditTime'], item_data.get('hash'),
+                              chapter_snippet(item_data['content']))
                     try:
                          cursor.execute("""
-                            INSERT INTO chapters (id, book_id, volume, title, content, word_count, createTime, lastEditTime, hash)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (item_data['id'], item_data['book_id'], item_data['volume'], 
-                              item_data['title'], item_data['content'], item_data['word_count'],
-                              item_data['createTime'], item_data['lastEditTime'], item_data.get('hash')))
+                            INSERT INTO chapters (id, book_id, volume_id, order_key, title, content, word_count, createTime, lastEditTime, hash, snippet)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """, (item_data['id'],) + values)
                     except sqlite3.IntegrityError:
                          cursor.execute("""
-                            INSERT INTO chapters (book_id, volume, title, content, word_count, createTime, lastEditTime, hash)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (item_data['book_id'], item_data['volume'], 
-                              item_data['title'], item_data['content'], item_data['word_count'],
-                              item_data['createTime'], item_data['lastEditTime'], item_data.get('hash')))
+                            INSERT INTO chapters (book_id, volume_id, order_key, title, content, word_count, createTime, lastEditTime, hash, snippet)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """, values)
+                    self._notify('chapter', cursor.lastrowid, 'insert', book_id=book_id, volume_id=volume_id,
+                                 order_key=order_key, title=item_data['title'], word_count=item_data['word_count'],
+                                 hash=item_data.get('hash'))
+
+                elif item_type == 'revision':
+                    # 撤销批量替换或内容恢复：将受影响章节恢复为之前的正文（已删除的章节忽略）；
+                    # 这也是一次修改，最后编辑时间记为现在，快照备份与书籍列表才能看到
+                    chapters = item_data.get('chapters', [])
+                    rows = self._select_chapters(cursor, [ch['id'] for ch in chapters])
+                    self._rewrite_chapters(cursor, rows, {ch['id']: ch['content'] or "" for ch in chapters})
 
                 cursor.execute("DELETE FROM recycle_bin WHERE id = ?", (recycle_id,))
+                self._notify('recycle_bin', recycle_id, 'delete')
                 return True
 
+    def _restored_chapter_position(self, cursor, book_id, item_data):
+        # 还原到原来的卷与位置；卷已不存在时按卷名找回或新建，原位置已被占用时放到卷末
+        volume_id = item_data.get('volume_id')
+        if volume_id is not None:
+            cursor.execute("SELECT 1 FROM volumes WHERE id = ? AND book_id = ?", (volume_id, book_id))
+            if cursor.fetchone() is None:
+                volume_id = None
+        if volume_id is None:
+            volume_id = self._ensure_volume(cursor, book_id, item_data.get('volume'))
+        order_key = item_data.get('order_key')
+        if order_key is not None:
+            cursor.execute("""
+                SELECT 1 FROM chapters INDEXED BY idx_chapters_order WHERE book_id = ? AND volume_id = ? AND order_key = ?
+            """, (book_id, volume_id, order_key))
+            if cursor.fetchone() is None:
+                return volume_id, order_key
+        return volume_id, key_between(self._last_chapter_key(cursor, book_id, volume_id), None)
+
     def delete_recycle_item(self, recycle_id):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("DELETE FROM recycle_bin WHERE id = ?", (recycle_id,))
+                self._notify('recycle_bin', recycle_id, 'delete')
                 return True
             
     def empty_recycle_bin(self):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("DELETE FROM recycle_bin")
+                self._notify('recycle_bin', None, 'reset')
 
     def get_all_materials_names(self, book_id=None):
         with self.lock:
@@ -459,6 +1046,19 @@ class DataManager:
                 cursor.execute("SELECT name FROM materials WHERE book_id IS NULL")
             return [row['name'] for row in cursor.fetchall()]
 
+    def get_material_name_index(self, book_id=None):
+        """返回 {素材名称: 素材id}，本书素材与全局素材重名时以本书素材为准"""
+        with self.lock:
+            cursor = self.conn.cursor()
+            if book_id:
+                cursor.execute("""
+                    SELECT id, name FROM materials WHERE book_id IS NULL OR book_id = ?
+                    ORDER BY book_id IS NOT NULL
+                """, (book_id,))
+            else:
+                cursor.execute("SELECT id, name FROM materials WHERE book_id IS NULL")
+            return {row['name']: row['id'] for row in cursor.fetchall()}
+
     def get_materials(self, book_id=None):
         with self.lock:
             cursor = self.conn.cursor()
@@ -496,11 +1096,13 @@ class DataManager:
     def add_material(self, name, type, description, book_id=None, content=None):
         try:
             with self.lock:
-                with self.conn:
+                with self._transaction():
                     content_json = json.dumps(content if content is not None else {})
                     cursor = self.conn.cursor()
                     cursor.execute("INSERT INTO materials (name, type, description, book_id, content) VALUES (?, ?, ?, ?, ?)",
                                 (name, type, description, book_id, content_json))
+                    self._notify('material', cursor.lastrowid, 'insert', name=name, type=type,
+                                 description=description, book_id=book_id)
                     return cursor.lastrowid
         except sqlite3.IntegrityError:
             logger.warning(f"添加素材 '{name}' 失败：名称已存在。")
@@ -508,23 +1110,27 @@ class DataManager:
 
     def add_material_from_backup(self, material_data):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 content = material_data.get('content') or material_data.get('settings')
                 cursor.execute("INSERT OR REPLACE INTO materials (id, name, type, description, content, book_id) VALUES (?, ?, ?, ?, ?, ?)",
                             (material_data['id'], material_data['name'], material_data['type'],
                                 material_data.get('description', ''), content, material_data.get('book_id')))
+                self._notify('material', material_data['id'], 'insert', name=material_data['name'],
+                             type=material_data['type'], description=material_data.get('description', ''),
+                             book_id=material_data.get('book_id'))
 
     def update_material(self, material_id, name, type, description, content=None):
         try:
             with self.lock:
-                with self.conn:
+                with self._transaction():
                     content_json = json.dumps(content if content is not None else {})
                     cursor = self.conn.cursor()
                     cursor.execute("""
                         UPDATE materials SET name = ?, type = ?, description = ?, content = ?
                         WHERE id = ?
                     """, (name, type, description, content_json, material_id))
+                    self._notify('material', material_id, 'update', name=name, type=type, description=description)
                     return True
         except Exception as e:
             logger.error(f"数据库更新素材失败: {e}", exc_info=True)
@@ -533,9 +1139,10 @@ class DataManager:
     def delete_material(self, material_id):
         try:
             with self.lock:
-                with self.conn:
+                with self._transaction():
                     cursor = self.conn.cursor()
                     cursor.execute("DELETE FROM materials WHERE id = ?", (material_id,))
+                    self._notify('material', material_id, 'delete')
                     return True
         except Exception as e:
             logger.error(f"删除素材失败: {e}", exc_info=True)
@@ -555,16 +1162,20 @@ class DataManager:
 
     def rename_group(self, old_name, new_name):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("UPDATE books SET `group` = ? WHERE `group` = ?", (new_name, old_name))
+                if cursor.rowcount > 0:
+                    self._notify('group', old_name, 'update', name=new_name)
                 return cursor.rowcount > 0
 
     def delete_group(self, group_name):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("UPDATE books SET `group` = '未分组' WHERE `group` = ?", (group_name,))
+                if cursor.rowcount > 0:
+                    self._notify('group', group_name, 'delete')
                 return cursor.rowcount > 0
 
     def get_inspiration_fragments(self):
@@ -581,23 +1192,27 @@ class DataManager:
 
     def add_inspiration_fragment(self, type, content, source=""):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("INSERT INTO inspiration_fragments (type, content, source) VALUES (?, ?, ?)",
                             (type, content, source))
+                self._notify('inspiration_fragment', cursor.lastrowid, 'insert', type=type, content=content, source=source)
                 return cursor.lastrowid
 
     def add_inspiration_fragment_from_backup(self, fragment_data):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("INSERT OR REPLACE INTO inspiration_fragments (id, type, content, source, created_at) VALUES (?, ?, ?, ?, ?)",
                             (fragment_data['id'], fragment_data['type'], fragment_data['content'],
                                 fragment_data.get('source', ''), fragment_data.get('created_at')))
+                self._notify('inspiration_fragment', fragment_data['id'], 'insert', type=fragment_data['type'],
+                             content=fragment_data['content'], source=fragment_data.get('source', ''),
+                             created_at=fragment_data.get('created_at'))
 
     def update_inspiration_fragment(self, fragment_id, type=None, content=None, source=None):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 updates = []
                 params = []
@@ -615,13 +1230,19 @@ class DataManager:
                 params.append(fragment_id)
                 query = f"UPDATE inspiration_fragments SET {', '.join(updates)} WHERE id = ?"
                 cursor.execute(query, params)
+                if cursor.rowcount > 0:
+                    changed = {'type': type, 'content': content, 'source': source}
+                    self._notify('inspiration_fragment', fragment_id, 'update',
+                                 **{key: value for key, value in changed.items() if value is not None})
                 return cursor.rowcount > 0
 
     def delete_inspiration_fragment(self, fragment_id):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("DELETE FROM inspiration_fragments WHERE id = ?", (fragment_id,))
+                if cursor.rowcount > 0:
+                    self._notify('inspiration_fragment', fragment_id, 'delete')
                 return cursor.rowcount > 0
 
     def get_inspiration_items(self):
@@ -638,23 +1259,28 @@ class DataManager:
 
     def add_inspiration_item(self, title, content="", tags="", parent_id=None):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("INSERT INTO inspiration_items (title, content, tags, parent_id) VALUES (?, ?, ?, ?)",
                             (title, content, tags, parent_id))
+                self._notify('inspiration_item', cursor.lastrowid, 'insert', title=title, content=content,
+                             tags=tags, parent_id=parent_id)
                 return cursor.lastrowid
 
     def add_inspiration_item_from_backup(self, item_data):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("INSERT OR REPLACE INTO inspiration_items (id, title, content, tags, parent_id) VALUES (?, ?, ?, ?, ?)",
                             (item_data['id'], item_data['title'], item_data.get('content', ''),
                                 item_data.get('tags', ''), item_data.get('parent_id')))
+                self._notify('inspiration_item', item_data['id'], 'insert', title=item_data['title'],
+                             content=item_data.get('content', ''), tags=item_data.get('tags', ''),
+                             parent_id=item_data.get('parent_id'))
 
     def update_inspiration_item(self, item_id, title=None, content=None, tags=None, parent_id=None):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 updates = []
                 params = []
@@ -675,13 +1301,19 @@ class DataManager:
                 params.append(item_id)
                 query = f"UPDATE inspiration_items SET {', '.join(updates)} WHERE id = ?"
                 cursor.execute(query, params)
+                if cursor.rowcount > 0:
+                    changed = {'title': title, 'content': content, 'tags': tags, 'parent_id': parent_id}
+                    self._notify('inspiration_item', item_id, 'update',
+                                 **{key: value for key, value in changed.items() if value is not None})
                 return cursor.rowcount > 0
 
     def delete_inspiration_item(self, item_id):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("DELETE FROM inspiration_items WHERE id = ?", (item_id,))
+                if cursor.rowcount > 0:
+                    self._notify('inspiration_item', item_id, 'delete')
                 return cursor.rowcount > 0
 
     def get_timelines_for_book(self, book_id):
@@ -698,19 +1330,22 @@ class DataManager:
 
     def add_timeline(self, book_id, name, description=""):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("INSERT INTO timelines (book_id, name, description) VALUES (?, ?, ?)",
                             (book_id, name, description))
+                self._notify('timeline', cursor.lastrowid, 'insert', book_id=book_id, name=name, description=description)
                 return cursor.lastrowid
 
     def add_timeline_from_backup(self, timeline_data):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("INSERT OR REPLACE INTO timelines (id, book_id, name, description) VALUES (?, ?, ?, ?)",
                             (timeline_data['id'], timeline_data['book_id'], timeline_data['name'],
                                 timeline_data.get('description', '')))
+                self._notify('timeline', timeline_data['id'], 'insert', book_id=timeline_data['book_id'],
+                             name=timeline_data['name'], description=timeline_data.get('description', ''))
 
     def get_timeline_events(self, timeline_id):
         with self.lock:
@@ -726,7 +1361,7 @@ class DataManager:
 
     def add_timeline_event_from_backup(self, event_data):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 referenced_materials = event_data.get('referenced_materials')
                 if isinstance(referenced_materials, str):
@@ -747,10 +1382,12 @@ class DataManager:
                     event_data.get('order_index', 0), event_data.get('status'),
                     referenced_materials
                 ))
+                self._notify('timeline_event', event_data['id'], 'insert', timeline_id=event_data['timeline_id'],
+                             parent_id=event_data.get('parent_id'), title=event_data['title'])
 
     def update_timeline_events(self, timeline_id, events_data):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("DELETE FROM timeline_events WHERE timeline_id = ?", (timeline_id,))
                 for event in events_data:
@@ -765,44 +1402,128 @@ class DataManager:
                         event.get('content'), event.get('event_time'), event.get('order_index'),
                         event.get('status'), referenced_materials_json
                     ))
+                self._notify('timeline_event', None, 'reset', timeline_id=timeline_id)
 
     def clear_all_writing_data(self):
         with self.lock:
-            with self.conn:
+            with self._transaction():
                 cursor = self.conn.cursor()
                 cursor.execute("DELETE FROM timeline_events")
                 cursor.execute("DELETE FROM timelines")
                 cursor.execute("DELETE FROM chapters")
+                cursor.execute("DELETE FROM volumes")
                 cursor.execute("DELETE FROM materials")
                 cursor.execute("DELETE FROM books")
                 cursor.execute("DELETE FROM inspiration_items")
                 cursor.execute("DELETE FROM inspiration_fragments")
+                for entity in ('timeline_event', 'timeline', 'chapter', 'volume', 'material', 'book',
+                               'inspiration_item', 'inspiration_fragment'):
+                    self._notify(entity, None, 'reset')
 
     def get_recent_chapters(self, limit=10):
         with self.lock:
             cursor = self.conn.cursor()
+            # 先经 lastEditTime 索引取出最近的章节 id，再从元数据索引取标题与预览
             cursor.execute("""
-                SELECT c.id, c.book_id, c.title, c.content, c.lastEditTime, b.title as book_title
-                FROM chapters c
-                JOIN books b ON c.book_id = b.id
-                WHERE c.lastEditTime IS NOT NULL
-                ORDER BY c.lastEditTime DESC
-                LIMIT ?
+                SELECT m.id, m.book_id, m.title, m.snippet, m.lastEditTime, b.title as book_title
+                FROM (SELECT id FROM chapters INDEXED BY idx_chapters_last_edit
+                      WHERE lastEditTime IS NOT NULL ORDER BY lastEditTime DESC LIMIT ?) r
+                JOIN chapters m INDEXED BY idx_chapters_meta ON m.id = r.id
+                JOIN books b ON m.book_id = b.id
+                ORDER BY m.lastEditTime DESC
             """, (limit,))
             return [dict(row) for row in cursor.fetchall()]
 
     def get_chapters_modified_since(self, check_time):
+        """check_time 之后修改过的章节（元数据，不含正文）"""
         with self.lock:
             check_timestamp_ms = int(check_time.timestamp() * 1000)
             cursor = self.conn.cursor()
             cursor.execute("""
-                SELECT c.id, c.book_id, c.title, c.content, c.lastEditTime, b.title as book_title
-                FROM chapters c
-                JOIN books b ON c.book_id = b.id
-                WHERE c.lastEditTime > ?
+                SELECT m.id, m.book_id, m.title, m.hash, m.lastEditTime, b.title as book_title
+                FROM (SELECT id FROM chapters INDEXED BY idx_chapters_last_edit WHERE lastEditTime > ?) r
+                JOIN chapters m INDEXED BY idx_chapters_meta ON m.id = r.id
+                JOIN books b ON m.book_id = b.id
             """, (check_timestamp_ms,))
             return [dict(row) for row in cursor.fetchall()]
 
+    def get_library_statistics(self):
+        """
+        每本书的统计：{'id', 'title', 'group', 'lastEditTime', 'volumes', 'chapters', 'words'}，按分组、书名排序
+        章节数与字数由元数据覆盖索引一次汇总，不触及正文。
+        """
+        with self._read_snapshot():
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT book_id, COUNT(*) AS chapters, SUM(word_count) AS words
+                FROM chapters INDEXED BY idx_chapters_meta GROUP BY book_id
+            """)
+            chapters = {row['book_id']: (row['chapters'], row['words'] or 0) for row in cursor.fetchall()}
+            cursor.execute("SELECT book_id, COUNT(*) AS volumes FROM volumes GROUP BY book_id")
+            volumes = {row['book_id']: row['volumes'] for row in cursor.fetchall()}
+            cursor.execute("SELECT id, title, \"group\", lastEditTime FROM books ORDER BY \"group\", title")
+            books = [dict(row) for row in cursor.fetchall()]
+        for book in books:
+            book['volumes'] = volumes.get(book['id'], 0)
+            book['chapters'], book['words'] = chapters.get(book['id'], (0, 0))
+        return books
+
+    def count_rows(self, table):
+        """表的行数（table 为 books / chapters / materials 等固定的表名）"""
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def check_integrity(self, verify_content=False):
+        """
+        检查数据库：SQLite 自身的结构检查、外键，以及章节与书籍、卷的对应关系
+        verify_content 为 True 时做完整的 integrity_check，并逐章用正文核对 hash 与字数（需读取全部正文）。
+        返回 {'errors': [...], 'warnings': [...], 'chapters_checked'}，每项为 {'check', 'id', 'detail'}
+        """
+        errors, warnings = [], []
+        checked = 0
+        with self._read_snapshot():
+            cursor = self.conn.cursor()
+            cursor.execute("PRAGMA integrity_check" if verify_content else "PRAGMA quick_check")
+            for row in cursor.fetchall():
+                if row[0] != 'ok':
+                    errors.append({'check': 'sqlite', 'id': None, 'detail': row[0]})
+            cursor.execute("PRAGMA foreign_key_check")
+            for row in cursor.fetchall():
+                errors.append({'check': 'foreign_key', 'id': row[1],
+                               'detail': f"{row[0]} 的第 {row[1]} 行引用的 {row[2]} 不存在"})
+            cursor.execute("""
+                SELECT c.id, c.book_id FROM chapters c INDEXED BY idx_chapters_meta
+                LEFT JOIN books b ON b.id = c.book_id WHERE b.id IS NULL
+            """)
+            for row in cursor.fetchall():
+                errors.append({'check': 'chapter_book', 'id': row['id'], 'detail': f"所属书籍 {row['book_id']} 不存在"})
+            cursor.execute("""
+                SELECT c.id, c.volume_id, c.order_key FROM chapters c INDEXED BY idx_chapters_meta
+                LEFT JOIN volumes v ON v.id = c.volume_id
+                WHERE v.id IS NULL OR v.book_id != c.book_id OR c.order_key IS NULL
+            """)
+            for row in cursor.fetchall():
+                detail = "缺少排序键" if row['order_key'] is None else f"所属卷 {row['volume_id']} 不存在或属于其他书籍"
+                errors.append({'check': 'chapter_volume', 'id': row['id'], 'detail': detail})
+            if verify_content:
+                cursor.execute("SELECT id, content, word_count, hash FROM chapters")
+                while True:
+                    rows = cursor.fetchmany(50)
+                    if not rows:
+                        break
+                    for row in rows:
+                        checked += 1
+                        content = row['content'] or ""
+                        if not row['hash']:
+                            # 从旧备份恢复的章节可能没有 hash，下次保存时补上
+                            warnings.append({'check': 'chapter_hash', 'id': row['id'], 'detail': "缺少正文 hash"})
+                        elif row['hash'] != calculate_hash(content):
+                            errors.append({'check': 'chapter_hash', 'id': row['id'], 'detail': "正文与 hash 不一致"})
+                        if row['word_count'] != len(content.strip()):
+                            warnings.append({'check': 'word_count', 'id': row['id'],
+                                             'detail': f"记录的字数 {row['word_count']}，实际 {len(content.strip())}"})
+        return {'errors': errors, 'warnings': warnings, 'chapters_checked': checked}
+
     def close(self):
         if self.conn:
             self.conn.close()
\ No newline at end of file
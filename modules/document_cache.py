@@ -0,0 +1,91 @@
+# ShiCheng_Writer/modules/document_cache.py
+import logging
+from collections import OrderedDict
+from PySide6.QtCore import QObject
+
+logger = logging.getLogger(__name__)
+
+class DocumentCache(QObject):
+    """
+    章节文档 LRU 缓存
+    保留打开过的章节 QTextDocument（连同撤销栈、排版与高亮结果），切换章节时直接复用，无需重新读取和排版。
+    容量按字符数计算；当前章节（pinned_id）与有未保存修改的文档不会被淘汰，保存后再按容量回收。
+    文档以缓存为父对象，被淘汰或移除时随之释放。
+    """
+    DEFAULT_MAX_CHARS = 2_000_000
+
+    def __init__(self, max_chars=DEFAULT_MAX_CHARS, parent=None):
+        super().__init__(parent)
+        self.max_chars = max_chars
+        self.pinned_id = None # 当前显示的章节，不参与淘汰
+        self._documents = OrderedDict() # chapter_id -> QTextDocument，末尾为最近使用
+
+    def __contains__(self, chapter_id):
+        return chapter_id in self._documents
+
+    def __len__(self):
+        return len(self._documents)
+
+    def get(self, chapter_id):
+        """取出缓存的文档并标记为最近使用，未缓存时返回 None"""
+        document = self._documents.get(chapter_id)
+        if document is not None:
+            self._documents.move_to_end(chapter_id)
+        return document
+
+    def peek(self, chapter_id):
+        """取出缓存的文档，不影响淘汰顺序"""
+        return self._documents.get(chapter_id)
+
+    def put(self, chapter_id, document):
+        """放入文档（缓存接管其父对象），同一章节的旧文档会被释放"""
+        old_document = self._documents.pop(chapter_id, None)
+        if old_document is not None and old_document is not document:
+            old_document.deleteLater()
+        document.setParent(self)
+        self._documents[chapter_id] = document
+        self.trim()
+
+    def remove(self, chapter_id):
+        """移除并释放文档（调用方需确保编辑器已不再显示它）"""
+        document = self._documents.pop(chapter_id, None)
+        if document is not None:
+            document.deleteLater()
+
+    def discard_clean(self, chapter_ids=None):
+        """
+        作废没有未保存修改的文档（数据库中的正文被外部修改后调用）
+        chapter_ids 为 None 时作废全部；当前章节不受影响，由调用方重新载入
+        """
+        targets = list(self._documents) if chapter_ids is None else chapter_ids
+        for chapter_id in targets:
+            document = self._documents.get(chapter_id)
+            if document is None or chapter_id == self.pinned_id or document.isModified():
+                continue
+            self.remove(chapter_id)
+
+    def clear(self):
+        """释放全部文档（包括未保存的修改）"""
+        for document in self._documents.values():
+            document.deleteLater()
+        self._documents.clear()
+
+    def dirty_documents(self):
+        """返回有未保存修改的 [(chapter_id, document)]"""
+        return [(chapter_id, document) for chapter_id, document in self._documents.items() if document.isModified()]
+
+    def total_chars(self):
+        return sum(document.characterCount() for document in self._documents.values())
+
+    def trim(self):
+        """按最近最少使用的顺序淘汰文档，直到总字符数不超过上限"""
+        total = self.total_chars()
+        for chapter_id in list(self._documents):
+            if total <= self.max_chars:
+                break
+            document = self._documents[chapter_id]
+            if chapter_id == self.pinned_id or document.isModified():
+                continue
+            total -= document.characterCount()
+            self.remove(chapter_id)
+            logger.debug(f"章节文档缓存淘汰章节 {chapter_id}，剩余 {total} 字符")
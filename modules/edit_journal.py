@@ -0,0 +1,267 @@
+# ShiCheng_Writer/modules/edit_journal.py
+"""
+章节编辑日志（崩溃恢复）
+编辑器中的每次修改以增量（位置、删除长度、插入文本）追加到数据库旁的日志文件，
+由后台线程按批写入并 fsync；章节保存到数据库后记录检查点，之前的增量随之作废。
+程序异常退出后，下次启动时以数据库中的正文为基准重放尚未检查点的增量，找回未保存的修改。
+后台保存开始时追加一条新的 base 记录（重设基准），此后的增量相对于正在写入的正文；
+重放时从 hash 与数据库正文一致的最后一个基准开始，无论崩溃发生在写入完成之前还是之后都能接上。
+
+日志为 JSON Lines，每行一条记录：
+    {"op": "base", "chapter": id, "hash": 基准正文的 hash}   章节首次写入增量前或重设基准时记录
+    {"op": "edit", "chapter": id, "pos": 位置, "del": 删除长度, "ins": 插入文本}
+    {"op": "checkpoint", "chapter": id}                         已保存或放弃修改
+位置与长度均以 UTF-16 编码单元计，与 QTextDocument 的字符位置一致。
+"""
+
+import os
+import json
+import logging
+import threading
+from PySide6.QtGui import QTextCursor
+
+from .database import calculate_hash
+from .text_utils import document_plain_text
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".editlog"
+
+
+def journal_path(db_file):
+    """数据库文件对应的编辑日志路径（ShiCheng_Writer.db -> ShiCheng_Writer.editlog）"""
+    return os.path.splitext(db_file)[0] + JOURNAL_SUFFIX
+
+
+def read_journal(path):
+    """
+    读取日志中尚未检查点的修改
+    返回 {chapter_id: [{'hash': 基准 hash, 'edits': [(pos, removed, inserted), ...]}, ...]}，
+    每个章节按时间顺序列出各个基准及其后的增量，只包含有增量的章节。
+    异常退出时最后一行可能只写了一半，无法解析的行会被忽略。
+    """
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+                op = record['op']
+                chapter_id = record['chapter']
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"编辑日志第 {line_number} 行无法解析，已跳过。")
+                continue
+            if op == 'base':
+                entries.setdefault(chapter_id, []).append({'hash': record.get('hash'), 'edits': []})
+            elif op == 'edit':
+                segments = entries.get(chapter_id)
+                if segments:
+                    segments[-1]['edits'].append((record['pos'], record['del'], record['ins']))
+            elif op == 'checkpoint':
+                entries.pop(chapter_id, None)
+    return {chapter_id: segments for chapter_id, segments in entries.items()
+            if any(segment['edits'] for segment in segments)}
+
+
+def apply_edits(text, edits):
+    """按顺序把增量应用到文本上（在 UTF-16 字节上操作，位置换算与 Qt 一致）"""
+    buffer = bytearray(text.encode('utf-16-le'))
+    for position, removed, inserted in edits:
+        start = position * 2
+        buffer[start:start + removed * 2] = inserted.encode('utf-16-le')
+    return buffer.decode('utf-16-le', errors='replace')
+
+
+def replay_entry(content, segments):
+    """
+    以数据库中的正文为基准重放一个章节的增量，返回恢复后的正文
+    从 hash 与正文一致的最后一个基准开始，依次应用其后的全部增量；没有一致的基准时返回 None。
+    """
+    base = document_plain_text(content or "")
+    base_hash = calculate_hash(base)
+    for index in range(len(segments) - 1, -1, -1):
+        if segments[index]['hash'] == base_hash:
+            return apply_edits(base, [edit for segment in segments[index:] for edit in segment['edits']])
+    return None
+
+
+class EditJournal:
+    """
+    编辑日志写入器
+    界面线程只把记录放入内存队列；后台线程攒够 FLUSH_INTERVAL 秒的记录后一次写入并 fsync，
+    因此异常退出时最多丢失最近一个批次的输入。
+    """
+    FLUSH_INTERVAL = 0.5 # 秒
+
+    def __init__(self, path):
+        self.path = path
+        self._bases = {} # chapter_id -> 当前基准正文（最近一次载入或保存）的 hash
+        self._journaled = set() # 日志中已写入 base 记录、尚未检查点的章节
+        self._pending = [] # 待写入的记录；None 表示清空日志文件
+        self._condition = threading.Condition()
+        self._flush_requested = False
+        self._enqueued = 0 # 已入队的记录数
+        self._written = 0 # 已写入文件的记录数，供 flush() 等待
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="EditJournalWriter", daemon=True)
+        self._thread.start()
+
+    # --- 界面线程调用 ---
+
+    def track(self, chapter_id, document):
+        """开始记录章节文档的修改（文档内容须与数据库中的正文一致，即刚载入或刚保存）"""
+        self._bases[chapter_id] = calculate_hash(document.toPlainText())
+        state = {'revision': document.revision()}
+
+        def on_contents_change(position, removed, added):
+            revision = document.revision()
+            # 素材高亮只改格式：文本修订号不变，删除与插入长度相同
+            if revision == state['revision'] and removed == added:
+                return
+            state['revision'] = revision
+            inserted = ""
+            if added:
+                end = min(position + added, document.characterCount() - 1)
+                cursor = QTextCursor(document)
+                cursor.setPosition(position)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                inserted = cursor.selectedText().replace('\u2029', '\n') # 段落分隔符
+            self.record_edit(chapter_id, position, removed, inserted)
+
+        document.contentsChange.connect(on_contents_change)
+
+    def record_edit(self, chapter_id, position, removed, inserted):
+        records = []
+        if chapter_id not in self._journaled:
+            base_hash = self._bases.get(chapter_id)
+            if base_hash is None:
+                return # 未跟踪的章节
+            self._journaled.add(chapter_id)
+            records.append({'op': 'base', 'chapter': chapter_id, 'hash': base_hash})
+        records.append({'op': 'edit', 'chapter': chapter_id, 'pos': position, 'del': removed, 'ins': inserted})
+        self._enqueue(records)
+
+    def checkpoint(self, chapter_id, content):
+        """章节已保存到数据库：以保存的正文作为新基准，日志中之前的增量作废"""
+        self._bases[chapter_id] = calculate_hash(content)
+        self._end_chapter(chapter_id)
+
+    def rebase(self, chapter_id, content):
+        """
+        后台保存开始前调用：content 即将写入数据库，此后的增量以它为基准
+        之前的增量仍保留，直到保存完成后调用 checkpoint（若期间没有新的修改）。
+        """
+        base_hash = calculate_hash(content)
+        self._bases[chapter_id] = base_hash
+        if chapter_id in self._journaled:
+            self._enqueue([{'op': 'base', 'chapter': chapter_id, 'hash': base_hash}])
+
+    def discard(self, chapter_id):
+        """放弃章节的未保存修改（关闭时不保存、章节被删除），不再跟踪"""
+        self._bases.pop(chapter_id, None)
+        self._end_chapter(chapter_id)
+
+    def reset(self):
+        """清空日志并停止跟踪所有章节（数据库被整体替换时）"""
+        self._bases.clear()
+        self._journaled.clear()
+        self._enqueue([None])
+
+    def flush(self, timeout=5):
+        """立即写入所有待写记录并等待完成"""
+        with self._condition:
+            target = self._enqueued
+            if self._written >= target:
+                return
+            self._flush_requested = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, remove=True):
+        """
+        退出时调用，写完剩余记录后停止写线程
+        remove=True：修改均已保存或放弃，删除日志文件；有章节保存失败时传入 False，保留日志供下次启动时恢复
+        """
+        with self._condition:
+            if remove:
+                self._pending.append(None)
+                self._enqueued += 1
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join(5)
+        if not remove:
+            return
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"删除编辑日志失败: {e}")
+
+    def _end_chapter(self, chapter_id):
+        if chapter_id not in self._journaled:
+            return
+        self._journaled.discard(chapter_id)
+        records = [{'op': 'checkpoint', 'chapter': chapter_id}]
+        if not self._journaled:
+            records.append(None) # 所有修改均已落盘，日志可以清空
+        self._enqueue(records)
+
+    def _enqueue(self, records):
+        with self._condition:
+            self._pending.extend(records)
+            self._enqueued += len(records)
+            self._condition.notify_all()
+
+    # --- 写入线程 ---
+
+    def _run(self):
+        handle = None
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closing)
+                # 攒一个批次，减少 fsync 次数
+                self._condition.wait_for(lambda: self._flush_requested or self._closing, self.FLUSH_INTERVAL)
+                records, self._pending = self._pending, []
+                taken = self._enqueued
+                self._flush_requested = False
+                closing = self._closing
+            try:
+                handle = self._write(handle, records)
+            except OSError as e:
+                logger.error(f"写入编辑日志失败: {e}")
+                if handle is not None:
+                    handle.close()
+                handle = None
+            with self._condition:
+                self._written = taken
+                self._condition.notify_all()
+            if closing:
+                break
+        if handle is not None:
+            handle.close()
+
+    def _write(self, handle, records):
+        lines = []
+        truncate = False
+        for record in records:
+            if record is None:
+                # 清空之前的记录都已无意义
+                lines.clear()
+                truncate = True
+            else:
+                lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        if truncate and handle is None and not lines:
+            if os.path.exists(self.path):
+                open(self.path, 'w').close()
+            return handle
+        if handle is None:
+            handle = open(self.path, 'a', encoding='utf-8')
+        if truncate:
+            handle.seek(0)
+            handle.truncate()
+        if lines:
+            handle.write(''.join(lines))
+        handle.flush()
+        os.fsync(handle.fileno())
+        return handle
@@ -0,0 +1,306 @@
+# ShiCheng_Writer/modules/epub_builder.py
+"""
+EPUB 3 电子书生成（不依赖 Qt）
+作为导出引擎的一种写出器（接口同 export_engine.ChapterWriter）：书 → 封面、扉页，卷 → 卷首页，章 → 章节页，
+目录同时写出 EPUB 3 的 nav.xhtml 与供旧阅读器使用的 toc.ncx。
+章节 XHTML 在线程池中生成，按目录顺序流式写入 ZIP 容器，同时在处理中的章节数有上限，内存占用与书的大小无关。
+生成的章节 XHTML 按正文 hash（连同标题）缓存在磁盘上，再次导出时未修改的章节直接复用。
+"""
+import os
+import re
+import html
+import uuid
+import hashlib
+import logging
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from .database import calculate_hash
+from .utils import get_app_root
+
+logger = logging.getLogger(__name__)
+
+# 章节页的版式改动时递增，使旧的缓存失效
+RENDER_VERSION = 1
+LANGUAGE = "zh-CN"
+
+COVER_MEDIA_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+# XML 1.0 不允许的控制字符
+_INVALID_XML_CHARS = re.compile("[\\x00-\\x08\\x0b\\x0c\\x0e-\\x1f\\ufffe\\uffff]")
+
+STYLESHEET = """body { margin: 0 5%; line-height: 1.8; }
+h1, h2 { text-align: center; margin: 2em 0 1em; }
+h1.volume { margin-top: 30%; }
+p { text-indent: 2em; margin: 0 0 0.6em; }
+p.description { text-indent: 0; }
+div.cover { text-align: center; }
+div.cover img { max-width: 100%; max-height: 100%; }
+"""
+
+def default_cache_dir():
+    return os.path.join(get_app_root(), "cache", "epub")
+
+
+def _text(value):
+    return html.escape(_INVALID_XML_CHARS.sub("", value or ""), quote=True)
+
+
+def _paragraphs(content, css_class=None):
+    # 正文每行一段，去掉首行缩进（由样式表统一缩进），空行不输出
+    tag = f'<p class="{css_class}">' if css_class else "<p>"
+    for line in (content or "").splitlines():
+        line = line.strip()
+        if line:
+            yield f"{tag}{_text(line)}</p>"
+
+
+def xhtml_page(title, body, epub_type=None, stylesheet="../style.css"):
+    """一个 XHTML 内容文档（默认位于 OEBPS/text/ 下）"""
+    section = f'<section epub:type="{epub_type}">' if epub_type else "<section>"
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        "<!DOCTYPE html>\n"
+        f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+        f'xml:lang="{LANGUAGE}" lang="{LANGUAGE}">\n'
+        f'<head>\n<meta charset="utf-8"/>\n<title>{_text(title)}</title>\n'
+        f'<link rel="stylesheet" type="text/css" href="{stylesheet}"/>\n</head>\n'
+        f"<body>\n{section}\n{body}\n</section>\n</body>\n</html>\n"
+    )
+
+
+def render_chapter(title, content):
+    """章节页的 XHTML（bytes）"""
+    body = "\n".join([f"<h2>{_text(title)}</h2>", *_paragraphs(content)])
+    return xhtml_page(title, body, "chapter").encode("utf-8")
+
+
+def chapter_cache_key(chapter):
+    """缓存键：正文 hash（缺失时现算），连同标题与版式版本（标题也写在章节页里）"""
+    content_hash = chapter.get('hash') or calculate_hash(chapter.get('content') or "")
+    title_hash = hashlib.md5(f"{RENDER_VERSION}\0{chapter['title']}".encode("utf-8")).hexdigest()[:12]
+    return f"{content_hash}-{title_hash}"
+
+
+class EpubWriter:
+    """
+    EPUB 3 写出器
+    cache_dir 为 None 时不使用缓存；workers 为生成章节页的线程数（默认按 CPU 数，最多 4 个）
+    """
+    def __init__(self, path, cache_dir=None, workers=None):
+        self.path = path
+        fd, self._temp_path = tempfile.mkstemp(prefix=".export-", suffix=".part",
+                                               dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+        self._zip = zipfile.ZipFile(self._temp_path, 'w', zipfile.ZIP_DEFLATED)
+        # mimetype 必须是第一个文件且不压缩
+        self._zip.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        self._zip.writestr("META-INF/container.xml", (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>\n'
+            '</container>\n'))
+        self._zip.writestr("OEBPS/style.css", STYLESHEET)
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="EpubRender")
+        self._in_flight = deque() # (zip 内路径, Future)，按目录顺序
+        self._window = self.workers * 8 # 同时在处理中的章节数上限
+        self.cache_dir = cache_dir
+        self._book_cache_dir = None
+        self._used_cache_files = set()
+        self._book = None
+        self._manifest = [] # (id, href, media_type, properties)
+        self._spine = [] # 内容文档的 manifest id
+        self._toc = [] # [(卷名, href, [(章名, href), ...]), ...]
+        self.rendered = self.reused = 0
+
+    # --- 写出器接口 ---
+
+    def begin_book(self, book):
+        self._book = book
+        if self.cache_dir is not None:
+            self._book_cache_dir = os.path.join(self.cache_dir, str(book['id']))
+            os.makedirs(self._book_cache_dir, exist_ok=True)
+        self._write_cover(book.get('cover_path'))
+        body = [f"<h1>{_text(book['title'])}</h1>"]
+        body.extend(_paragraphs(book.get('description'), "description"))
+        self._add_document("title-page", "text/title.xhtml", xhtml_page(book['title'], "\n".join(body), "titlepage"))
+
+    def begin_volume(self, name):
+        number = len(self._toc) + 1
+        href = f"text/v{number:04d}.xhtml"
+        self._add_document(f"v{number:04d}", href, xhtml_page(name, f'<h1 class="volume">{_text(name)}</h1>', "part"))
+        self._toc.append((name, href, []))
+
+    def write_chapter(self, chapter):
+        href = f"text/c{chapter['id']}.xhtml"
+        self._manifest.append((f"c{chapter['id']}", href, "application/xhtml+xml", None))
+        self._spine.append(f"c{chapter['id']}")
+        self._toc[-1][2].append((chapter['title'], href))
+        self._in_flight.append((f"OEBPS/{href}", self._executor.submit(self._chapter_xhtml, chapter)))
+        while len(self._in_flight) > self._window:
+            self._write_next()
+
+    def close(self):
+        while self._in_flight:
+            self._write_next()
+
+    def commit(self):
+        self.close()
+        self._executor.shutdown()
+        self._zip.writestr("OEBPS/nav.xhtml", self._nav())
+        self._zip.writestr("OEBPS/toc.ncx", self._ncx())
+        self._zip.writestr("OEBPS/content.opf", self._opf())
+        self._zip.close()
+        os.replace(self._temp_path, self.path)
+        self._prune_cache()
+        logger.info(f"EPUB《{self._book['title']}》: 生成 {self.rendered} 章，复用缓存 {self.reused} 章")
+        return [self.path]
+
+    def abort(self):
+        self._executor.shutdown(cancel_futures=True)
+        self._in_flight.clear()
+        self._zip.close()
+        try:
+            os.remove(self._temp_path)
+        except OSError:
+            pass
+
+    # --- 章节页 ---
+
+    def _chapter_xhtml(self, chapter):
+        # 在线程池中执行：命中缓存时读文件，否则生成并写入缓存
+        if self._book_cache_dir is None:
+            return render_chapter(chapter['title'], chapter['content']), False
+        cache_file = os.path.join(self._book_cache_dir, chapter_cache_key(chapter) + ".xhtml")
+        self._used_cache_files.add(os.path.basename(cache_file))
+        try:
+            with open(cache_file, 'rb') as f:
+                return f.read(), True
+        except OSError:
+            pass
+        data = render_chapter(chapter['title'], chapter['content'])
+        try:
+            fd, temp_path = tempfile.mkstemp(suffix=".part", dir=self._book_cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, cache_file)
+        except OSError as e:
+            logger.warning(f"写入 EPUB 章节缓存失败: {e}")
+        return data, False
+
+    def _write_next(self):
+        name, future = self._in_flight.popleft()
+        data, reused = future.result()
+        if reused:
+            self.reused += 1
+        else:
+            self.rendered += 1
+        self._zip.writestr(name, data)
+
+    def _prune_cache(self):
+        # 只保留本次用到的缓存（已删除或修改过的章节的旧版本不再需要）
+        if self._book_cache_dir is None:
+            return
+        for file_name in os.listdir(self._book_cache_dir):
+            if file_name not in self._used_cache_files:
+                try:
+                    os.remove(os.path.join(self._book_cache_dir, file_name))
+                except OSError:
+                    pass
+
+    # --- 封面、目录与包文件 ---
+
+    def _add_document(self, item_id, href, text):
+        self._zip.writestr(f"OEBPS/{href}", text)
+        self._manifest.append((item_id, href, "application/xhtml+xml", None))
+        self._spine.append(item_id)
+
+    def _write_cover(self, cover_path):
+        if not cover_path or not os.path.isfile(cover_path):
+            return
+        extension = os.path.splitext(cover_path)[1].lower()
+        media_type = COVER_MEDIA_TYPES.get(extension)
+        if media_type is None:
+            logger.warning(f"不支持的封面图片格式: {cover_path}")
+            return
+        href = f"images/cover{extension}"
+        self._zip.write(cover_path, f"OEBPS/{href}", compress_type=zipfile.ZIP_STORED) # 图片本身已压缩
+        self._manifest.append(("cover-image", href, media_type, "cover-image"))
+        body = f'<div class="cover"><img src="../{href}" alt="{_text(self._book["title"])}"/></div>'
+        self._add_document("cover", "text/cover.xhtml", xhtml_page(self._book['title'], body, "cover"))
+
+    def _identifier(self):
+        # 同一本书每次导出的标识不变，阅读器据此识别为同一本书的新版本
+        name = f"shicheng-writer:book:{self._book['id']}:{self._book.get('createTime')}"
+        return f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, name)}"
+
+    def _nav(self):
+        items = []
+        for name, href, chapters in self._toc:
+            items.append(f'<li><a href="{href}">{_text(name)}</a>')
+            if chapters:
+                items.append("<ol>")
+                items.extend(f'<li><a href="{chapter_href}">{_text(title)}</a></li>' for title, chapter_href in chapters)
+                items.append("</ol>")
+            items.append("</li>")
+        body = '<nav epub:type="toc" id="toc">\n<h1>目录</h1>\n<ol>\n' + "\n".join(items) + "\n</ol>\n</nav>"
+        return xhtml_page("目录", body, stylesheet="style.css")
+
+    def _ncx(self):
+        points = []
+        order = 0
+        for name, href, chapters in self._toc:
+            order += 1
+            points.append(f'<navPoint id="p{order}" playOrder="{order}"><navLabel><text>{_text(name)}</text></navLabel>'
+                          f'<content src="{href}"/>')
+            for title, chapter_href in chapters:
+                order += 1
+                points.append(f'<navPoint id="p{order}" playOrder="{order}"><navLabel><text>{_text(title)}</text>'
+                              f'</navLabel><content src="{chapter_href}"/></navPoint>')
+            points.append("</navPoint>")
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">\n'
+            f'<head><meta name="dtb:uid" content="{self._identifier()}"/></head>\n'
+            f"<docTitle><text>{_text(self._book['title'])}</text></docTitle>\n"
+            "<navMap>\n" + "\n".join(points) + "\n</navMap>\n</ncx>\n"
+        )
+
+    def _opf(self):
+        book = self._book
+        modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        metadata = [
+            f'<dc:identifier id="book-id">{self._identifier()}</dc:identifier>',
+            f"<dc:title>{_text(book['title'])}</dc:title>",
+            f"<dc:language>{LANGUAGE}</dc:language>",
+            f'<meta property="dcterms:modified">{modified}</meta>',
+        ]
+        if book.get('description'):
+            metadata.append(f"<dc:description>{_text(book['description'])}</dc:description>")
+        manifest = ['<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>',
+                    '<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>',
+                    '<item id="style" href="style.css" media-type="text/css"/>']
+        for item_id, href, media_type, properties in self._manifest:
+            extra = f' properties="{properties}"' if properties else ""
+            manifest.append(f'<item id="{item_id}" href="{href}" media-type="{media_type}"{extra}/>')
+            if properties == "cover-image":
+                metadata.append('<meta name="cover" content="cover-image"/>') # 供 EPUB 2 阅读器识别封面
+        spine = [f'<itemref idref="{item_id}"/>' for item_id in self._spine]
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" xml:lang="{LANGUAGE}">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n' + "\n".join(metadata) + "\n</metadata>\n"
+            "<manifest>\n" + "\n".join(manifest) + "\n</manifest>\n"
+            '<spine toc="ncx">\n' + "\n".join(spine) + "\n</spine>\n"
+            "</package>\n"
+        )
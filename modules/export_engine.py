@@ -0,0 +1,228 @@
+# ShiCheng_Writer/modules/export_engine.py
+"""
+书籍导出（不依赖 Qt，界面与命令行共用）
+章节由 DataManager.iter_book_chapters() 按目录顺序逐批读出，逐章交给写出器写入文件，
+全书不在内存中拼接，数百万字的书也只占用一批章节的内存。
+写出器先写临时文件，全部写完后再替换目标文件；取消或出错时删除临时文件，不留下半成品。
+导出格式登记在 EXPORT_FORMATS 中，新增格式用 register_format()。
+"""
+import os
+import re
+import logging
+import tempfile
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+class ExportCancelled(Exception):
+    """导出被取消"""
+
+
+class ChapterWriter:
+    """
+    单个文件的写出器基类
+    调用顺序：begin_book → (begin_volume → write_chapter…)… → commit；出错或取消时调用 abort
+    """
+    extension = ".txt"
+    encoding = "utf-8"
+
+    def __init__(self, path):
+        self.path = path
+        fd, self._temp_path = tempfile.mkstemp(prefix=".export-", suffix=".part",
+                                               dir=os.path.dirname(os.path.abspath(path)))
+        self._file = os.fdopen(fd, 'w', encoding=self.encoding)
+
+    def write(self, text):
+        self._file.write(text)
+
+    def begin_book(self, book):
+        pass
+
+    def begin_volume(self, name):
+        pass
+
+    def write_chapter(self, chapter):
+        pass
+
+    def close(self):
+        """写完并关闭临时文件（尚不替换目标）"""
+        if not self._file.closed:
+            self._file.close()
+
+    def commit(self):
+        """用临时文件替换目标文件，返回写出的文件路径列表"""
+        self.close()
+        os.replace(self._temp_path, self.path)
+        return [self.path]
+
+    def abort(self):
+        self.close()
+        try:
+            os.remove(self._temp_path)
+        except OSError:
+            pass
+
+
+class TxtWriter(ChapterWriter):
+    """纯文本，保持原先“导出为 TXT”的版式；utf-8-sig 编码，兼容 Windows 记事本"""
+    extension = ".txt"
+    encoding = "utf-8-sig"
+
+    def begin_book(self, book):
+        self.write(f"书名：{book['title']}\n")
+        self.write(f"描述：{book.get('description') or ''}\n")
+        self.write("=" * 20 + "\n\n")
+
+    def begin_volume(self, name):
+        self.write(f"\n{'#' * 2} {name}\n\n")
+
+    def write_chapter(self, chapter):
+        self.write(f"### {chapter['title']}\n\n")
+        self.write(chapter['content'] or "")
+        self.write("\n\n" + "-" * 15 + "\n\n")
+
+
+# 行首出现时会被 Markdown 当作标记的字符（标题、引用、列表、分隔线、表格、代码），以及有序列表的“数字.”
+_MARKDOWN_LINE_START = re.compile(r"^([#>*+\-=|`~])")
+_MARKDOWN_ORDERED_LIST = re.compile(r"^(\d+)([.)])")
+
+def markdown_paragraph(line):
+    """正文的一行转为一个 Markdown 段落：去掉首行缩进，转义行首的标记字符"""
+    line = _MARKDOWN_LINE_START.sub(r"\\\1", line.strip())
+    return _MARKDOWN_ORDERED_LIST.sub(r"\1\\\2", line)
+
+
+class MarkdownWriter(ChapterWriter):
+    """Markdown：书名为一级标题、卷为二级、章为三级；正文每行一段"""
+    extension = ".md"
+    encoding = "utf-8"
+
+    def begin_book(self, book):
+        self.write(f"# {book['title']}\n\n")
+        description = (book.get('description') or "").strip()
+        if description:
+            for line in description.splitlines():
+                self.write(f"> {line.strip()}\n")
+            self.write("\n")
+
+    def begin_volume(self, name):
+        self.write(f"## {name}\n\n")
+
+    def write_chapter(self, chapter):
+        self.write(f"### {chapter['title']}\n\n")
+        for line in (chapter['content'] or "").splitlines():
+            paragraph = markdown_paragraph(line)
+            if paragraph:
+                self.write(paragraph + "\n\n")
+
+
+def safe_file_name(name, default="未命名"):
+    """去掉文件名中不允许的字符"""
+    name = re.sub(r'[\\/:*?"<>|\r\n\t]+', "_", name).strip(" ._")
+    return name or default
+
+
+class VolumeSplitWriter:
+    """
+    按卷拆分：目标为目录，每卷一个文件（“序号_卷名.扩展名”），文件内容由 writer_class 写出
+    所有文件都写完后才一起替换到目标目录
+    """
+    def __init__(self, directory, writer_class):
+        self.directory = directory
+        self.writer_class = writer_class
+        self._created = not os.path.isdir(directory)
+        os.makedirs(directory, exist_ok=True)
+        self._book = None
+        self._writers = []
+
+    def begin_book(self, book):
+        self._book = book
+
+    def begin_volume(self, name):
+        if self._writers:
+            self._writers[-1].close()
+        file_name = f"{len(self._writers) + 1:02d}_{safe_file_name(name)}{self.writer_class.extension}"
+        writer = self.writer_class(os.path.join(self.directory, file_name))
+        self._writers.append(writer)
+        writer.begin_book(self._book)
+        writer.begin_volume(name)
+
+    def write_chapter(self, chapter):
+        self._writers[-1].write_chapter(chapter)
+
+    def commit(self):
+        files = []
+        for writer in self._writers:
+            files.extend(writer.commit())
+        return files
+
+    def abort(self):
+        for writer in self._writers:
+            writer.abort()
+        if self._created:
+            try:
+                os.rmdir(self.directory)
+            except OSError:
+                pass
+
+
+# directory 为 True 时导出目标是目录，否则是文件
+ExportFormat = namedtuple('ExportFormat', ['label', 'extension', 'create', 'directory'])
+
+EXPORT_FORMATS = {}
+
+def register_format(name, label, extension, create, directory=False):
+    """登记导出格式：create(target) 返回写出器（接口同 ChapterWriter）"""
+    EXPORT_FORMATS[name] = ExportFormat(label, extension, create, directory)
+
+register_format('txt', "TXT 文本", ".txt", TxtWriter)
+register_format('markdown', "Markdown", ".md", MarkdownWriter)
+register_format('txt_volumes', "TXT（按卷拆分）", ".txt", lambda target: VolumeSplitWriter(target, TxtWriter), directory=True)
+register_format('markdown_volumes', "Markdown（按卷拆分）", ".md",
+                lambda target: VolumeSplitWriter(target, MarkdownWriter), directory=True)
+
+def _create_epub_writer(target):
+    # 用到时才导入 EPUB 生成器
+    from .epub_builder import EpubWriter, default_cache_dir
+    return EpubWriter(target, cache_dir=default_cache_dir())
+
+register_format('epub', "EPUB 电子书", ".epub", _create_epub_writer)
+
+
+def export_book(data_manager, book_id, target, format_name='txt', progress=None, is_cancelled=None):
+    """
+    把一本书导出到 target（文件，按卷拆分的格式为目录）
+    progress(done, total) 每写完一章调用一次；is_cancelled() 返回 True 时中止并抛出 ExportCancelled。
+    返回 {'chapters', 'characters', 'files'}
+    """
+    export_format = EXPORT_FORMATS[format_name]
+    book = data_manager.get_book_details(book_id)
+    if book is None:
+        raise ValueError(f"找不到书籍 {book_id}")
+    total = data_manager.count_chapters(book_id)
+    writer = export_format.create(target)
+    chapters = data_manager.iter_book_chapters(book_id)
+    done = characters = 0
+    current_volume = None
+    try:
+        writer.begin_book(book)
+        for chapter in chapters:
+            if is_cancelled is not None and is_cancelled():
+                raise ExportCancelled()
+            volume = (chapter['volume_id'], chapter['volume'])
+            if volume != current_volume:
+                current_volume = volume
+                writer.begin_volume(chapter['volume'])
+            writer.write_chapter(chapter)
+            done += 1
+            characters += len(chapter['content'] or "")
+            if progress is not None:
+                progress(done, total)
+        files = writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        chapters.close() # 提前结束时也要结束读事务、释放锁
+    logger.info(f"已导出《{book['title']}》: {done} 章, {characters} 字 -> {', '.join(files)}")
+    return {'chapters': done, 'characters': characters, 'files': files}
@@ -0,0 +1,72 @@
+# ShiCheng_Writer/modules/export_worker.py
+import logging
+from PySide6.QtCore import QThread, Signal
+
+from .database import DataManager
+from .export_engine import export_book, ExportCancelled
+
+logger = logging.getLogger(__name__)
+
+class ExportWorker(QThread):
+    """
+    书籍导出工作线程
+    在独立的数据库连接中按目录顺序流式读取章节并写出，界面可显示进度、随时取消（requestInterruption）。
+    """
+    progress = Signal(int, int) # done, total
+    export_finished = Signal(bool, str, dict) # success, message, 导出结果（见 export_engine.export_book）
+
+    def __init__(self, book_id, target, format_name, parent=None):
+        super().__init__(parent)
+        self.book_id = book_id
+        self.target = target
+        self.format_name = format_name
+
+    def run(self):
+        # 在线程内部实例化 DataManager，确保数据库连接线程安全
+        local_data_manager = DataManager()
+        try:
+            result = export_book(local_data_manager, self.book_id, self.target, self.format_name,
+                                 progress=self._report_progress, is_cancelled=self.isInterruptionRequested)
+            self.export_finished.emit(True, f"已导出 {result['chapters']} 章，共 {result['characters']} 字。", result)
+        except ExportCancelled:
+            self.export_finished.emit(False, "导出已取消。", {})
+        except Exception as e:
+            logger.error(f"导出书籍 {self.book_id} 失败: {e}", exc_info=True)
+            self.export_finished.emit(False, f"导出失败：{e}", {})
+        finally:
+            local_data_manager.close()
+
+    def _report_progress(self, done, total):
+        if done % 20 == 0 or done == total:
+            self.progress.emit(done, total)
+
+
+class BatchExportWorker(QThread):
+    """
+    批量导出工作线程
+    实际的导出在 batch_export 的子进程中并行进行，本线程只负责派发、汇总与转发进度。
+    """
+    progress = Signal(int, int, str) # done, total, 刚处理完的书名
+    export_finished = Signal(bool, str, dict) # success, message, 汇总（见 batch_export.export_library）
+
+    def __init__(self, target_dir, format_name, group=None, force=False, parent=None):
+        super().__init__(parent)
+        self.target_dir = target_dir
+        self.format_name = format_name
+        self.group = group
+        self.force = force
+
+    def run(self):
+        from .batch_export import export_library # 用到时才导入（含 multiprocessing），不拖慢程序启动
+        try:
+            summary = export_library(self.target_dir, self.format_name, group=self.group, force=self.force,
+                                     progress=self.progress.emit, is_cancelled=self.isInterruptionRequested)
+            message = f"导出 {len(summary['exported'])} 本，未修改跳过 {len(summary['skipped'])} 本"
+            if summary['failed']:
+                message += f"，失败 {len(summary['failed'])} 本"
+            self.export_finished.emit(not summary['failed'], message + "。", summary)
+        except ExportCancelled:
+            self.export_finished.emit(False, "导出已取消。", {})
+        except Exception as e:
+            logger.error(f"批量导出到 {self.target_dir} 失败: {e}", exc_info=True)
+            self.export_finished.emit(False, f"导出失败：{e}", {})
@@ -29,6 +29,11 @@ class InspirationPanel(QWidget):
         self.kit_panel.load_fragments()
         self.warehouse_panel.load_items()
 
+    def apply_changes(self, changes):
+        """按数据变更逐行更新两个子面板"""
+        self.kit_panel.apply_changes(changes)
+        self.warehouse_panel.apply_changes(changes)
+
 class InspirationKitPanel(QWidget):
     """灵感锦囊（未整理的灵感 - 增加右键菜单和双击编辑）"""
     def __init__(self, data_manager, parent=None):
@@ -49,27 +54,65 @@ class InspirationKitPanel(QWidget):
         layout.addWidget(QLabel("灵感碎片 (双击编辑，右键菜单)"))
         layout.addWidget(self.list_widget)
         
-        self.load_fragments()
+        self._loaded = False # 第一次显示时才读取
+
+    def showEvent(self, event):
+        if not self._loaded:
+            self.load_fragments()
+        super().showEvent(event)
 
     def load_fragments(self):
+        self._loaded = True
         self.list_widget.clear()
         fragments = self.data_manager.get_inspiration_fragments()
         for frag in fragments:
-            # 显示前50个字符
-            content_preview = frag['content'].replace('\n', ' ')
-            if len(content_preview) > 50:
-                content_preview = content_preview[:50] + "..."
-            
-            item = QListWidgetItem(f"[{frag['type']}] {content_preview}")
-            item.setToolTip(frag['content']) # 悬浮显示全文
-            item.setData(Qt.UserRole, frag)  # 存储完整数据对象
+            item = QListWidgetItem()
+            self._set_fragment(item, frag)
             self.list_widget.addItem(item)
+
+    @staticmethod
+    def _set_fragment(item, frag):
+        # 显示前50个字符
+        content_preview = frag['content'].replace('\n', ' ')
+        if len(content_preview) > 50:
+            content_preview = content_preview[:50] + "..."
+        item.setText(f"[{frag['type']}] {content_preview}")
+        item.setToolTip(frag['content']) # 悬浮显示全文
+        item.setData(Qt.UserRole, frag)  # 存储完整数据对象
+
+    def _find_fragment_row(self, fragment_id):
+        for row in range(self.list_widget.count()):
+            if self.list_widget.item(row).data(Qt.UserRole)['id'] == fragment_id:
+                return row
+        return -1
+
+    def apply_changes(self, changes):
+        """按数据变更逐行插入、更新、删除灵感碎片，保留选中状态"""
+        if not self._loaded:
+            return # 尚未读取，显示时读到的已是最新数据
+        for change in changes:
+            if change.entity != 'inspiration_fragment':
+                continue
+            if change.op == 'reset':
+                self.load_fragments()
+                continue
+            row = self._find_fragment_row(change.id)
+            if change.op == 'delete':
+                if row >= 0:
+                    self.list_widget.takeItem(row)
+            elif row >= 0: # 更新，或从备份覆盖已有的碎片
+                item = self.list_widget.item(row)
+                self._set_fragment(item, {**item.data(Qt.UserRole), **change.fields})
+            elif change.op == 'insert':
+                # 列表按创建时间倒序，新记录在最前
+                item = QListWidgetItem()
+                self._set_fragment(item, {'id': change.id, 'created_at': None, **change.fields})
+                self.list_widget.insertItem(0, item)
             
     def add_fragment(self):
         text, ok = QInputDialog.getMultiLineText(self, "记录灵感", "写下你的想法：")
         if ok and text:
             self.data_manager.add_inspiration_fragment('text', text, '快速记录')
-            self.load_fragments()
 
     def show_context_menu(self, pos):
         item = self.list_widget.itemAt(pos)
@@ -98,7 +141,6 @@ class InspirationKitPanel(QWidget):
             # 需要在 database.py 中实现 update_inspiration_fragment
             if hasattr(self.data_manager, 'update_inspiration_fragment'):
                 self.data_manager.update_inspiration_fragment(frag['id'], text)
-                self.load_fragments()
             else:
                 QMessageBox.warning(self, "未实现", "数据库缺少更新功能 (update_inspiration_fragment)。")
 
@@ -108,7 +150,6 @@ class InspirationKitPanel(QWidget):
             # 需要在 database.py 中实现 delete_inspiration_fragment
             if hasattr(self.data_manager, 'delete_inspiration_fragment'):
                 self.data_manager.delete_inspiration_fragment(frag['id'])
-                self.load_fragments()
             else:
                 # 兼容性回退：如果没这个方法，提示用户
                 QMessageBox.warning(self, "未实现", "数据库缺少删除功能 (delete_inspiration_fragment)。")
@@ -136,9 +177,15 @@ class InspirationWarehousePanel(QWidget):
         layout.addWidget(QLabel("灵感资料库 (右键管理)"))
         layout.addWidget(self.tree_view)
         
-        self.load_items()
+        self._loaded = False # 第一次显示时才读取
+
+    def showEvent(self, event):
+        if not self._loaded:
+            self.load_items()
+        super().showEvent(event)
 
     def load_items(self):
+        self._loaded = True
         self.model.clear()
         items = self.data_manager.get_inspiration_items()
         
@@ -154,19 +201,86 @@ class InspirationWarehousePanel(QWidget):
                 parent_id = None
                 
             parent_item = item_dict[parent_id]
-            new_item = QStandardItem(item_data['title'])
-            new_item.setData(item_data, Qt.UserRole)
-            new_item.setEditable(False)
+            new_item = self._make_item(item_data)
             parent_item.appendRow(new_item)
             item_dict[item_data['id']] = new_item
             
         self.tree_view.expandAll()
 
+    @staticmethod
+    def _make_item(item_data):
+        new_item = QStandardItem(item_data['title'])
+        new_item.setData(item_data, Qt.UserRole)
+        new_item.setEditable(False)
+        return new_item
+
+    def _find_item(self, item_id, parent=None):
+        parent = parent or self.model.invisibleRootItem()
+        for row in range(parent.rowCount()):
+            child = parent.child(row)
+            if child.data(Qt.UserRole)['id'] == item_id:
+                return child
+            found = self._find_item(item_id, child)
+            if found is not None:
+                return found
+        return None
+
+    def _insert_sorted(self, parent_item, new_item):
+        # 同级条目按标题排序，与 load_items 的查询顺序一致
+        row = 0
+        while row < parent_item.rowCount() and parent_item.child(row).text() <= new_item.text():
+            row += 1
+        parent_item.insertRow(row, [new_item])
+
+    def _take_item(self, item):
+        parent_item = item.parent() or self.model.invisibleRootItem()
+        return parent_item.takeRow(item.row())[0]
+
+    def apply_changes(self, changes):
+        """按数据变更逐行插入、更新、移动、删除条目，保留展开与选中状态"""
+        if not self._loaded:
+            return # 尚未读取，显示时读到的已是最新数据
+        root = self.model.invisibleRootItem()
+        for change in changes:
+            if change.entity != 'inspiration_item':
+                continue
+            if change.op == 'reset':
+                self.load_items()
+                continue
+            item = self._find_item(change.id)
+            if change.op == 'delete':
+                if item is None:
+                    continue
+                # 子条目不会随之删除，与重新载入时一样挂到根节点下
+                while item.rowCount():
+                    self._insert_sorted(root, item.takeRow(0)[0])
+                (item.parent() or root).removeRow(item.row())
+                continue
+            if item is None:
+                if change.op != 'insert':
+                    continue
+                item_data = {'id': change.id, **change.fields}
+                parent_item = self._find_item(item_data.get('parent_id')) or root
+                self._insert_sorted(parent_item, self._make_item(item_data))
+                continue
+            # 更新，或从备份覆盖已有的条目
+            item_data = {**item.data(Qt.UserRole), **change.fields}
+            item.setData(item_data, Qt.UserRole)
+            if 'title' in change.fields:
+                item.setText(item_data['title'])
+            new_parent = self._find_item(item_data.get('parent_id')) or root
+            if new_parent.index() != (item.parent() or root).index():
+                current = self.tree_view.currentIndex() == item.index()
+                was_expanded = self.tree_view.isExpanded(item.index())
+                self._insert_sorted(new_parent, self._take_item(item))
+                self.tree_view.setExpanded(item.index(), was_expanded)
+                if current:
+                    self.tree_view.setCurrentIndex(item.index())
+
     def add_item(self):
         title, ok = QInputDialog.getText(self, "新建灵感", "请输入标题：")
         if ok and title:
             self.data_manager.add_inspiration_item(title=title)
-            self.load_items()
 
     def show_context_menu(self, pos):
         index = self.tree_view.indexAt(pos)
@@ -204,7 +318,6 @@ class InspirationWarehousePanel(QWidget):
              if hasattr(self.data_manager, 'update_inspiration_item'):
                 # 假设 update 接口: id, title=..., content=...
                 self.data_manager.update_inspiration_item(data['id'], title=new_title)
-                self.load_items()
              else:
                 QMessageBox.warning(self, "提示", "请在 Database 中实现 update_inspiration_item。")
 
@@ -230,7 +343,6 @@ class InspirationWarehousePanel(QWidget):
             new_content = text_edit.toPlainText()
             if hasattr(self.data_manager, 'update_inspiration_item'):
                 self.data_manager.update_inspiration_item(data['id'], content=new_content)
-                self.load_items()
 
     def delete_item(self, index):
         item = self.model.itemFromIndex(index)
@@ -238,6 +350,5 @@ class InspirationWarehousePanel(QWidget):
         if QMessageBox.question(self, "删除", f"确定删除 '{data['title']}' 吗？") == QMessageBox.Yes:
             if hasattr(self.data_manager, 'delete_inspiration_item'):
                 self.data_manager.delete_inspiration_item(data['id'])
-                self.load_items()
             else:
                 QMessageBox.warning(self, "提示", "请在 Database 中实现 delete_inspiration_item。")
\ No newline at end of file
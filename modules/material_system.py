@@ -7,6 +7,48 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QTreeView, QPushButton, QHB
 from PySide6.QtGui import QStandardItemModel, QStandardItem, QAction
 from PySide6.QtCore import Qt, Signal
 import json
+import html
+
+def build_material_card_html(material):
+    """根据 get_material_details 的结果生成悬浮卡片 HTML"""
+    scope = "全局素材" if material.get('book_id') is None else "本书素材"
+    parts = [f"<b>{html.escape(material['name'])}</b> "
+             f"<span style='color: gray;'>[{html.escape(material['type'])} · {scope}]</span>"]
+    if material.get('description'):
+        parts.append(f"<i>{html.escape(material['description'])}</i>")
+
+    content = material.get('content') or {}
+    if content.get('value'):
+        parts.append(html.escape(content['value']).replace('\n', '<br>'))
+    if content.get('attributes'):
+        rows = []
+        for attr in content['attributes']:
+            value = attr.get('value')
+            if isinstance(value, dict):
+                value = value.get('name', '')
+            elif isinstance(value, list):
+                value = "、".join(str(v) for v in value)
+            rows.append(f"<tr><td style='color: gray;'>{html.escape(attr.get('name', ''))}</td>"
+                        f"<td>{html.escape(str(value or ''))}</td></tr>")
+        parts.append(f"<table cellspacing='4'>{''.join(rows)}</table>")
+    if content.get('items'):
+        parts.append("<br>".join(f"• {html.escape(str(item))}" for item in content['items']))
+    return "<br>".join(parts)
+
+class MaterialCardCache:
+    """素材悬浮卡片缓存：每个素材只查询一次数据库，素材变更时整体失效"""
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._cards = {}
+
+    def get_card(self, material_id):
+        if material_id not in self._cards:
+            details = self.data_manager.get_material_details(material_id)
+            self._cards[material_id] = build_material_card_html(details) if details else None
+        return self._cards[material_id]
+
+    def invalidate(self):
+        self._cards.clear()
 
 class MaterialSelectionDialog(QDialog):
     """一个用于选择引用的素材的对话框"""
@@ -401,6 +443,8 @@ class MaterialEditDialog(QDialog):
 class MaterialPanel(QWidget):
     """素材面板，用于展示和管理素材"""
     materials_changed = Signal()
+    GLOBAL_ROOT_TEXT = "全局素材"
+    BOOK_ROOT_TEXT = "本书素材"
 
     def __init__(self, data_manager, parent=None):
         super().__init__(parent)
@@ -434,11 +478,12 @@ class MaterialPanel(QWidget):
         self.layout.addWidget(self.tree_view)
         self.layout.addLayout(button_layout)
         
-    def set_book(self, book_id):
+    def set_book(self, book_id, materials=None):
+        """materials 为已读取的素材列表（同 DataManager.get_materials），未提供时在此查询"""
         self.current_book_id = book_id
-        self.load_materials()
+        self.load_materials(materials)
 
-    def load_materials(self):
+    def load_materials(self, materials=None):
         self.model.clear()
         if self.current_book_id is None:
             self.add_button.setEnabled(False)
@@ -450,17 +495,16 @@ class MaterialPanel(QWidget):
         self.edit_button.setEnabled(True)
         self.delete_button.setEnabled(True)
 
-        materials = self.data_manager.get_materials(self.current_book_id)
+        if materials is None:
+            materials = self.data_manager.get_materials(self.current_book_id)
         
-        global_root = QStandardItem("全局素材")
+        global_root = QStandardItem(self.GLOBAL_ROOT_TEXT)
         global_root.setEditable(False)
-        book_root = QStandardItem("本书素材")
+        book_root = QStandardItem(self.BOOK_ROOT_TEXT)
         book_root.setEditable(False)
         
         for material in materials:
-            item = QStandardItem(f"{material['name']} ({material['type']})")
-            item.setEditable(False)
-            item.setData(material['id'], Qt.UserRole)
+            item = self._make_material_item(material['id'], material)
             if material['book_id'] is None:
                 global_root.appendRow(item)
             else:
@@ -473,6 +517,62 @@ class MaterialPanel(QWidget):
         
         self.tree_view.expandAll()
 
+    @staticmethod
+    def _make_material_item(material_id, material):
+        item = QStandardItem(f"{material['name']} ({material['type']})")
+        item.setEditable(False)
+        item.setData(material_id, Qt.UserRole)
+        return item
+
+    def _find_material_item(self, material_id):
+        for row in range(self.model.rowCount()):
+            root = self.model.item(row)
+            for child_row in range(root.rowCount()):
+                child = root.child(child_row)
+                if child.data(Qt.UserRole) == material_id:
+                    return child
+        return None
+
+    def _material_root(self, is_global):
+        text = self.GLOBAL_ROOT_TEXT if is_global else self.BOOK_ROOT_TEXT
+        for row in range(self.model.rowCount()):
+            if self.model.item(row).text() == text:
+                return self.model.item(row)
+        root = QStandardItem(text)
+        root.setEditable(False)
+        # 全局素材始终在前
+        self.model.insertRow(0 if is_global else self.model.rowCount(), root)
+        self.tree_view.expand(root.index())
+        return root
+
+    def _remove_material_item(self, item):
+        root = item.parent()
+        root.removeRow(item.row())
+        if root.rowCount() == 0:
+            self.model.removeRow(root.row())
+
+    def apply_changes(self, changes):
+        """按数据变更逐行插入、更新、删除素材条目，保留展开与选中状态"""
+        material_changes = [change for change in changes if change.entity == 'material']
+        if not material_changes:
+            return
+        if self.current_book_id is not None:
+            for change in material_changes:
+                if change.op == 'reset':
+                    self.load_materials()
+                    continue
+                item = self._find_material_item(change.id)
+                if change.op == 'update':
+                    if item is not None:
+                        item.setText(f"{change.fields['name']} ({change.fields['type']})")
+                    continue
+                if item is not None: # 删除，或覆盖已有的素材（从备份导入）
+                    self._remove_material_item(item)
+                book_id = change.fields.get('book_id')
+                if change.op == 'insert' and book_id in (None, self.current_book_id):
+                    self._material_root(book_id is None).appendRow(self._make_material_item(change.id, change.fields))
+        self.materials_changed.emit()
+
     def open_context_menu(self, position):
         index = self.tree_view.indexAt(position)
         if not index.isValid() or not index.parent().isValid():
@@ -501,10 +601,9 @@ class MaterialPanel(QWidget):
             QMessageBox.warning(self, "提示", "请先选择一本书籍。")
             return
             
+        # 新素材经数据变更通知插入列表
         dialog = MaterialEditDialog(self.data_manager, book_id=self.current_book_id, parent=self)
-        if dialog.exec():
-            self.load_materials()
-            self.materials_changed.emit()
+        dialog.exec()
 
     def edit_selected_material(self, index=None): # Can be called by signal or button
         material_id = self.get_selected_material_id()
@@ -517,9 +616,7 @@ class MaterialPanel(QWidget):
                 return
         
         dialog = MaterialEditDialog(self.data_manager, material_id=material_id, book_id=self.current_book_id, parent=self)
-        if dialog.exec():
-            self.load_materials()
-            self.materials_changed.emit()
+        dialog.exec()
 
     def delete_selected_material(self):
         material_id = self.get_selected_material_id()
@@ -531,8 +628,5 @@ class MaterialPanel(QWidget):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            if self.data_manager.delete_material(material_id):
-                self.load_materials()
-                self.materials_changed.emit()
-            else:
+            if not self.data_manager.delete_material(material_id):
                 QMessageBox.critical(self, "失败", "删除素材时发生错误。")
\ No newline at end of file
@@ -0,0 +1,310 @@
+# ShiCheng_Writer/modules/migrations.py
+"""
+数据库结构迁移（不依赖 Qt）
+数据库的结构版本记录在 PRAGMA user_version 中；MIGRATIONS 按版本号顺序登记各个迁移步骤，
+启动时只执行版本号大于当前版本的步骤，每一步在独立的事务中执行并同时写入新的版本号，失败时整步回滚。
+结构已是最新时，启动只需读取一次 user_version。
+
+修改数据库结构时在末尾追加新的步骤，不要修改已发布的步骤：
+步骤中的回填逻辑按编写时的规则固定下来，不调用之后可能变化的 DataManager 代码。
+"""
+
+import json
+import logging
+
+from .text_utils import chapter_snippet
+from .order_keys import keys_between
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = [] # [(version, 函数)]，按版本号递增
+
+
+def migration(version):
+    """登记迁移步骤；函数接收 sqlite3.Cursor，在事务内执行"""
+    def register(func):
+        expected = len(MIGRATIONS) + 1
+        if version != expected:
+            raise ValueError(f"迁移版本号应为 {expected}，实际为 {version}")
+        MIGRATIONS.append((version, func))
+        return func
+    return register
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version(migrations=None):
+    migrations = MIGRATIONS if migrations is None else migrations
+    return migrations[-1][0] if migrations else 0
+
+
+def migrate(conn, migrations=None):
+    """
+    把数据库迁移到最新版本，返回迁移后的版本号
+    每个步骤一个事务（BEGIN IMMEDIATE），开始后重新读取版本号，多个进程同时启动时不会重复执行同一步骤。
+    数据库版本高于本程序已知的版本（由较新的程序创建）时不做任何修改。
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    target = latest_version(migrations)
+    version = schema_version(conn)
+    if version == target:
+        return version
+    if version > target:
+        logger.warning(f"数据库结构版本 {version} 高于本程序支持的版本 {target}，跳过迁移。")
+        return version
+
+    for step_version, func in migrations:
+        if step_version <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            if step_version <= version:
+                conn.rollback()
+                continue
+            logger.info(f"数据库迁移到版本 {step_version}: {(func.__doc__ or func.__name__).strip()}")
+            func(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {int(step_version)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        version = step_version
+    return version
+
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def _add_missing_columns(cursor, table, columns):
+    # 引入版本号之前的数据库可能处于任意中间状态，逐列检查
+    existing = _columns(cursor, table)
+    added = []
+    for name, definition in columns:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN "{name}" {definition}')
+            added.append(name)
+    return added
+
+
+@migration(1)
+def _initial_schema(cursor):
+    """初始结构（包括引入版本号之前的各项补列）"""
+    # 早期版本的素材表名为 settings
+    if _table_exists(cursor, 'settings') and not _table_exists(cursor, 'materials'):
+        cursor.execute("ALTER TABLE settings RENAME TO materials")
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        cover_path TEXT,
+        "group" TEXT,
+        createTime INTEGER,
+        lastEditTime INTEGER
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS chapters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER NOT NULL,
+        volume TEXT,
+        title TEXT NOT NULL,
+        content TEXT,
+        word_count INTEGER DEFAULT 0,
+        createTime INTEGER,
+        lastEditTime INTEGER,
+        hash TEXT,
+        FOREIGN KEY (book_id) REFERENCES books (id) ON DELETE CASCADE
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS materials (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL,
+        description TEXT,
+        content TEXT,
+        book_id INTEGER,
+        FOREIGN KEY (book_id) REFERENCES books (id) ON DELETE CASCADE,
+        UNIQUE(name, book_id)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS recycle_bin (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        item_type TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        item_data TEXT,
+        deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS inspiration_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        content TEXT,
+        tags TEXT,
+        parent_id INTEGER,
+        FOREIGN KEY (parent_id) REFERENCES inspiration_items (id) ON DELETE CASCADE
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS inspiration_fragments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        content TEXT NOT NULL,
+        source TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS preferences (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS timelines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        description TEXT,
+        FOREIGN KEY (book_id) REFERENCES books (id) ON DELETE CASCADE
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS timeline_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timeline_id INTEGER NOT NULL,
+        parent_id INTEGER,
+        title TEXT NOT NULL,
+        content TEXT,
+        event_time TEXT,
+        order_index INTEGER DEFAULT 0,
+        status TEXT,
+        referenced_materials TEXT,
+        FOREIGN KEY (timeline_id) REFERENCES timelines (id) ON DELETE CASCADE,
+        FOREIGN KEY (parent_id) REFERENCES timeline_events (id) ON DELETE CASCADE
+    )
+    """)
+
+    _add_missing_columns(cursor, 'books', [('cover_path', 'TEXT'), ('group', 'TEXT'),
+                                           ('createTime', 'INTEGER'), ('lastEditTime', 'INTEGER')])
+    _add_missing_columns(cursor, 'chapters', [('createTime', 'INTEGER'), ('hash', 'TEXT'),
+                                              ('lastEditTime', 'INTEGER')])
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_book_id ON chapters(book_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_last_edit ON chapters(lastEditTime DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_volume ON chapters(volume)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_group ON books(\"group\")")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_materials_book_id ON materials(book_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_timelines_book_id ON timelines(book_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_timeline_events_timeline_id ON timeline_events(timeline_id)")
+
+
+@migration(2)
+def _metadata_projections(cursor):
+    """章节预览与回收站元数据列，及其覆盖索引"""
+    if 'snippet' in _add_missing_columns(cursor, 'chapters', [('snippet', 'TEXT')]):
+        # 补齐预览；只取正文开头
+        cursor.execute("SELECT id, substr(content, 1, 4000) AS head FROM chapters")
+        updates = []
+        while True:
+            rows = cursor.fetchmany(200)
+            if not rows:
+                break
+            updates.extend((chapter_snippet(head), chapter_id) for chapter_id, head in rows)
+        cursor.executemany("UPDATE chapters SET snippet = ? WHERE id = ?", updates)
+
+    added = _add_missing_columns(cursor, 'recycle_bin', [('title', 'TEXT'), ('book_id', 'INTEGER'),
+                                                         ('chapter_count', 'INTEGER')])
+    if added:
+        cursor.execute("SELECT id, item_type, item_id, item_data FROM recycle_bin")
+        updates = []
+        while True:
+            rows = cursor.fetchmany(50)
+            if not rows:
+                break
+            for recycle_id, item_type, item_id, raw in rows:
+                try:
+                    item_data = json.loads(raw)
+                except (TypeError, ValueError):
+                    item_data = {}
+                if item_type == 'book':
+                    book_id, chapter_count = item_id, None
+                elif item_type == 'chapter':
+                    book_id, chapter_count = item_data.get('book_id'), None
+                else:
+                    book_id, chapter_count = item_id or None, len(item_data.get('chapters', []))
+                updates.append((item_data.get('title'), book_id, chapter_count, recycle_id))
+        cursor.executemany("UPDATE recycle_bin SET title = ?, book_id = ?, chapter_count = ? WHERE id = ?", updates)
+
+    # 字数、hash、预览等列位于正文之后，直接读取要走完正文的溢出页。
+    # 章节元数据另存一份覆盖索引（即不含正文的投影），列表、校验缓存、判断保存是否多余时经它读取，不触及正文
+    cursor.execute("DROP INDEX IF EXISTS idx_chapters_id_hash")
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_chapters_meta
+    ON chapters(id, book_id, volume, title, word_count, createTime, lastEditTime, hash, snippet)
+    """)
+    # 回收站列表同理：元数据列的覆盖索引，列出条目时不读取 item_data 中的整章正文
+    cursor.execute("DROP INDEX IF EXISTS idx_recycle_bin_deleted_at")
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_recycle_bin_listing
+    ON recycle_bin(deleted_at DESC, id, item_type, item_id, title, book_id, chapter_count)
+    """)
+
+
+@migration(3)
+def _volumes_and_order_keys(cursor):
+    """卷表与章节排序键"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS volumes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        order_key TEXT NOT NULL,
+        createTime INTEGER,
+        FOREIGN KEY (book_id) REFERENCES books (id) ON DELETE CASCADE,
+        UNIQUE(book_id, name)
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_volumes_book_order ON volumes(book_id, order_key)")
+    _add_missing_columns(cursor, 'chapters', [('volume_id', 'INTEGER'), ('order_key', 'TEXT')])
+
+    # 原来卷只是章节的 volume 文本列：按原有的显示顺序（卷名、章节 id）建卷并分配排序键。
+    # volume 列保留旧数据，此后不再读写
+    cursor.execute("SELECT id, book_id, volume FROM chapters ORDER BY book_id, volume, id")
+    books = {} # book_id -> {卷名: [chapter_id, ...]}，保持出现顺序
+    for chapter_id, book_id, volume in cursor.fetchall():
+        books.setdefault(book_id, {}).setdefault(volume or "未分卷", []).append(chapter_id)
+    updates = []
+    for book_id, volumes in books.items():
+        for name, volume_key in zip(volumes, keys_between(None, None, len(volumes))):
+            cursor.execute("INSERT INTO volumes (book_id, name, order_key) VALUES (?, ?, ?)",
+                           (book_id, name, volume_key))
+            volume_id = cursor.lastrowid
+            chapter_ids = volumes[name]
+            updates.extend((volume_id, chapter_key, chapter_id)
+                           for chapter_id, chapter_key in zip(chapter_ids, keys_between(None, None, len(chapter_ids))))
+    cursor.executemany("UPDATE chapters SET volume_id = ?, order_key = ? WHERE id = ?", updates)
+
+    # 章节树按 (书籍, 卷, 排序键) 顺序扫描索引即可载入；它的前缀取代了原来的 book_id 索引
+    cursor.execute("DROP INDEX IF EXISTS idx_chapters_volume")
+    cursor.execute("DROP INDEX IF EXISTS idx_chapters_book_id")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_order ON chapters(book_id, volume_id, order_key)")
+    cursor.execute("DROP INDEX IF EXISTS idx_chapters_meta")
+    cursor.execute("""
+    CREATE INDEX idx_chapters_meta
+    ON chapters(id, book_id, volume_id, order_key, title, word_count, createTime, lastEditTime, hash, snippet)
+    """)
@@ -0,0 +1,161 @@
+# ShiCheng_Writer/modules/order_keys.py
+"""
+分数排序键（不依赖 Qt）
+卷与章节的顺序由字符串 order_key 决定，按字节序比较（与 SQLite 默认的 BINARY 排序一致）。
+任意两个键之间总能生成一个新键，因此把条目移动到两个相邻条目之间只需改写它自己的 order_key。
+
+键由“整数部分 + 小数部分”组成，字符取自 62 进制数字表：
+整数部分的首字符表示其长度（a-z 为正，依次 2~27 个字符；A-Z 为负），其后为 62 进制数字；
+小数部分不以 '0' 结尾。在末尾追加时只递增整数部分，连续追加上万个条目键长也只有三四个字符。
+"""
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+INTEGER_ZERO = "a0"
+SMALLEST_INTEGER = "A" + "0" * 26
+
+
+def _integer_length(head):
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"无效的排序键首字符: {head!r}")
+
+
+def _integer_part(key):
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"无效的排序键: {key!r}")
+    return key[:length]
+
+
+def validate_key(key):
+    if key == SMALLEST_INTEGER:
+        raise ValueError(f"无效的排序键: {key!r}")
+    integer = _integer_part(key)
+    if key[len(integer):].endswith("0"):
+        raise ValueError(f"无效的排序键: {key!r}")
+
+
+def _midpoint(a, b):
+    """a < b 的两个小数部分（b 为 None 表示 1）之间的小数部分"""
+    if b is not None:
+        # 去掉相同的前缀
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    # 相邻的两个数字：取 b 的首位（b 更长时），或在 a 的首位之后继续二分
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _increment_integer(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        d = DIGITS.index(digits[i]) + 1
+        if d < BASE:
+            digits[i] = DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = "0"
+    # 进位：整数部分变长
+    if head == "Z":
+        return INTEGER_ZERO
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append("0")
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement_integer(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        d = DIGITS.index(digits[i]) - 1
+        if d >= 0:
+            digits[i] = DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def key_between(a, b):
+    """
+    返回严格位于 a 与 b 之间的排序键
+    a 为 None 表示最前，b 为 None 表示最后；两者都为 None 时返回第一个键。要求 a < b。
+    """
+    if a is not None:
+        validate_key(a)
+    if b is not None:
+        validate_key(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"排序键 {a!r} 不小于 {b!r}")
+    if a is None:
+        if b is None:
+            return INTEGER_ZERO
+        integer_b = _integer_part(b)
+        fraction_b = b[len(integer_b):]
+        if integer_b == SMALLEST_INTEGER:
+            return integer_b + _midpoint("", fraction_b)
+        if integer_b < b:
+            return integer_b
+        result = _decrement_integer(integer_b)
+        if result is None:
+            raise ValueError("排序键已无法再向前扩展")
+        return result
+    integer_a = _integer_part(a)
+    fraction_a = a[len(integer_a):]
+    if b is None:
+        result = _increment_integer(integer_a)
+        return integer_a + _midpoint(fraction_a, None) if result is None else result
+    integer_b = _integer_part(b)
+    fraction_b = b[len(integer_b):]
+    if integer_a == integer_b:
+        return integer_a + _midpoint(fraction_a, fraction_b)
+    result = _increment_integer(integer_a)
+    if result is None:
+        raise ValueError("排序键已无法再向后扩展")
+    if result < b:
+        return result
+    return integer_a + _midpoint(fraction_a, None)
+
+
+def keys_between(a, b, n):
+    """返回位于 a 与 b 之间、依次递增的 n 个排序键（批量插入或移动多个条目时使用）"""
+    if n <= 0:
+        return []
+    if n == 1:
+        return [key_between(a, b)]
+    if b is None:
+        keys = [key_between(a, None)]
+        for _ in range(n - 1):
+            keys.append(key_between(keys[-1], None))
+        return keys
+    if a is None:
+        keys = [key_between(None, b)]
+        for _ in range(n - 1):
+            keys.append(key_between(None, keys[-1]))
+        keys.reverse()
+        return keys
+    middle = n // 2
+    key = key_between(a, b)
+    return keys_between(a, key, middle) + [key] + keys_between(key, b, n - middle - 1)
@@ -0,0 +1,99 @@
+# ShiCheng_Writer/modules/perf_monitor.py
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 指标名称 -> 显示名称
+METRIC_LABELS = {
+    'keypress_to_paint': "按键到重绘",
+    'highlight_block': "单段高亮",
+    'rehighlight': "全文重新高亮",
+    'load_text': "章节正文载入",
+    'save_chapter': "章节保存",
+}
+
+class PerfMonitor:
+    """
+    可选的性能采样器（默认关闭）
+    各处埋点先检查 enabled，关闭时只有一次属性读取的开销。
+    每个指标保留最近 MAX_SAMPLES 个耗时样本（毫秒），用于计算 p50/p95/p99。
+    """
+    MAX_SAMPLES = 5000
+
+    def __init__(self):
+        self.enabled = False
+        self._samples = {} # name -> deque[float]
+        self._lock = threading.Lock()
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+        logger.info(f"性能采样已{'开启' if self.enabled else '关闭'}")
+
+    def record(self, name, elapsed_ms):
+        if not self.enabled:
+            return
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.MAX_SAMPLES)
+            samples.append(elapsed_ms)
+
+    @contextmanager
+    def measure(self, name):
+        """with perf_monitor.measure('save_chapter'): ..."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    @staticmethod
+    def _percentile(sorted_samples, percent):
+        # 最近秩法：样本量较小时也总是返回真实出现过的值
+        index = max(0, int(round(percent / 100 * len(sorted_samples))) - 1)
+        return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+    def summary(self):
+        """返回 {name: {'count', 'mean', 'p50', 'p95', 'p99', 'max'}}，耗时单位为毫秒"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items() if samples}
+        result = {}
+        for name, samples in snapshot.items():
+            result[name] = {
+                'count': len(samples),
+                'mean': sum(samples) / len(samples),
+                'p50': self._percentile(samples, 50),
+                'p95': self._percentile(samples, 95),
+                'p99': self._percentile(samples, 99),
+                'max': samples[-1],
+            }
+        return result
+
+    def dump_json(self, path):
+        """将统计结果写入 JSON 文件，便于对比不同版本的数据"""
+        data = {
+            'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'metrics': self.summary(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return data
+
+
+perf_monitor = PerfMonitor()
+# 设置环境变量 SHICHENG_PERF=1 可在启动时直接开启采样（如性能回归测试）
+if os.environ.get('SHICHENG_PERF') == '1':
+    perf_monitor.set_enabled(True)
@@ -0,0 +1,50 @@
+# ShiCheng_Writer/modules/startup_timing.py
+"""
+启动耗时记录（不依赖 Qt）
+main.py 在第一行记下时间并在导入 Qt 之前调用 startup_timeline.start() 设定计时起点，
+每个启动阶段结束时调用 startup_timeline.mark(阶段名)，窗口第一次绘制完成后调用 finish()，
+各阶段耗时与合计写入日志；合计超过 STARTUP_TARGET_MS（启动到可输入的目标）时记为警告。
+不含解释器自身的启动时间。
+"""
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+STARTUP_TARGET_MS = 500
+
+
+class StartupTimeline:
+    def __init__(self):
+        self._started = self._last = time.perf_counter()
+        self.phases = [] # [(阶段名, 毫秒)]
+        self.finished = False
+
+    def start(self, started=None):
+        """设定计时起点（默认为当前时间），清空已记录的阶段"""
+        self._started = self._last = time.perf_counter() if started is None else started
+        self.phases = []
+        self.finished = False
+
+    def mark(self, name):
+        """记录从上一阶段结束到现在的耗时"""
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    def total_ms(self):
+        return (self._last - self._started) * 1000
+
+    def finish(self, name):
+        """记录最后一个阶段并输出日志，只生效一次"""
+        if self.finished:
+            return
+        self.mark(name)
+        self.finished = True
+        total = self.total_ms()
+        phases = ", ".join(f"{phase} {elapsed:.0f} ms" for phase, elapsed in self.phases)
+        level = logging.INFO if total <= STARTUP_TARGET_MS else logging.WARNING
+        logger.log(level, f"启动耗时 {total:.0f} ms（{phases}）")
+
+
+startup_timeline = StartupTimeline()
@@ -0,0 +1,155 @@
+# ShiCheng_Writer/modules/text_utils.py
+"""
+纯文本处理工具（不依赖 Qt）
+整篇文字的变换先在字符串上一次完成，再由编辑器以最小差异区间写回文档。
+"""
+
+import re
+
+# 中文首行缩进（两个全角空格）
+FULLWIDTH_INDENT = "　　"
+SPACE_INDENT = "    "
+
+# 换行符统一为 \n（Windows/旧版 Mac 换行、Unicode 行/段分隔符）
+_LINE_BREAKS = re.compile(r'\r\n|\r|\u2028|\u2029')
+# 段首/段尾需要清理的空白：半角空格、制表符、全角空格、不换行空格
+_PARAGRAPH_WHITESPACE = " \t\u3000\u00a0"
+
+
+def indent_paragraphs(text):
+    """为非空、未缩进、非标题（# 开头）的段落添加首行缩进"""
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if line.strip() and not line.startswith((FULLWIDTH_INDENT, SPACE_INDENT, "#")):
+            lines[i] = FULLWIDTH_INDENT + line
+    return '\n'.join(lines)
+
+
+def unindent_paragraphs(text):
+    """去掉段首的一级缩进（两个全角空格或四个半角空格）"""
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if line.startswith(FULLWIDTH_INDENT):
+            lines[i] = line[len(FULLWIDTH_INDENT):]
+        elif line.startswith(SPACE_INDENT):
+            lines[i] = line[len(SPACE_INDENT):]
+    return '\n'.join(lines)
+
+
+def utf16_len(text):
+    """字符串的 UTF-16 长度（Qt 文本位置以 UTF-16 编码单元计，超出 BMP 的字符占两个单元）"""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _common_prefix_length(a, b):
+    # 二分查找 + 切片比较（C 层 memcmp），长文本上远快于逐字符循环
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix_length(a, b, limit):
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def minimal_edit(old, new):
+    """
+    计算把 old 变为 new 的单个替换区间
+    返回 (start, end, replacement)：用 replacement 替换 old[start:end]；两者相同时返回 None。
+    偏移量以 Python 字符为单位，写回 Qt 文档前需用 utf16_len 换算。
+    """
+    if old == new:
+        return None
+    prefix = _common_prefix_length(old, new)
+    suffix = _common_suffix_length(old, new, min(len(old), len(new)) - prefix)
+    return prefix, len(old) - suffix, new[prefix:len(new) - suffix]
+
+
+def line_edit(old, new):
+    """
+    单段落内的差异区间，约定同 minimal_edit
+    缩进类变换只改动段首，先检查这种最常见的情况，避免逐段二分比较
+    """
+    if new.endswith(old):
+        return 0, 0, new[:len(new) - len(old)]
+    if old.endswith(new):
+        return 0, len(old) - len(new), ""
+    return minimal_edit(old, new)
+
+
+def document_plain_text(text):
+    """
+    文本经 QTextDocument.setPlainText 载入、再由 toPlainText 取出后的样子
+    换行符统一为 \n，不换行空格变为普通空格；编辑日志以此作为重放的基准文本。
+    """
+    return _LINE_BREAKS.sub('\n', text).replace('\u00a0', ' ')
+
+
+def normalize_pasted_text(text, indent_first_line=True):
+    """
+    规范化粘贴的纯文本
+    统一换行符；每段去掉首尾空白后以两个全角空格缩进；连续空行合并为一行，开头的空行丢弃。
+    标题（# 开头）与列表项（- / * 开头）不加缩进；indent_first_line 为 False 时（粘贴到段落中间）
+    首行只去掉行尾空白。单行文本只统一换行符，原样插入。
+    """
+    text = _LINE_BREAKS.sub('\n', text)
+    if '\n' not in text:
+        return text
+    lines = []
+    previous_blank = False
+    for index, line in enumerate(text.split('\n')):
+        if index == 0 and not indent_first_line:
+            lines.append(line.rstrip(_PARAGRAPH_WHITESPACE))
+            continue
+        stripped = line.strip(_PARAGRAPH_WHITESPACE)
+        if not stripped:
+            if lines and not previous_blank:
+                lines.append("")
+            previous_blank = True
+            continue
+        previous_blank = False
+        if stripped.startswith(("#", "- ", "* ")):
+            lines.append(stripped)
+        else:
+            lines.append(FULLWIDTH_INDENT + stripped)
+    return '\n'.join(lines)
+
+
+SNIPPET_LENGTH = 80
+
+
+def chapter_snippet(text, length=SNIPPET_LENGTH):
+    """
+    章节正文的预览片段（存入 chapters.snippet，列表与菜单显示它而不读取正文）
+    跳过标题（# 开头）与空行，去掉段首尾空白后以空格连接，截取前 length 个字符；只扫描正文开头。
+    """
+    if not text:
+        return ""
+    parts = []
+    total = 0
+    position = 0
+    while position < len(text) and total < length:
+        end = text.find('\n', position)
+        if end < 0:
+            end = len(text)
+        line = text[position:end].strip(_PARAGRAPH_WHITESPACE + "\r\u2028\u2029")
+        position = end + 1
+        if not line or line.startswith("#"):
+            continue
+        parts.append(line)
+        total += len(line) + 1
+    return " ".join(parts)[:length]
@@ -365,26 +365,48 @@ class TimelinePanel(QWidget):
         self.layout.addWidget(self.list_widget)
         self.layout.addLayout(button_layout)
         
-    def set_book(self, book_id):
+    def set_book(self, book_id, timelines=None):
+        """timelines 为已读取的时间轴列表（同 DataManager.get_timelines_for_book），未提供时在此查询"""
         self.current_book_id = book_id
-        self.load_timelines()
+        self.load_timelines(timelines)
 
-    def load_timelines(self):
+    def load_timelines(self, timelines=None):
         self.list_widget.clear()
         if not self.current_book_id: return
         
-        timelines = self.data_manager.get_timelines_for_book(self.current_book_id)
+        if timelines is None:
+            timelines = self.data_manager.get_timelines_for_book(self.current_book_id)
         for tl in timelines:
             item = QListWidgetItem(tl['name'])
             item.setData(Qt.UserRole, tl['id'])
             self.list_widget.addItem(item)
+
+    def apply_changes(self, changes):
+        """按数据变更逐行插入、删除时间轴条目，保留选中状态"""
+        for change in changes:
+            if change.entity != 'timeline' or not self.current_book_id:
+                continue
+            if change.op == 'reset':
+                self.load_timelines()
+                continue
+            row = next((row for row in range(self.list_widget.count())
+                        if self.list_widget.item(row).data(Qt.UserRole) == change.id), -1)
+            if row >= 0: # 删除，或从备份覆盖已有的时间轴
+                self.list_widget.takeItem(row)
+            if change.op == 'insert' and change.fields.get('book_id') == self.current_book_id:
+                item = QListWidgetItem(change.fields['name'])
+                item.setData(Qt.UserRole, change.id)
+                # 与查询一致，按名称排序
+                position = 0
+                while position < self.list_widget.count() and self.list_widget.item(position).text() <= item.text():
+                    position += 1
+                self.list_widget.insertItem(position, item)
             
     def add_timeline(self):
         if not self.current_book_id: return
         name, ok = QInputDialog.getText(self, "新建时间轴", "请输入时间轴名称:")
         if ok and name:
             self.data_manager.add_timeline(self.current_book_id, name)
-            self.load_timelines()
             
     def edit_selected_timeline(self, item=None):
         selected_item = self.list_widget.currentItem()
@@ -394,5 +416,4 @@ class TimelinePanel(QWidget):
         
         timeline_id = selected_item.data(Qt.UserRole)
         dialog = TimelineEditDialog(self.data_manager, timeline_id, self.current_book_id, self)
-        dialog.exec()
-        self.load_timelines() # 刷新列表
\ No newline at end of file
+        dialog.exec()
\ No newline at end of file
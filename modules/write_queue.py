@@ -0,0 +1,132 @@
+# ShiCheng_Writer/modules/write_queue.py
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from PySide6.QtCore import QObject, Signal
+
+from .database import DataManager
+
+logger = logging.getLogger(__name__)
+
+class WriteQueue:
+    """
+    后台写队列（write-behind）
+    界面线程通过 submit() 提交 DataManager 的写方法后立即返回 Future；唯一的写线程按提交顺序执行，
+    把同一时刻排队的操作合并为一个事务提交（每个操作各自一个 SAVEPOINT，失败的操作只回滚自己）。
+    Future 在事务提交后才完成，此时数据已经落盘。
+    备份、退出等需要读取完整数据的场合先调用 flush()。
+    """
+    MAX_BATCH = 200
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._closed = False
+        self._last_future = None
+        self._thread = threading.Thread(target=self._run, name="DataManagerWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, method_name, *args, **kwargs):
+        """排队执行 DataManager.<method_name>(*args, **kwargs)，返回 concurrent.futures.Future"""
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("写队列已关闭"))
+            return future
+        self._queue.put((method_name, args, kwargs, future))
+        self._last_future = future
+        return future
+
+    def pending_future(self):
+        """最后提交、尚未完成的写操作的 Future（按顺序提交，它完成即表示之前的都已完成）；队列空闲时返回 None"""
+        future = self._last_future
+        return future if future is not None and not future.done() else None
+
+    def flush(self, timeout=None):
+        """等待此前提交的所有写操作提交完成"""
+        if self._closed:
+            return
+        self.submit(None).result(timeout)
+
+    def close(self, timeout=10):
+        """写完剩余操作后停止写线程（程序退出时调用）"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        # 在线程内部实例化 DataManager，确保数据库连接线程安全
+        data_manager = DataManager()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                stop = False
+                # 合并已经排队的操作，不为攒批额外等待
+                while len(batch) < self.MAX_BATCH:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._apply(data_manager, batch)
+                if stop:
+                    break
+        finally:
+            data_manager.close()
+
+    def _apply(self, data_manager, batch):
+        results = []
+        try:
+            with data_manager.batch():
+                for method_name, args, kwargs, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    if method_name is None: # flush() 的屏障
+                        results.append((future, None, None))
+                        continue
+                    try:
+                        results.append((future, getattr(data_manager, method_name)(*args, **kwargs), None))
+                    except Exception as e:
+                        logger.error(f"后台写入 {method_name} 失败: {e}", exc_info=True)
+                        results.append((future, None, e))
+        except Exception as e:
+            # 提交失败：整批操作都没有生效
+            logger.error(f"后台写入事务提交失败: {e}", exc_info=True)
+            for future, _result, _error in results:
+                future.set_exception(e)
+            return
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+class FutureBridge(QObject):
+    """
+    在界面线程中执行 Future 的完成回调
+    Future 在后台线程（写队列、查询线程池）中完成，回调经信号排队回到本对象所在的（界面）线程，可以安全地操作控件。
+    """
+    _done = Signal(object, object) # (callback, future)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._done.connect(self._dispatch)
+
+    def then(self, future, callback):
+        """future 完成后在界面线程中调用 callback(future)"""
+        future.add_done_callback(lambda f: self._done.emit(callback, f))
+
+    def _dispatch(self, callback, future):
+        try:
+            callback(future)
+        except Exception as e:
+            logger.error(f"Future 完成回调出错: {e}", exc_info=True)
@@ -0,0 +1,5 @@
+# ShiCheng_Writer/shicheng/__init__.py
+"""
+诗成写作的命令行入口（python -m shicheng），供定时任务等无界面环境使用
+只依赖 modules 中不含 Qt 的部分，不导入 PySide6。
+"""
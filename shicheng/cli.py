@@ -0,0 +1,218 @@
+# ShiCheng_Writer/shicheng/cli.py
+"""
+命令行子命令：backup / export / import / check / stats
+结果以 JSON 输出到标准输出（含 "ok" 字段），日志输出到标准错误。
+退出码：0 成功；1 执行失败或检查发现错误；2 参数错误。
+各子命令用到的模块在执行时才导入，只查询统计时不加载导出、备份的代码。
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+from modules import database
+from modules.migrations import schema_version, latest_version
+from modules.utils import get_app_root
+
+logger = logging.getLogger(__name__)
+
+EXIT_OK = 0
+EXIT_FAILURE = 1 # 参数错误时 argparse 以退出码 2 退出
+
+
+class CommandError(Exception):
+    """子命令无法完成（消息写入 JSON 的 error 字段）"""
+
+
+def _open_database(args, migrate=False):
+    """
+    指向 --db 给出的数据库，返回只读的 DataManager
+    migrate 为 True 时（backup、export）先迁移到最新结构；check、stats 只查看，按原样打开，
+    结构版本低于本程序时报错而不是替用户迁移
+    """
+    if args.db:
+        database.DB_FILE = os.path.abspath(args.db)
+    if not os.path.exists(database.DB_FILE):
+        raise CommandError(f"数据库文件不存在: {database.DB_FILE}")
+    if migrate:
+        database.initialize_database()
+        return database.DataManager(read_only=True)
+    data_manager = database.DataManager(read_only=True)
+    version, expected = schema_version(data_manager.conn), latest_version()
+    if version < expected:
+        data_manager.close()
+        raise CommandError(f"数据库结构版本 {version} 低于本程序的版本 {expected}，"
+                           f"请先启动程序或执行 backup 完成迁移")
+    return data_manager
+
+
+def cmd_backup(args):
+    from modules.backup_core import create_backup_archive, cleanup_backups
+
+    backup_dir = os.path.abspath(args.dir or os.path.join(get_app_root(), "backups"))
+    os.makedirs(backup_dir, exist_ok=True)
+    data_manager = _open_database(args, migrate=True)
+    try:
+        # 在同一个读事务中打包，得到同一时刻的完整数据
+        with data_manager._read_snapshot():
+            path = create_backup_archive(data_manager, backup_dir, args.type, log=logger.info)
+    finally:
+        data_manager.close()
+    if not args.keep_all:
+        cleanup_backups(backup_dir, log=logger.warning)
+    return {'ok': True, 'type': args.type, 'file': path, 'bytes': os.path.getsize(path)}
+
+
+def cmd_export(args):
+    from modules.export_engine import export_book
+
+    if args.book is not None:
+        data_manager = _open_database(args, migrate=True)
+        try:
+            if data_manager.get_book_details(args.book) is None:
+                raise CommandError(f"找不到书籍 {args.book}")
+            result = export_book(data_manager, args.book, os.path.abspath(args.target), args.format)
+        finally:
+            data_manager.close()
+        return {'ok': True, 'book': args.book, 'format': args.format, **result}
+
+    from modules.batch_export import export_library
+    _open_database(args, migrate=True).close() # 检查数据库并完成迁移；导出由子进程各自打开只读连接
+    summary = export_library(args.target, args.format, group=args.group, workers=args.workers, force=args.force)
+    return {'ok': not summary['failed'], 'format': args.format, **summary}
+
+
+def cmd_import(args):
+    from modules.backup_core import restore_backup_archive, restore_snapshot
+
+    path = os.path.abspath(args.file)
+    if not os.path.exists(path):
+        raise CommandError(f"备份文件不存在: {path}")
+    if args.db:
+        database.DB_FILE = os.path.abspath(args.db)
+    database.initialize_database() # 导入时数据库可以不存在
+    data_manager = database.DataManager()
+    messages = []
+    try:
+        if path.lower().endswith('.json'):
+            kind = 'snapshot'
+            ok = restore_snapshot(data_manager, path, log=messages.append)
+        else:
+            kind = 'archive'
+            books = data_manager.count_rows('books')
+            if books and not args.replace:
+                raise CommandError(f"导入备份会清空现有的 {books} 本书籍及其他写作数据，确认请加 --replace")
+            ok = restore_backup_archive(data_manager, path, log=messages.append)
+    finally:
+        data_manager.close()
+    for message in messages:
+        logger.info(message)
+    result = {'ok': ok, 'type': kind, 'file': path, 'log': messages}
+    if not ok:
+        result['error'] = messages[-1] if messages else "导入失败"
+    return result
+
+
+def cmd_check(args):
+    data_manager = _open_database(args)
+    try:
+        result = data_manager.check_integrity(verify_content=args.full)
+    finally:
+        data_manager.close()
+    return {'ok': not result['errors'], 'full': args.full, **result}
+
+
+def cmd_stats(args):
+    data_manager = _open_database(args)
+    try:
+        books = data_manager.get_library_statistics()
+        totals = {table: data_manager.count_rows(table)
+                  for table in ('materials', 'inspiration_items', 'inspiration_fragments', 'timelines', 'recycle_bin')}
+    finally:
+        data_manager.close()
+    if args.book is not None:
+        books = [book for book in books if book['id'] == args.book]
+        if not books:
+            raise CommandError(f"找不到书籍 {args.book}")
+    elif args.group is not None:
+        books = [book for book in books if (book['group'] or "未分组") == args.group]
+    return {
+        'ok': True,
+        'database': database.DB_FILE,
+        'database_bytes': os.path.getsize(database.DB_FILE),
+        'books': len(books),
+        'volumes': sum(book['volumes'] for book in books),
+        'chapters': sum(book['chapters'] for book in books),
+        'words': sum(book['words'] for book in books),
+        **totals,
+        'per_book': books,
+    }
+
+
+def _add_common_arguments(parser, suppress_defaults=False):
+    defaults = {'default': argparse.SUPPRESS} if suppress_defaults else {}
+    parser.add_argument("--db", help="数据库文件，默认为程序目录下的 ShiCheng_Writer.db", **defaults)
+    parser.add_argument("-v", "--verbose", action='store_true', help="在标准错误输出运行日志", **defaults)
+    parser.add_argument("--compact", action='store_true', help="JSON 输出不换行缩进", **defaults)
+
+
+def build_parser():
+    from modules.export_engine import EXPORT_FORMATS
+
+    parser = argparse.ArgumentParser(prog="python -m shicheng", description="诗成写作命令行工具（无界面）")
+    _add_common_arguments(parser)
+    # 通用选项写在子命令之后也可以
+    common = argparse.ArgumentParser(add_help=False)
+    _add_common_arguments(common, suppress_defaults=True)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backup = commands.add_parser("backup", parents=[common], help="创建完整备份（ZIP）")
+    backup.add_argument("--type", choices=['archive', 'stage'], default='archive', help="备份类型，默认 archive")
+    backup.add_argument("--dir", help="备份目录，默认为程序目录下的 backups")
+    backup.add_argument("--keep-all", action='store_true', help="不按保留份数清理旧备份")
+    backup.set_defaults(handler=cmd_backup)
+
+    export = commands.add_parser("export", parents=[common], help="导出一本书，或批量导出全部书籍/一个分组")
+    export.add_argument("target", help="导出位置：--book 时为文件（按卷拆分的格式为目录），否则为目录")
+    scope = export.add_mutually_exclusive_group()
+    scope.add_argument("--book", type=int, help="只导出该 id 的书籍")
+    scope.add_argument("--group", help="只导出该分组（没有分组的书为“未分组”）")
+    export.add_argument("--format", default='txt', choices=sorted(EXPORT_FORMATS), help="导出格式，默认 txt")
+    export.add_argument("--workers", type=int, help="批量导出的并行进程数，默认为 CPU 核数")
+    export.add_argument("--force", action='store_true', help="批量导出时未修改的书也重新导出")
+    export.set_defaults(handler=cmd_export)
+
+    restore = commands.add_parser("import", parents=[common], help="从备份导入：ZIP 完整备份（替换现有数据）或快照 JSON")
+    restore.add_argument("file", help="备份文件")
+    restore.add_argument("--replace", action='store_true', help="确认清空现有数据后导入 ZIP 备份")
+    restore.set_defaults(handler=cmd_import)
+
+    check = commands.add_parser("check", parents=[common], help="检查数据库完整性")
+    check.add_argument("--full", action='store_true', help="完整检查，并逐章核对正文 hash 与字数")
+    check.set_defaults(handler=cmd_check)
+
+    stats = commands.add_parser("stats", parents=[common], help="书库统计")
+    stats_scope = stats.add_mutually_exclusive_group()
+    stats_scope.add_argument("--book", type=int, help="只统计该 id 的书籍")
+    stats_scope.add_argument("--group", help="只统计该分组")
+    stats.set_defaults(handler=cmd_stats)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv) # 参数错误时 argparse 以退出码 2 退出
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        result = args.handler(args)
+    except CommandError as e:
+        result = {'ok': False, 'error': str(e)}
+    except Exception as e:
+        logger.error(f"命令 {args.command} 失败: {e}", exc_info=True)
+        result = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+    result = {'command': args.command, **result}
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=None if args.compact else 2, default=str)
+    sys.stdout.write("\n")
+    return EXIT_OK if result['ok'] else EXIT_FAILURE
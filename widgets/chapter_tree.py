@@ -0,0 +1,111 @@
+# ShiCheng_Writer/widgets/chapter_tree.py
+from PySide6.QtWidgets import QTreeView, QAbstractItemView
+from PySide6.QtCore import Qt, Signal
+
+from widgets.tree_models import VOLUME_ID_ROLE
+
+
+class ChapterTreeView(QTreeView):
+    """
+    章节树：可把章节（支持多选）拖到任意卷的任意位置，或拖动整卷调整顺序
+    放下时不改动模型，只发出信号；由数据层写入新的排序键，再按变更通知逐行更新树。
+    """
+    chapters_dropped = Signal(list, int, object) # 章节 id（按目录顺序）、目标卷 id、放在哪一章之前（None 为卷末）
+    volumes_dropped = Signal(list, object) # 卷 id（按目录顺序）、放在哪一卷之前（None 为最后）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setDragEnabled(True)
+        self.setAcceptDrops(True)
+        self.setDropIndicatorShown(True)
+        self.setDragDropMode(QAbstractItemView.InternalMove)
+        self.setDefaultDropAction(Qt.MoveAction)
+
+    def dragged_items(self):
+        """选中的条目按目录顺序返回 (章节 id 列表, 卷 id 列表)"""
+        indexes = sorted(self.selectedIndexes(), key=self._tree_position)
+        chapter_ids = [index.data(Qt.UserRole) for index in indexes if isinstance(index.data(Qt.UserRole), int)]
+        volume_ids = [index.data(VOLUME_ID_ROLE) for index in indexes if index.data(VOLUME_ID_ROLE) is not None]
+        return chapter_ids, volume_ids
+
+    def dragMoveEvent(self, event):
+        super().dragMoveEvent(event)
+        chapter_ids, volume_ids = self.dragged_items()
+        if bool(chapter_ids) == bool(volume_ids): # 章节与卷混选时不能拖放
+            event.ignore()
+
+    def dropEvent(self, event):
+        if event.source() is not self:
+            event.ignore()
+            return
+        index = self.indexAt(event.position().toPoint())
+        position = self.dropIndicatorPosition()
+        chapter_ids, volume_ids = self.dragged_items()
+        if chapter_ids and not volume_ids:
+            target = self.chapter_drop_target(index, position, set(chapter_ids))
+            if target is not None:
+                self.chapters_dropped.emit(chapter_ids, *target)
+        elif volume_ids and not chapter_ids:
+            self.volumes_dropped.emit(volume_ids, self.volume_drop_target(index, position, set(volume_ids)))
+        # 模型保持不变（IgnoreAction 也让拖动源不删除原条目）
+        event.setDropAction(Qt.IgnoreAction)
+        event.accept()
+        self.stopAutoScroll()
+        self.setState(QAbstractItemView.NoState)
+        self.viewport().update()
+
+    def chapter_drop_target(self, index, position, moving_ids):
+        """章节放在 index 的 position 处时的 (目标卷 id, 放在哪一章之前)；不能放下时返回 None"""
+        model = self.model()
+        if not index.isValid():
+            # 空白处：最后一卷的末尾
+            if model.rowCount() == 0:
+                return None
+            index = model.index(model.rowCount() - 1, 0)
+            return self._volume_id(index), None
+        volume_id = index.data(VOLUME_ID_ROLE)
+        if volume_id is not None:
+            if position == QAbstractItemView.OnItem:
+                return volume_id, None
+            if position == QAbstractItemView.AboveItem and index.row() > 0:
+                # 卷标题上方：上一卷的末尾
+                return self._volume_id(index.sibling(index.row() - 1, 0)), None
+            return volume_id, self._next_id(index, 0, Qt.UserRole, moving_ids)
+        parent = index.parent()
+        if not parent.isValid() or not isinstance(index.data(Qt.UserRole), int):
+            return None # 占位项
+        row = index.row() if position == QAbstractItemView.AboveItem else index.row() + 1
+        return self._volume_id(parent), self._next_id(parent, row, Qt.UserRole, moving_ids)
+
+    def volume_drop_target(self, index, position, moving_ids):
+        """卷放在 index 的 position 处时应放在哪一卷之前（None 为最后）"""
+        if not index.isValid():
+            return None
+        if index.parent().isValid():
+            # 放在章节上：按放在其所在卷的下方处理
+            index, position = index.parent(), QAbstractItemView.BelowItem
+        row = index.row() if position == QAbstractItemView.AboveItem else index.row() + 1
+        return self._next_id(index.parent(), row, VOLUME_ID_ROLE, moving_ids)
+
+    def _next_id(self, parent, row, role, moving_ids):
+        # parent 下从 row 开始第一个不在移动中的条目的 id（模型分批提供行时按需再取）
+        model = self.model()
+        while True:
+            for r in range(row, model.rowCount(parent)):
+                item_id = model.index(r, 0, parent).data(role)
+                if item_id is not None and item_id not in moving_ids:
+                    return item_id
+            row = max(row, model.rowCount(parent))
+            if not model.canFetchMore(parent):
+                return None
+            model.fetchMore(parent)
+
+    @staticmethod
+    def _volume_id(index):
+        return index.data(VOLUME_ID_ROLE)
+
+    @staticmethod
+    def _tree_position(index):
+        parent = index.parent()
+        return (parent.row(), index.row()) if parent.isValid() else (index.row(), -1)
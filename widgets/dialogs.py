@@ -1,15 +1,20 @@
 # ShiCheng_Writer/widgets/dialogs.py
 import os
 import tempfile
-import json
 import logging
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, 
                                QLabel, QLineEdit, QCheckBox, QComboBox, 
                                QDialogButtonBox, QPushButton, QMessageBox, 
                                QTreeWidget, QTreeWidgetItem, QHeaderView, 
                                QListWidget, QInputDialog, QTextEdit, QApplication,
-                               QGridLayout)
-from PySide6.QtCore import Qt, QThread, Signal
+                               QGridLayout, QProgressBar, QFileDialog)
+from PySide6.QtCore import Qt, QThread, Signal, QTimer
+
+from modules.book_search import BookSearchWorker, compile_search_pattern
+from modules.export_engine import EXPORT_FORMATS, safe_file_name
+from modules.export_worker import ExportWorker, BatchExportWorker
+from modules.perf_monitor import METRIC_LABELS
+from modules.content_cache import chapter_content_cache
 
 logger = logging.getLogger(__name__)
 
@@ -116,6 +121,455 @@ class SearchReplaceDialog(QDialog):
         QMessageBox.information(self, "替换完成", f"共替换了 {count} 处匹配项。")
 
 
+# --- 全书/全库查找与替换对话框 ---
+class GlobalSearchDialog(QDialog):
+    """
+    跨章节查找与替换：后台扫描章节正文，勾选命中项后在一个事务内批量替换
+    unsaved_chapter_ids 返回编辑器中有未保存修改的章节 id；这些章节不做替换，
+    否则之后保存时会用编辑器中的正文覆盖替换结果
+    """
+    chapters_replaced = Signal(list) # 被修改的章节 id 列表
+
+    def __init__(self, data_manager, current_book_id=None, parent=None, unsaved_chapter_ids=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.current_book_id = current_book_id
+        self.unsaved_chapter_ids = unsaved_chapter_ids
+        self.worker = None
+        self._search_params = None # 最近一次搜索时的参数快照
+        self.setWindowTitle("全书查找与替换")
+        self.resize(720, 560)
+        self.setModal(False)
+
+        layout = QVBoxLayout(self)
+
+        input_layout = QGridLayout()
+        input_layout.addWidget(QLabel("查找内容:"), 0, 0)
+        self.find_input = QLineEdit()
+        self.find_input.returnPressed.connect(self.start_search)
+        input_layout.addWidget(self.find_input, 0, 1)
+        input_layout.addWidget(QLabel("替换为:"), 1, 0)
+        self.replace_input = QLineEdit()
+        input_layout.addWidget(self.replace_input, 1, 1)
+        layout.addLayout(input_layout)
+
+        opt_layout = QHBoxLayout()
+        self.case_check = QCheckBox("区分大小写")
+        self.word_check = QCheckBox("全词匹配")
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItem("当前书籍", "book")
+        self.scope_combo.addItem("全部书籍", "library")
+        if not current_book_id:
+            self.scope_combo.setCurrentIndex(1)
+            self.scope_combo.model().item(0).setEnabled(False)
+        opt_layout.addWidget(self.case_check)
+        opt_layout.addWidget(self.word_check)
+        opt_layout.addStretch()
+        opt_layout.addWidget(QLabel("范围:"))
+        opt_layout.addWidget(self.scope_combo)
+        layout.addLayout(opt_layout)
+
+        self.result_tree = QTreeWidget()
+        self.result_tree.setHeaderLabels(["位置", "上下文"])
+        self.result_tree.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.result_tree.header().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.result_tree.itemChanged.connect(self.on_item_changed)
+        layout.addWidget(self.result_tree)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        btn_layout = QHBoxLayout()
+        self.search_btn = QPushButton("搜索")
+        self.search_btn.setDefault(True)
+        self.search_btn.clicked.connect(self.start_search)
+        self.stop_btn = QPushButton("停止")
+        self.stop_btn.setEnabled(False)
+        self.stop_btn.clicked.connect(self.stop_search)
+        self.replace_btn = QPushButton("替换选中项")
+        self.replace_btn.setEnabled(False)
+        self.replace_btn.clicked.connect(self.replace_selected)
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        btn_layout.addWidget(self.search_btn)
+        btn_layout.addWidget(self.stop_btn)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.replace_btn)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: gray; font-size: 12px;")
+        layout.addWidget(self.status_label)
+
+    def start_search(self):
+        text = self.find_input.text()
+        pattern = compile_search_pattern(text, self.case_check.isChecked(), self.word_check.isChecked())
+        if pattern is None:
+            return
+        self.stop_search()
+
+        self.result_tree.clear()
+        self.replace_btn.setEnabled(False)
+        book_id = self.current_book_id if self.scope_combo.currentData() == "book" else None
+        self._search_params = {'text': text, 'book_id': book_id}
+
+        self.worker = BookSearchWorker(pattern, book_id)
+        self.worker.chapter_matched.connect(self.on_chapter_matched)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.search_finished.connect(self.on_search_finished)
+        self.search_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.status_label.setText("正在搜索...")
+        self.worker.start()
+
+    def stop_search(self):
+        if self.worker and self.worker.isRunning():
+            self.worker.requestInterruption()
+            self.worker.wait()
+
+    def on_chapter_matched(self, chapter):
+        if self.sender() is not self.worker:
+            return # 已被取消的旧搜索残留的信号
+        self.result_tree.blockSignals(True)
+        chapter_item = QTreeWidgetItem(self.result_tree)
+        location = f"{chapter['volume']} / {chapter['title']}"
+        if self._search_params and self._search_params['book_id'] is None:
+            location = f"《{chapter['book_title']}》 {location}"
+        chapter_item.setText(0, f"{location} ({len(chapter['hits'])}处)")
+        chapter_item.setFlags(chapter_item.flags() | Qt.ItemIsUserCheckable)
+        chapter_item.setCheckState(0, Qt.Checked)
+        chapter_item.setData(0, Qt.UserRole, {'id': chapter['id'], 'hash': chapter['hash']})
+        for hit in chapter['hits']:
+            hit_item = QTreeWidgetItem(chapter_item)
+            hit_item.setText(0, f"第 {hit['start'] + 1} 字")
+            hit_item.setText(1, hit['preview'])
+            hit_item.setFlags(hit_item.flags() | Qt.ItemIsUserCheckable)
+            hit_item.setCheckState(0, Qt.Checked)
+            hit_item.setData(0, Qt.UserRole, (hit['start'], hit['length']))
+        self.result_tree.blockSignals(False)
+
+    def on_item_changed(self, item, column):
+        # 勾选/取消章节时同步其全部命中项
+        if column != 0 or item.parent() is not None:
+            return
+        self.result_tree.blockSignals(True)
+        state = item.checkState(0)
+        for i in range(item.childCount()):
+            item.child(i).setCheckState(0, state)
+        self.result_tree.blockSignals(False)
+
+    def on_progress(self, scanned, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(scanned)
+
+    def on_search_finished(self, chapter_count, hit_count):
+        if self.sender() is not self.worker:
+            return
+        self.search_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+        self.progress_bar.setVisible(False)
+        self.replace_btn.setEnabled(hit_count > 0)
+        self.status_label.setText(f"共在 {chapter_count} 个章节中找到 {hit_count} 处匹配项。")
+
+    def collect_selections(self):
+        selections = {}
+        for i in range(self.result_tree.topLevelItemCount()):
+            chapter_item = self.result_tree.topLevelItem(i)
+            spans = [chapter_item.child(j).data(0, Qt.UserRole)
+                     for j in range(chapter_item.childCount())
+                     if chapter_item.child(j).checkState(0) == Qt.Checked]
+            if spans:
+                info = chapter_item.data(0, Qt.UserRole)
+                selections[info['id']] = {'hash': info['hash'], 'spans': spans}
+        return selections
+
+    def replace_selected(self):
+        selections = self.collect_selections()
+        if not selections or not self._search_params:
+            QMessageBox.warning(self, "提示", "请先勾选需要替换的匹配项。")
+            return
+        unsaved = set(self.unsaved_chapter_ids()) & set(selections) if self.unsaved_chapter_ids else set()
+        for chapter_id in unsaved:
+            del selections[chapter_id]
+        if not selections:
+            QMessageBox.warning(self, "提示", "勾选的章节在编辑器中都有未保存的修改，请保存后重新搜索。")
+            return
+        replacement = self.replace_input.text()
+        hit_count = sum(len(s['spans']) for s in selections.values())
+        reply = QMessageBox.question(self, "确认替换",
+                                     f"将在 {len(selections)} 个章节中替换 {hit_count} 处匹配项。\n"
+                                     "替换前的原文会保存到回收站，可在“文件 > 回收站”中还原。\n\n确定要继续吗？",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+
+        description = f"批量替换「{self._search_params['text']}」→「{replacement}」"
+        changed_ids = self.data_manager.replace_in_chapters(selections, replacement, description)
+        skipped = len(selections) - len(changed_ids)
+        self.result_tree.clear()
+        self.replace_btn.setEnabled(False)
+        message = f"已在 {len(changed_ids)} 个章节中完成替换。"
+        if unsaved:
+            message += f"\n{len(unsaved)} 个章节有未保存的修改，已跳过，请保存后重新搜索。"
+        if skipped:
+            message += f"\n{skipped} 个章节在搜索后已被修改，已跳过，请重新搜索。"
+        self.status_label.setText(message.replace("\n", " "))
+        if changed_ids:
+            self.chapters_replaced.emit(changed_ids)
+        QMessageBox.information(self, "替换完成", message)
+
+    def reject(self):
+        # Esc 关闭对话框时不经过 closeEvent，同样要停止后台搜索
+        self.stop_search()
+        super().reject()
+
+    def closeEvent(self, event):
+        self.stop_search()
+        super().closeEvent(event)
+
+
+class ExportDialog(QDialog):
+    """导出书籍：选择格式与位置，后台流式写出，显示进度并可取消"""
+
+    def __init__(self, book, parent=None):
+        super().__init__(parent)
+        self.book = book
+        self.worker = None
+        self.setWindowTitle(f"导出《{book['title']}》")
+        self.setMinimumWidth(480)
+
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.format_combo = QComboBox()
+        for name, export_format in EXPORT_FORMATS.items():
+            self.format_combo.addItem(export_format.label, name)
+        self.format_combo.currentIndexChanged.connect(self.on_format_changed)
+        form.addRow("格式:", self.format_combo)
+
+        target_layout = QHBoxLayout()
+        self.target_input = QLineEdit()
+        browse_btn = QPushButton("浏览...")
+        browse_btn.clicked.connect(self.browse_target)
+        target_layout.addWidget(self.target_input)
+        target_layout.addWidget(browse_btn)
+        form.addRow("保存到:", target_layout)
+        layout.addLayout(form)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: gray; font-size: 12px;")
+        layout.addWidget(self.status_label)
+
+        btn_layout = QHBoxLayout()
+        self.export_btn = QPushButton("导出")
+        self.export_btn.setDefault(True)
+        self.export_btn.clicked.connect(self.start_export)
+        self.cancel_btn = QPushButton("取消导出")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.stop_export)
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.export_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+        self._directory = os.path.expanduser("~")
+        self.on_format_changed()
+
+    def current_format(self):
+        return EXPORT_FORMATS[self.format_combo.currentData()]
+
+    def on_format_changed(self):
+        # 按格式给出默认的保存位置：单个文件为“书名.扩展名”，按卷拆分为以书名命名的目录
+        current = self.target_input.text()
+        if current:
+            self._directory = os.path.dirname(current) or self._directory
+        name = safe_file_name(self.book['title'])
+        export_format = self.current_format()
+        if not export_format.directory:
+            name += export_format.extension
+        self.target_input.setText(os.path.join(self._directory, name))
+
+    def browse_target(self):
+        export_format = self.current_format()
+        if export_format.directory:
+            directory = QFileDialog.getExistingDirectory(self, "选择导出目录", self._directory)
+            if directory:
+                self.target_input.setText(os.path.join(directory, safe_file_name(self.book['title'])))
+        else:
+            file_path, _ = QFileDialog.getSaveFileName(self, f"导出为 {export_format.label}", self.target_input.text(),
+                                                       f"{export_format.label} (*{export_format.extension})")
+            if file_path:
+                self.target_input.setText(file_path)
+
+    def start_export(self):
+        target = self.target_input.text().strip()
+        if not target:
+            QMessageBox.warning(self, "提示", "请选择导出位置。")
+            return
+        self.stop_export()
+        self.worker = ExportWorker(self.book['id'], target, self.format_combo.currentData())
+        self.worker.progress.connect(self.on_progress)
+        self.worker.export_finished.connect(self.on_export_finished)
+        self.export_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.format_combo.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.status_label.setText("正在导出...")
+        self.worker.start()
+
+    def stop_export(self):
+        if self.worker and self.worker.isRunning():
+            self.worker.requestInterruption()
+            self.worker.wait()
+
+    def on_progress(self, done, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def on_export_finished(self, success, message, result):
+        if self.sender() is not self.worker:
+            return
+        self.export_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        self.format_combo.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText(message)
+        if success:
+            QMessageBox.information(self, "成功", f"书籍已成功导出到 {os.path.basename(self.target_input.text())}\n{message}")
+        elif not self.worker.isInterruptionRequested():
+            QMessageBox.critical(self, "导出失败", message)
+
+    def closeEvent(self, event):
+        self.stop_export()
+        super().closeEvent(event)
+
+
+class BatchExportDialog(QDialog):
+    """批量导出：把全部书籍或一个分组导出到目录，未修改的书跳过"""
+
+    def __init__(self, groups, group=None, parent=None):
+        super().__init__(parent)
+        self.worker = None
+        self.setWindowTitle("批量导出")
+        self.setMinimumWidth(480)
+
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItem("全部书籍", None)
+        for name in groups:
+            self.scope_combo.addItem(f"分组「{name}」", name)
+        if group is not None:
+            self.scope_combo.setCurrentIndex(max(self.scope_combo.findData(group), 0))
+        form.addRow("范围:", self.scope_combo)
+
+        self.format_combo = QComboBox()
+        for name, export_format in EXPORT_FORMATS.items():
+            self.format_combo.addItem(export_format.label, name)
+        form.addRow("格式:", self.format_combo)
+
+        target_layout = QHBoxLayout()
+        self.target_input = QLineEdit(os.path.join(os.path.expanduser("~"), "ShiCheng_Export"))
+        browse_btn = QPushButton("浏览...")
+        browse_btn.clicked.connect(self.browse_target)
+        target_layout.addWidget(self.target_input)
+        target_layout.addWidget(browse_btn)
+        form.addRow("导出到:", target_layout)
+        layout.addLayout(form)
+
+        self.force_checkbox = QCheckBox("重新导出未修改的书籍")
+        layout.addWidget(self.force_checkbox)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("每本书导出为“目录/分组/书名”，未修改的书籍根据目录中的 manifest.json 跳过。")
+        self.status_label.setWordWrap(True)
+        self.status_label.setStyleSheet("color: gray; font-size: 12px;")
+        layout.addWidget(self.status_label)
+
+        btn_layout = QHBoxLayout()
+        self.export_btn = QPushButton("导出")
+        self.export_btn.setDefault(True)
+        self.export_btn.clicked.connect(self.start_export)
+        self.cancel_btn = QPushButton("取消导出")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.stop_export)
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.export_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+    def browse_target(self):
+        directory = QFileDialog.getExistingDirectory(self, "选择导出目录", self.target_input.text())
+        if directory:
+            self.target_input.setText(directory)
+
+    def start_export(self):
+        target = self.target_input.text().strip()
+        if not target:
+            QMessageBox.warning(self, "提示", "请选择导出目录。")
+            return
+        self.stop_export()
+        self.worker = BatchExportWorker(target, self.format_combo.currentData(), group=self.scope_combo.currentData(),
+                                        force=self.force_checkbox.isChecked())
+        self.worker.progress.connect(self.on_progress)
+        self.worker.export_finished.connect(self.on_export_finished)
+        self._set_running(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setMaximum(0) # 统计书籍与读取清单期间显示为忙碌
+        self.progress_bar.setVisible(True)
+        self.status_label.setText("正在准备导出...")
+        self.worker.start()
+
+    def stop_export(self):
+        if self.worker and self.worker.isRunning():
+            self.worker.requestInterruption()
+            self.worker.wait()
+
+    def _set_running(self, running):
+        self.export_btn.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+        for widget in (self.scope_combo, self.format_combo, self.target_input, self.force_checkbox):
+            widget.setEnabled(not running)
+
+    def on_progress(self, done, total, title):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"({done}/{total}) 《{title}》")
+
+    def on_export_finished(self, success, message, summary):
+        if self.sender() is not self.worker:
+            return
+        self._set_running(False)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText(message)
+        if success:
+            QMessageBox.information(self, "成功", f"批量导出完成：{message}")
+        elif summary.get('failed'):
+            details = "\n".join(f"《{item['title']}》: {item['error']}" for item in summary['failed'][:10])
+            QMessageBox.warning(self, "部分书籍导出失败", f"{message}\n\n{details}")
+        elif not self.worker.isInterruptionRequested():
+            QMessageBox.critical(self, "导出失败", message)
+
+    def closeEvent(self, event):
+        self.stop_export()
+        super().closeEvent(event)
+
+
 # --- 回收站对话框 (保持不变) ---
 class RecycleBinDialog(QDialog):
     """回收站管理对话框"""
@@ -156,32 +610,27 @@ class RecycleBinDialog(QDialog):
         
     def load_data(self):
         self.tree.clear()
+        # 列表只读取元数据列，条目中保存的整本书或整章正文在还原时才读取
         items = self.data_manager.get_recycle_bin_items()
         for item in items:
-            try:
-                item_data = json.loads(item['item_data'])
-                name = item_data.get('title', '未知')
-                type_str = "书籍" if item['item_type'] == 'book' else "章节"
-                
-                origin = "-"
-                if item['item_type'] == 'chapter':
-                    book_id = item_data.get('book_id')
-                    if book_id:
-                        book_info = self.data_manager.get_book_details(book_id)
-                        if book_info:
-                            origin = f"《{book_info['title']}》"
-                        else:
-                            origin = f"<书籍已删除 ID:{book_id}>"
-                
-                tree_item = QTreeWidgetItem(self.tree)
-                tree_item.setText(0, name)
-                tree_item.setText(1, type_str)
-                tree_item.setText(2, item['deleted_at'])
-                tree_item.setText(3, origin)
-                tree_item.setData(0, Qt.UserRole, item['id'])
-            except Exception as e:
-                logger.error(f"加载回收站项目失败: {e}")
-                continue
+            name = item['title'] or '未知'
+            type_str = {'book': "书籍", 'chapter': "章节", 'revision': "替换记录"}.get(item['item_type'], "未知")
+
+            origin = "-"
+            if item['item_type'] == 'revision':
+                origin = f"涉及 {item['chapter_count'] or 0} 个章节"
+            elif item['item_type'] == 'chapter' and item['book_id']:
+                if item['book_title'] is not None:
+                    origin = f"《{item['book_title']}》"
+                else:
+                    origin = f"<书籍已删除 ID:{item['book_id']}>"
+
+            tree_item = QTreeWidgetItem(self.tree)
+            tree_item.setText(0, name)
+            tree_item.setText(1, type_str)
+            tree_item.setText(2, item['deleted_at'])
+            tree_item.setText(3, origin)
+            tree_item.setData(0, Qt.UserRole, item['id'])
             
     def restore_item(self):
         item = self.tree.currentItem()
@@ -193,12 +642,10 @@ class RecycleBinDialog(QDialog):
         if res == True:
             QMessageBox.information(self, "成功", "项目已还原。")
             self.load_data()
+            # 书籍与章节列表经数据变更通知更新；还原的正文可能属于已打开的章节，需重新载入
             parent = self.parent()
-            if parent:
-                if hasattr(parent, 'load_books'):
-                    parent.load_books()
-                if hasattr(parent, 'current_book_id') and parent.current_book_id:
-                    parent.load_chapters_for_book(parent.current_book_id)
+            if parent and hasattr(parent, 'reload_current_chapter'):
+                parent.reload_current_chapter()
         elif res == "parent_missing":
              QMessageBox.warning(self, "无法还原", "该章节所属的书籍已不存在，无法直接还原。\n请先检查回收站并还原对应的书籍。")
         else:
@@ -220,6 +667,87 @@ class RecycleBinDialog(QDialog):
             self.load_data()
 
 
+class PerfDiagnosticsDialog(QDialog):
+    """性能诊断对话框：查看编辑器各项耗时的分布，并可导出为 JSON"""
+    COLUMNS = ["指标", "次数", "平均", "p50", "p95", "p99", "最大"]
+
+    def __init__(self, monitor, data_manager, parent=None):
+        super().__init__(parent)
+        self.monitor = monitor
+        self.data_manager = data_manager
+        self.setWindowTitle("性能诊断")
+        self.resize(640, 320)
+
+        layout = QVBoxLayout(self)
+        self.enable_checkbox = QCheckBox("启用性能采样（轻微增加开销，耗时单位：毫秒）")
+        self.enable_checkbox.setChecked(self.monitor.enabled)
+        self.enable_checkbox.toggled.connect(self.on_enable_toggled)
+        layout.addWidget(self.enable_checkbox)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(self.COLUMNS)
+        self.tree.setRootIsDecorated(False)
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.tree)
+        self.cache_label = QLabel()
+        layout.addWidget(self.cache_label)
+
+        btn_layout = QHBoxLayout()
+        reset_btn = QPushButton("清空数据")
+        reset_btn.clicked.connect(self.reset_samples)
+        export_btn = QPushButton("导出 JSON")
+        export_btn.clicked.connect(self.export_json)
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(reset_btn)
+        btn_layout.addWidget(export_btn)
+        btn_layout.addStretch()
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+        # 打开期间每秒刷新一次
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.load_data)
+        self.refresh_timer.start()
+        self.load_data()
+
+    def load_data(self):
+        self.tree.clear()
+        for name, stats in sorted(self.monitor.summary().items()):
+            values = [METRIC_LABELS.get(name, name), str(stats['count'])]
+            values += [f"{stats[key]:.2f}" for key in ('mean', 'p50', 'p95', 'p99', 'max')]
+            item = QTreeWidgetItem(self.tree, values)
+            item.setToolTip(0, name)
+            for column in range(1, len(self.COLUMNS)):
+                item.setTextAlignment(column, Qt.AlignRight | Qt.AlignVCenter)
+        cache = chapter_content_cache.stats()
+        self.cache_label.setText(
+            f"正文缓存：{cache['entries']} 章，{cache['bytes'] / 1048576:.1f} / {cache['max_bytes'] / 1048576:.0f} MB，"
+            f"命中 {cache['hits']} / 未命中 {cache['misses']}（命中率 {cache['hit_rate']:.0%}），"
+            f"校验 {cache['validations']}，过期 {cache['stale']}，淘汰 {cache['evictions']}")
+
+    def on_enable_toggled(self, checked):
+        self.monitor.set_enabled(checked)
+        self.data_manager.set_preference('perf_monitor_enabled', '1' if checked else '0')
+
+    def reset_samples(self):
+        self.monitor.reset()
+        chapter_content_cache.reset_stats()
+        self.load_data()
+
+    def export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能数据", "perf_report.json", "JSON 文件 (*.json)")
+        if not path:
+            return
+        try:
+            self.monitor.dump_json(path)
+            QMessageBox.information(self, "导出成功", f"性能数据已导出到：\n{path}")
+        except OSError as e:
+            logger.error(f"导出性能数据失败: {e}")
+            QMessageBox.warning(self, "导出失败", f"无法写入文件：{e}")
+
+
 class BackupDialog(QDialog):
     def __init__(self, backup_manager, parent=None):
         super().__init__(parent)
@@ -370,8 +898,6 @@ class ManageGroupsDialog(QDialog):
             self.group_list.addItem("暂无自定义分组")
         else:
             self.group_list.addItems(groups)
-        if self.parent() and hasattr(self.parent(), 'load_books'):
-            self.parent().load_books()
 
     def add_new_group(self):
         new_name, ok = QInputDialog.getText(self, "新建分组", "请输入新分组的名称:")
@@ -1,17 +1,56 @@
 # ShiCheng_Writer/widgets/editor.py
+import time
 import logging
-from PySide6.QtWidgets import QTextEdit, QApplication
+from bisect import bisect_right
+from PySide6.QtWidgets import QTextEdit, QApplication, QToolTip, QProgressDialog
 from PySide6.QtGui import (QSyntaxHighlighter, QTextCharFormat, QColor, QFont, 
-                           QTextBlockFormat, QTextCursor, QTextDocument) 
-from PySide6.QtCore import QRegularExpression, Qt
+                           QTextBlockFormat, QTextCursor, QTextDocument, QTextBlockUserData,
+                           QTextLayout) 
+from PySide6.QtCore import QRegularExpression, Qt, QEvent, QTimer, Signal, QPoint
+
+from modules.perf_monitor import perf_monitor
+from modules.text_utils import (indent_paragraphs, unindent_paragraphs, line_edit, utf16_len,
+                                normalize_pasted_text)
 
 logger = logging.getLogger(__name__)
 
+class MaterialSpans(QTextBlockUserData):
+    """段落内素材命中位置索引（按起始位置升序），供悬浮卡片二分查找"""
+    def __init__(self, spans):
+        super().__init__()
+        self.set_spans(spans)
+
+    def set_spans(self, spans):
+        self.spans = spans # [(start, length, material_id), ...]
+        self.starts = [span[0] for span in spans]
+
+    def material_at(self, position_in_block):
+        i = bisect_right(self.starts, position_in_block) - 1
+        if i >= 0:
+            start, length, material_id = self.spans[i]
+            if position_in_block < start + length:
+                return material_id
+        return None
+
 class MaterialHighlighter(QSyntaxHighlighter):
     """素材高亮器 - 性能优化版"""
+    # 全文重新高亮按片进行，每片约此字符数；每片写入格式后只重排该片，单片耗时在几毫秒内
+    REHIGHLIGHT_SLICE_CHARS = 8 * 1024
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.highlighting_rules = []
+        self._material_ids = {} # 素材名称 -> 素材id
+        # 暂停期间新增、修改的段落不做高亮，恢复时全文重新高亮
+        self._suspended = False
+
+        # 分片重新高亮的进度：下一片的起点与回绕后的终点（QTextCursor 随编辑自动调整位置）
+        self._next_cursor = None
+        self._stop_cursor = None
+        self._wrapped = False
+        self._slice_timer = QTimer(self)
+        self._slice_timer.setInterval(0)
+        self._slice_timer.timeout.connect(self._rehighlight_next_slice)
         
         self.highlight_format = QTextCharFormat()
         self.update_highlight_color()
@@ -21,31 +60,40 @@ class MaterialHighlighter(QSyntaxHighlighter):
         self._cached_pattern = None
         self._cached_materials_list = None
 
-    def update_highlight_color(self):
+    def update_highlight_color(self, start_position=0):
         palette = QApplication.instance().palette()
         # 简单的暗色主题检测
         is_dark_theme = palette.window().color().lightness() < 128
         
         if is_dark_theme:
             # 暗色模式：深蓝背景，亮灰字，柔和护眼
-            self.highlight_format.setBackground(QColor("#1e3a5f"))
-            self.highlight_format.setForeground(QColor("#dcdcdc"))
+            background, foreground = QColor("#1e3a5f"), QColor("#dcdcdc")
         else: 
             # 亮色模式：极淡蓝背景，深色字
-            self.highlight_format.setBackground(QColor("#e3f2fd"))
-            self.highlight_format.setForeground(QColor("#2c3e50"))
+            background, foreground = QColor("#e3f2fd"), QColor("#2c3e50")
 
+        # 配色未变时跳过重新高亮（切换缓存文档时会频繁调用）
+        if (self.highlight_format.background().color() == background and
+                self.highlight_format.foreground().color() == foreground):
+            return
+        self.highlight_format.setBackground(background)
+        self.highlight_format.setForeground(foreground)
         self.highlight_format.setFontWeight(QFont.Bold)
-        self.highlight_format.setToolTip("这是一个素材")
-        self.rehighlight()
+        self.rehighlight(start_position)
 
-    def set_materials_list(self, materials_list):
+    def set_materials_list(self, materials_list, start_position=0):
+        """
+        设置需要高亮的素材
+        materials_list 可以是名称列表，也可以是 {名称: 素材id} 字典（用于悬浮卡片定位素材）
+        start_position 为重新高亮最先处理的位置（通常为首个可见段落）
+        """
         # 检查材料列表是否实际发生变化
         if materials_list is None:
             materials_list = []
+        material_ids = dict(materials_list) if isinstance(materials_list, dict) else {}
         
         # 计算当前列表的哈希
-        sorted_list = sorted(materials_list)
+        sorted_list = sorted(material_ids.items()) if material_ids else sorted(materials_list)
         new_hash = hash(tuple(sorted_list))
         
         # 如果哈希相同且列表内容相同，跳过更新
@@ -54,11 +102,12 @@ class MaterialHighlighter(QSyntaxHighlighter):
             return
         
         self.highlighting_rules = []
+        self._material_ids = material_ids
         if not materials_list:
             self._current_materials_hash = None
             self._cached_pattern = None
             self._cached_materials_list = None
-            self.rehighlight()
+            self.rehighlight(start_position)
             return
         
         # 1. 按长度降序排序，防止短词覆盖长词
@@ -76,20 +125,159 @@ class MaterialHighlighter(QSyntaxHighlighter):
         self._cached_pattern = pattern
         self._cached_materials_list = sorted_list
         
-        self.rehighlight()
+        self.rehighlight(start_position)
+
+    def suspend(self):
+        """暂停高亮（大量插入、全文变换期间），直到 resume()"""
+        self._suspended = True
+        self._stop_rehighlight()
+
+    def resume(self, start_position=0, rehighlight=True):
+        """恢复高亮，并从 start_position 开始重新高亮全文；内容将被丢弃时传入 rehighlight=False"""
+        if not self._suspended:
+            return
+        self._suspended = False
+        if rehighlight:
+            self.rehighlight(start_position)
+
+    @property
+    def is_rehighlighting(self):
+        return self._next_cursor is not None
+
+    def rehighlight(self, start_position=0):
+        """
+        重新高亮全文
+        QSyntaxHighlighter.rehighlight 每处理一段都会单独通知排版更新，文档已排版时总耗时随段落数平方增长
+        （几千段即需数秒）。这里直接写入各段的格式，每片只标记一次重排，结果与逐段高亮一致。
+        大文档整体重排仍需数百毫秒，因此从 start_position 所在的段落开始，第一片立即完成，
+        其余各片由定时器在事件循环中继续，到文末后再从文首补到起点。
+        """
+        doc = self.document()
+        if doc is None or self._suspended:
+            return # 暂停期间由 resume() 重新高亮
+        start = doc.findBlock(min(max(start_position, 0), doc.characterCount() - 1))
+        self._next_cursor = QTextCursor(start)
+        self._stop_cursor = QTextCursor(start)
+        self._wrapped = False
+        self._rehighlight_next_slice()
+
+    def _stop_rehighlight(self):
+        self._slice_timer.stop()
+        self._next_cursor = self._stop_cursor = None
+
+    def _rehighlight_next_slice(self):
+        doc = self.document()
+        if doc is None or self._next_cursor is None:
+            self._stop_rehighlight()
+            return
+        with perf_monitor.measure('rehighlight'):
+            block = self._next_cursor.block()
+            first = end = block.position()
+            while block.isValid() and end - first < self.REHIGHLIGHT_SLICE_CHARS:
+                if self._wrapped and block.position() >= self._stop_cursor.position():
+                    break
+                self._apply_block_formats(block)
+                end = block.position() + block.length()
+                block = block.next()
+            if end > first:
+                doc.markContentsDirty(first, end - first)
+
+        if not block.isValid() and not self._wrapped and self._stop_cursor.position() > 0:
+            self._wrapped = True
+            block = doc.begin()
+        if block.isValid() and not (self._wrapped and block.position() >= self._stop_cursor.position()):
+            self._next_cursor.setPosition(block.position())
+            if not self._slice_timer.isActive():
+                self._slice_timer.start()
+        else:
+            self._stop_rehighlight()
+
+    def _apply_block_formats(self, block):
+        """直接写入段落的高亮格式与命中索引（不触发重排）"""
+        ranges = []
+        matches = self._match_block(block.text())
+        for start, length, format, _material_id in matches:
+            format_range = QTextLayout.FormatRange()
+            format_range.start = start
+            format_range.length = length
+            format_range.format = format
+            ranges.append(format_range)
+        block.layout().setFormats(ranges)
+        spans = self._material_spans(matches)
+        block.setUserData(MaterialSpans(spans) if spans else None)
 
     def highlightBlock(self, text):
+        if self._suspended:
+            self.setCurrentBlockUserData(None)
+            return
+        if perf_monitor.enabled:
+            started = time.perf_counter()
+            self._highlight_block(text)
+            perf_monitor.record('highlight_block', (time.perf_counter() - started) * 1000)
+        else:
+            self._highlight_block(text)
+
+    def _match_block(self, text):
+        """返回段落内的命中 [(start, length, format, material_id)]"""
+        matches = []
         for pattern, format in self.highlighting_rules:
             iterator = pattern.globalMatch(text)
             while iterator.hasNext():
                 match = iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), format)
+                matches.append((match.capturedStart(), match.capturedLength(), format,
+                                self._material_ids.get(match.captured(1))))
+        return matches
+
+    @staticmethod
+    def _material_spans(matches):
+        return [(start, length, material_id) for start, length, _format, material_id in matches if material_id is not None]
+
+    def _highlight_block(self, text):
+        matches = self._match_block(text)
+        for start, length, format, _material_id in matches:
+            self.setFormat(start, length, format)
+        # 记录本段的命中位置，悬浮时无需重新匹配
+        spans = self._material_spans(matches)
+        self.setCurrentBlockUserData(MaterialSpans(spans) if spans else None)
 
 class Editor(QTextEdit):
     """自定义文本编辑器 - 视觉优化版"""
+    load_finished = Signal() # 分块加载全部完成
+
+    # 分块加载参数：首屏字符数、后续每块字符数
+    # 每块只做排版（素材高亮在全部载入后分片进行），块越大单次耗时增长越快，8K 左右单次通常在几毫秒内
+    FIRST_CHUNK_CHARS = 4000
+    LOAD_CHUNK_CHARS = 8 * 1024
+
+    # 粘贴参数：超过 PASTE_SYNC_CHARS 时分块插入，超过 PASTE_PROGRESS_CHARS 时显示进度
+    PASTE_SYNC_CHARS = 64 * 1024
+    PASTE_CHUNK_CHARS = 8 * 1024
+    PASTE_PROGRESS_CHARS = 1024 * 1024
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.highlighter = MaterialHighlighter(self.document())
+        # 未打开章节时显示的空白文档；章节文档由外部缓存管理，通过 set_document 切换
+        # 注意：QTextEdit 切换文档时会删除以编辑器为父对象的旧文档，因此空白文档不挂在编辑器下
+        self._blank_document = QTextDocument()
+        self.setDocument(self._blank_document)
+        self.highlighter = MaterialHighlighter(self._blank_document)
+
+        # 分块加载状态
+        self._pending_text = None
+        self._pending_offset = 0
+        self._load_started = None # 性能采样：本次载入的开始时间
+        self._load_timer = QTimer(self)
+        self._load_timer.setInterval(0)
+        self._load_timer.timeout.connect(self._append_next_chunk)
+
+        # 分块粘贴状态
+        self._paste_cursor = None
+        self._paste_text = None
+        self._paste_offset = 0
+        self._paste_progress = None
+        self._paste_timer = QTimer(self)
+        self._paste_timer.setInterval(0)
+        self._paste_timer.timeout.connect(self._insert_next_paste_chunk)
         
         # 设置文档边距，营造“纸张”感
         self.setViewportMargins(40, 20, 40, 20)
@@ -98,6 +286,13 @@ class Editor(QTextEdit):
         self.setCursorWidth(2)
         
         self.set_font_size("16px") 
+
+        # 素材悬浮卡片：由外部提供 material_id -> HTML 的回调（应自带缓存，避免悬浮时查询数据库）
+        self.material_card_provider = None
+
+        # 性能采样：按键时刻与当时的文档版本，在随后的首次重绘中结算
+        self._keypress_started = None
+        self._keypress_revision = 0
         
     def set_font_size(self, size_str):
         font = self.font()
@@ -117,6 +312,208 @@ class Editor(QTextEdit):
         except ValueError:
             logger.warning(f"无效的字体大小: {size_str}")
 
+    def create_document(self, parent=None):
+        """创建与编辑器字体、制表位一致，并挂载独立素材高亮器的章节文档"""
+        document = QTextDocument(parent)
+        document.setDefaultFont(self.font())
+        option = document.defaultTextOption()
+        option.setTabStopDistance(self.tabStopDistance())
+        document.setDefaultTextOption(option)
+        MaterialHighlighter(document)
+        return document
+
+    def set_document(self, document=None):
+        """
+        切换编辑器显示的文档，None 表示空白文档
+        文档保留各自的撤销栈、排版和高亮结果，切回时无需重新排版。不发出 textChanged。
+        """
+        self.cancel_progressive_load()
+        self.finish_paste_now()
+        if document is None:
+            document = self._blank_document
+        was_blocked = self.blockSignals(True)
+        if document is self._blank_document:
+            document.clear()
+        if document is not self.document():
+            tab_stop = self.tabStopDistance()
+            self.setDocument(document)
+            # 文档创建后字体可能已调整，保持与编辑器一致
+            if document.defaultFont() != self.font():
+                document.setDefaultFont(self.font())
+            self.setTabStopDistance(tab_stop)
+        self.highlighter = document.findChild(MaterialHighlighter)
+        self.blockSignals(was_blocked)
+
+    def insertFromMimeData(self, source):
+        """
+        粘贴只取纯文本：统一换行符、段首缩进与空行后插入
+        大段文本在事件循环中分块插入（整体仍为一步撤销），数 MB 的文本显示进度并可取消
+        """
+        if not source.hasText() or self._paste_text is not None:
+            return
+        cursor = self.textCursor()
+        start_cursor = QTextCursor(self.document())
+        start_cursor.setPosition(cursor.selectionStart())
+        text = normalize_pasted_text(source.text(), indent_first_line=start_cursor.atBlockStart())
+        if len(text) <= self.PASTE_SYNC_CHARS:
+            cursor.insertText(text)
+            self.setTextCursor(cursor)
+            self.ensureCursorVisible()
+            return
+
+        # 第一块与删除选区合并为一个编辑块，其余各块并入同一撤销步骤
+        end = self._chunk_end(text, 0, self.PASTE_CHUNK_CHARS)
+        cursor.beginEditBlock()
+        cursor.insertText(text[:end])
+        cursor.endEditBlock()
+        self._paste_cursor = cursor
+        self._paste_text = text
+        self._paste_offset = end
+        self.setReadOnly(True)
+        if len(text) >= self.PASTE_PROGRESS_CHARS:
+            self._paste_progress = QProgressDialog("正在粘贴…", "取消", 0, len(text), self)
+            self._paste_progress.setWindowTitle("粘贴")
+            self._paste_progress.setWindowModality(Qt.WindowModal)
+            self._paste_progress.setMinimumDuration(0)
+            self._paste_progress.canceled.connect(self.cancel_paste)
+            self._paste_progress.setValue(end)
+        self._paste_timer.start()
+
+    def _insert_next_paste_chunk(self):
+        text = self._paste_text
+        if text is None:
+            self._paste_timer.stop()
+            return
+        end = self._chunk_end(text, self._paste_offset, self.PASTE_CHUNK_CHARS)
+        self._paste_cursor.joinPreviousEditBlock()
+        self._paste_cursor.insertText(text[self._paste_offset:end])
+        self._paste_cursor.endEditBlock()
+        self._paste_offset = end
+        if self._paste_progress is not None:
+            self._paste_progress.setValue(end)
+        if end >= len(text):
+            self._finish_paste()
+
+    def _finish_paste(self):
+        self._paste_timer.stop()
+        cursor = self._paste_cursor
+        self._paste_cursor = None
+        self._paste_text = None
+        self._paste_offset = 0
+        if self._paste_progress is not None:
+            self._paste_progress.canceled.disconnect(self.cancel_paste)
+            self._paste_progress.close()
+            self._paste_progress.deleteLater()
+            self._paste_progress = None
+        self.setReadOnly(False)
+        return cursor
+
+    def finish_paste_now(self):
+        """立即插入尚未完成的分块粘贴的剩余部分（切换文档前调用）"""
+        if self._paste_text is None:
+            return
+        self._paste_cursor.joinPreviousEditBlock()
+        self._paste_cursor.insertText(self._paste_text[self._paste_offset:])
+        self._paste_cursor.endEditBlock()
+        self._finish_paste()
+
+    def cancel_paste(self):
+        """取消分块粘贴，撤销已插入的部分"""
+        if self._paste_text is None:
+            return
+        self._finish_paste()
+        self.document().undo()
+
+    @property
+    def is_pasting(self):
+        return self._paste_text is not None
+
+    @property
+    def is_loading(self):
+        return self._pending_text is not None
+
+    @staticmethod
+    def _chunk_end(text, start, size):
+        """计算分块结束位置，尽量在段落边界处切分"""
+        end = start + size
+        if end >= len(text):
+            return len(text)
+        newline = text.find('\n', end)
+        if newline == -1 or newline - end > size:
+            return end
+        return newline
+
+    def load_text_progressively(self, text):
+        """
+        分块加载正文：首屏内容立即显示并高亮，其余内容由定时器在事件循环中分块追加，
+        追加期间暂停素材高亮，全部载入后再从可见区域开始分片高亮，界面在块与块之间保持响应。
+        加载过程不产生 textChanged 信号与撤销记录，期间编辑器只读。
+        """
+        self.cancel_progressive_load()
+        self._load_started = time.perf_counter() if perf_monitor.enabled else None
+        first_end = self._chunk_end(text, 0, self.FIRST_CHUNK_CHARS)
+
+        was_blocked = self.blockSignals(True)
+        self.setPlainText(text[:first_end])
+        self.blockSignals(was_blocked)
+
+        if first_end >= len(text):
+            self._record_load_time()
+            self.load_finished.emit()
+            return
+
+        self._pending_text = text
+        self._pending_offset = first_end
+        self.highlighter.suspend()
+        self.document().setUndoRedoEnabled(False)
+        self.setReadOnly(True)
+        self._load_timer.start()
+
+    def _append_next_chunk(self):
+        text = self._pending_text
+        if text is None:
+            self._load_timer.stop()
+            return
+        end = self._chunk_end(text, self._pending_offset, self.LOAD_CHUNK_CHARS)
+
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        was_blocked = self.blockSignals(True)
+        cursor.insertText(text[self._pending_offset:end])
+        self.blockSignals(was_blocked)
+        self._pending_offset = end
+
+        if end >= len(text):
+            self._finish_progressive_load()
+            self.highlighter.resume(self.first_visible_position())
+            self._record_load_time()
+            self.load_finished.emit()
+
+    def _finish_progressive_load(self):
+        self._load_timer.stop()
+        self._pending_text = None
+        self._pending_offset = 0
+        # 重新启用撤销会清空撤销栈，加载内容不可被撤销
+        self.document().setUndoRedoEnabled(True)
+        self.document().setModified(False)
+        self.setReadOnly(False)
+
+    def _record_load_time(self):
+        if self._load_started is not None:
+            perf_monitor.record('load_text', (time.perf_counter() - self._load_started) * 1000)
+            self._load_started = None
+
+    def cancel_progressive_load(self):
+        """取消尚未完成的分块加载（切换章节或清空编辑器前调用）"""
+        self._load_started = None
+        if self._pending_text is not None:
+            self._finish_progressive_load()
+            self.highlighter.resume(rehighlight=False) # 未载入完的内容不再使用
+
+    def clear(self):
+        self.cancel_progressive_load()
+        super().clear()
+
     def set_line_height(self, percentage):
         """设置行高百分比"""
         block_fmt = QTextBlockFormat()
@@ -131,53 +528,101 @@ class Editor(QTextEdit):
         
     def auto_indent_document(self):
         """
-        [优化] 全文缩进：使用 Cursor 操作，保留撤销栈历史，不重置视图
+        [优化] 全文缩进：先在字符串上一次算出变换结果，再只对有变化的段落做最小编辑
+        所有编辑合并为一步撤销，只触发一次重新高亮，光标与滚动位置保持不变
         """
-        cursor = self.textCursor()
-        cursor.beginEditBlock() # 开始编辑块，确保可一次性撤销
-        
-        doc = self.document()
-        # 遍历所有段落
-        for i in range(doc.blockCount()):
-            block = doc.findBlockByNumber(i)
-            text = block.text()
-            
-            # 仅对非空、非缩进、非标题行进行缩进
-            if text.strip() and not text.startswith(("　　", "    ", "#")):
-                cursor.setPosition(block.position())
-                cursor.insertText("　　")
-        
-        cursor.endEditBlock() # 结束编辑块
+        return self._apply_paragraph_transform(indent_paragraphs)
 
     def auto_unindent_document(self):
         """
-        [优化] 取消缩进：使用 Cursor 操作，保留撤销栈历史
+        [优化] 取消缩进：与全文缩进相同，一次性计算并写回差异
         """
-        cursor = self.textCursor()
-        cursor.beginEditBlock()
-        
+        return self._apply_paragraph_transform(unindent_paragraphs)
+
+    def _apply_paragraph_transform(self, transform):
+        """对全文做逐段变换（不增删段落），返回是否有修改"""
         doc = self.document()
-        for i in range(doc.blockCount()):
-            block = doc.findBlockByNumber(i)
-            text = block.text()
-            
-            cursor.setPosition(block.position())
-            
-            if text.startswith("　　"):
-                # 选中前两个字符并删除
-                cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, 2)
-                cursor.removeSelectedText()
-            elif text.startswith("    "):
-                # 选中前四个字符并删除
-                cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, 4)
-                cursor.removeSelectedText()
-                
+        # 逐段对应文本块：toPlainText 会把段内软换行（Shift+Enter，U+2028）也变成 \n，行与文本块对不上；
+        # toRawText 以 U+2029 分段，其中的不换行空格按 toPlainText 的做法视为普通空格（长度不变）
+        raw_text = doc.toRawText().replace('\u00a0', ' ')
+        old_lines = raw_text.split('\u2029')
+        if '\u2028' in raw_text:
+            # 软换行后的每一行仍按段首处理，变换结果留在原文本块内
+            new_lines = [transform(line.replace('\u2028', '\n')).replace('\n', '\u2028') for line in old_lines]
+        else:
+            new_lines = transform('\n'.join(old_lines)).split('\n')
+        if new_lines == old_lines:
+            return False
+
+        v_scroll = self.verticalScrollBar().value()
+        h_scroll = self.horizontalScrollBar().value()
+
+        # 整篇替换会重建所有段落并全文重排，反而更慢；这里逐段只改动差异部分，
+        # 编辑块内的修改会合并成一次 contentsChange，排版只做一遍；
+        # 编辑期间暂停逐段高亮，完成后从可见区域开始分片补上，不与重排一起阻塞界面
+        self.highlighter.suspend()
+        cursor = QTextCursor(doc)
+        cursor.beginEditBlock()
+        block = doc.begin()
+        for old_line, new_line in zip(old_lines, new_lines):
+            if old_line != new_line:
+                start, end, replacement = line_edit(old_line, new_line)
+                position = block.position() + utf16_len(old_line[:start])
+                cursor.setPosition(position)
+                cursor.setPosition(position + utf16_len(old_line[start:end]), QTextCursor.KeepAnchor)
+                cursor.insertText(replacement)
+            block = block.next()
         cursor.endEditBlock()
 
+        self.verticalScrollBar().setValue(v_scroll)
+        self.horizontalScrollBar().setValue(h_scroll)
+        self.highlighter.resume(self.first_visible_position())
+        return True
+
+    def first_visible_position(self):
+        """视口左上角处的文档位置（重新高亮从这里开始）"""
+        return self.cursorForPosition(QPoint(0, 0)).position()
+
+    def material_at(self, viewport_pos):
+        """返回视口坐标处的素材id（基于高亮器记录的段落命中索引，二分查找）"""
+        cursor = self.cursorForPosition(viewport_pos)
+        position = cursor.positionInBlock()
+        # cursorForPosition 返回最近的字符间隙；若间隙在鼠标右侧，则鼠标落在前一个字符上
+        if self.cursorRect(cursor).center().x() > viewport_pos.x():
+            position -= 1
+        if position < 0:
+            return None
+        spans = cursor.block().userData()
+        if not isinstance(spans, MaterialSpans):
+            return None
+        return spans.material_at(position)
+
+    def viewportEvent(self, event):
+        if event.type() == QEvent.ToolTip and self.material_card_provider:
+            material_id = self.material_at(event.pos())
+            card = self.material_card_provider(material_id) if material_id is not None else None
+            if card:
+                QToolTip.showText(event.globalPos(), card, self.viewport())
+            else:
+                QToolTip.hideText()
+                event.ignore()
+            return True
+        return super().viewportEvent(event)
+
     def update_highlighter(self, materials_list):
         """外部调用此方法来更新需要高亮的素材词汇"""
-        self.highlighter.set_materials_list(materials_list)
-        self.highlighter.update_highlight_color()
+        # 重新高亮会触发 textChanged，屏蔽信号以免被误判为正文修改
+        was_blocked = self.blockSignals(True)
+        position = self.first_visible_position()
+        self.highlighter.set_materials_list(materials_list, position)
+        self.highlighter.update_highlight_color(position)
+        self.blockSignals(was_blocked)
+
+    def refresh_highlight_color(self):
+        """主题切换后刷新高亮配色"""
+        was_blocked = self.blockSignals(True)
+        self.highlighter.update_highlight_color(self.first_visible_position())
+        self.blockSignals(was_blocked)
 
     def find_text(self, text, backward=False, case_sensitive=False, whole_words=False):
         """查找文本"""
@@ -229,7 +674,18 @@ class Editor(QTextEdit):
             
         return count
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._keypress_started is not None:
+            # 只统计确实修改了正文的按键（方向键、光标闪烁等引起的重绘不计入）
+            if self.document().revision() != self._keypress_revision:
+                perf_monitor.record('keypress_to_paint', (time.perf_counter() - self._keypress_started) * 1000)
+            self._keypress_started = None
+
     def keyPressEvent(self, event):
+        if perf_monitor.enabled:
+            self._keypress_started = time.perf_counter()
+            self._keypress_revision = self.document().revision()
         cursor = self.textCursor()
         
         if event.key() in [Qt.Key_Return, Qt.Key_Enter]:
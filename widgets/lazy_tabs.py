@@ -0,0 +1,48 @@
+# ShiCheng_Writer/widgets/lazy_tabs.py
+from PySide6.QtWidgets import QTabWidget, QWidget, QVBoxLayout
+from PySide6.QtCore import Signal
+
+
+class _LazyPage(QWidget):
+    """标签页的占位容器：第一次显示时调用 factory() 创建真正的页面并放入自身"""
+    created = Signal(QWidget)
+
+    def __init__(self, factory, parent=None):
+        super().__init__(parent)
+        self.factory = factory
+        self.page = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def ensure_page(self):
+        if self.page is None:
+            self.page = self.factory()
+            self.factory = None
+            self.layout().addWidget(self.page)
+            self.created.emit(self.page)
+        return self.page
+
+    def showEvent(self, event):
+        self.ensure_page()
+        super().showEvent(event)
+
+
+class LazyTabWidget(QTabWidget):
+    """
+    按需创建的标签页：add_lazy_tab(factory, title) 先放入空白容器，
+    标签页第一次显示（被选中且所在面板可见）时才创建页面，并发出 page_created(page)
+    """
+    page_created = Signal(QWidget)
+
+    def add_lazy_tab(self, factory, title):
+        container = _LazyPage(factory)
+        container.created.connect(self.page_created)
+        return self.addTab(container, title)
+
+    def page(self, index):
+        """index 处已创建的页面，尚未创建时返回 None"""
+        container = self.widget(index)
+        return container.page if container is not None else None
+
+    def current_page(self):
+        return self.page(self.currentIndex())
@@ -0,0 +1,712 @@
+# ShiCheng_Writer/widgets/tree_models.py
+"""
+书籍树与章节树的数据模型
+两层的树（分组 → 子条目），子条目的 id、标题、排序键以并列数组存放，不为每一行创建 QStandardItem。
+分组的子条目按批交给视图（canFetchMore / fetchMore），按 id 查找行为 O(1)；
+搜索过滤在模型内完成：子条目标题包含搜索词即可见，分组名包含搜索词或有可见子条目时分组可见。
+"""
+
+import itertools
+from array import array
+from bisect import bisect_left
+
+from PySide6.QtCore import Qt, QAbstractItemModel, QModelIndex, QObject, QTimer
+
+# 章节树中卷条目的 id（章节条目的 id 存在 Qt.UserRole 中），以及卷与章节的排序键
+VOLUME_ID_ROLE = Qt.UserRole + 1
+ORDER_KEY_ROLE = Qt.UserRole + 2
+
+# 每次交给视图的子条目行数
+BATCH_SIZE = 200
+
+# flags() 调用频繁，预先组合好（每次按位或 Qt 枚举开销不小）
+_GROUP_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled | Qt.ItemIsDropEnabled
+_CHILD_FLAGS = _GROUP_FLAGS | Qt.ItemNeverHasChildren
+
+
+def _bisect(count, key_at, key):
+    # 在按 key_at(i) 升序排列的 [0, count) 中 key 应插入的位置（相等时放在后面）
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key < key_at(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+class _Group:
+    """一个分组（书籍分组或卷）及其子条目"""
+    __slots__ = ('serial', 'id', 'title', 'order_key', 'ids', 'titles', 'order_keys',
+                 'rows', 'loaded', 'shown', 'row', 'positions')
+
+    def __init__(self, serial, group_id, title, order_key=None):
+        self.serial = serial # 子条目索引的 internalId
+        self.id = group_id
+        self.title = title
+        self.order_key = order_key
+        self.ids = array('q')
+        self.titles = []
+        self.order_keys = []
+        self.rows = None # 过滤时可见子条目的位置（升序），None 表示全部可见
+        self.loaded = 0 # 已交给视图的行数
+        self.shown = True
+        self.row = 0 # 在可见分组中的行号
+        self.positions = None # id -> 位置，结构变化后作废，查找时重建
+
+    def visible_count(self):
+        return len(self.ids) if self.rows is None else len(self.rows)
+
+    def position(self, row):
+        return row if self.rows is None else self.rows[row]
+
+    def row_of(self, position):
+        # 位置对应的可见行号，被过滤掉时返回 None
+        if self.rows is None:
+            return position
+        row = bisect_left(self.rows, position)
+        return row if row < len(self.rows) and self.rows[row] == position else None
+
+    def position_of(self, item_id):
+        if self.positions is None:
+            self.positions = {child_id: position for position, child_id in enumerate(self.ids)}
+        return self.positions.get(item_id)
+
+    def insert(self, position, item_id, title, order_key):
+        self.ids.insert(position, item_id)
+        self.titles.insert(position, title)
+        self.order_keys.insert(position, order_key)
+        self.positions = None
+
+    def pop(self, position):
+        item = (self.ids[position], self.titles[position], self.order_keys[position])
+        del self.ids[position]
+        del self.titles[position]
+        del self.order_keys[position]
+        self.positions = None
+        return item
+
+
+class LazyTreeModel(QAbstractItemModel):
+    """
+    分组 → 子条目的两层树模型，供书籍树与章节树共用
+    没有过滤时结构变化以逐行的插入、删除、移动信号通知视图（保留展开与选中状态）；
+    有过滤时重算可见行，以 layoutChanged 通知。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._groups = [] # 全部分组，按显示顺序
+        self._shown = self._groups # 可见的分组；没有过滤时就是 _groups
+        self._by_serial = {}
+        self._group_by_id = {}
+        self._group_of_child = {} # 子条目 id -> 所在分组
+        self._serials = itertools.count(1)
+        self._filter = ""
+        self._placeholder = None
+
+    # --- Qt 接口 ---
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if column != 0 or row < 0:
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, 0, 0) if row < self.rowCount() else QModelIndex()
+        group = self._group_at(parent)
+        if group is None or row >= group.loaded:
+            return QModelIndex()
+        return self.createIndex(row, 0, group.serial)
+
+    def parent(self, index=None):
+        if index is None:
+            return super().parent() # QObject.parent()
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        group = self._by_serial.get(index.internalId())
+        if group is None or not group.shown:
+            return QModelIndex()
+        return self.createIndex(group.row, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return 1 if self._placeholder is not None else len(self._shown)
+        group = self._group_at(parent)
+        return group.loaded if group is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return self.rowCount() > 0
+        group = self._group_at(parent)
+        return group is not None and group.visible_count() > 0
+
+    def canFetchMore(self, parent):
+        group = self._group_at(parent)
+        return group is not None and group.loaded < group.visible_count()
+
+    def fetchMore(self, parent):
+        group = self._group_at(parent)
+        if group is not None:
+            self._fetch(group, group.loaded + BATCH_SIZE)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if self._placeholder is not None:
+            return self._placeholder if role == Qt.DisplayRole else None
+        if index.internalId() == 0:
+            group = self._group_at(index)
+            if group is None:
+                return None
+            return group.title if role == Qt.DisplayRole else self._group_data(group, role)
+        group = self._by_serial.get(index.internalId())
+        if group is None or index.row() >= group.loaded:
+            return None
+        position = group.position(index.row())
+        return group.titles[position] if role == Qt.DisplayRole else self._child_data(group, position, role)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        if self._placeholder is not None:
+            return Qt.ItemNeverHasChildren # 加载中的占位项：不可选中
+        return _GROUP_FLAGS if index.internalId() == 0 else _CHILD_FLAGS
+
+    def supportedDropActions(self):
+        return Qt.MoveAction | Qt.CopyAction
+
+    # --- 供子类提供的附加数据 ---
+
+    def _group_data(self, group, role):
+        return None
+
+    def _child_data(self, group, position, role):
+        return None
+
+    # --- 查询 ---
+
+    def is_placeholder(self):
+        return self._placeholder is not None
+
+    def group_index(self, group_id):
+        group = self._group_by_id.get(group_id)
+        if group is None or not group.shown or self._placeholder is not None:
+            return QModelIndex()
+        return self.createIndex(group.row, 0, 0)
+
+    def child_index(self, child_id):
+        """子条目的索引；尚未交给视图的行先取到该行为止，被过滤掉时返回无效索引"""
+        group = self._group_of_child.get(child_id)
+        if group is None or not group.shown:
+            return QModelIndex()
+        row = group.row_of(group.position_of(child_id))
+        if row is None:
+            return QModelIndex()
+        if row >= group.loaded:
+            self._fetch(group, row + 1)
+        return self.createIndex(row, 0, group.serial)
+
+    def child_title(self, child_id):
+        group = self._group_of_child.get(child_id)
+        return group.titles[group.position_of(child_id)] if group is not None else None
+
+    def child_group_id(self, child_id):
+        group = self._group_of_child.get(child_id)
+        return group.id if group is not None else None
+
+    def child_count(self, group_id):
+        """分组的子条目总数（不受过滤与分批影响）"""
+        group = self._group_by_id.get(group_id)
+        return len(group.ids) if group is not None else 0
+
+    def child_ids(self, group_id):
+        group = self._group_by_id.get(group_id)
+        return list(group.ids) if group is not None else []
+
+    # --- 整体重建与过滤 ---
+
+    def set_placeholder(self, text):
+        self.beginResetModel()
+        self._set_groups([])
+        self._placeholder = text
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self._set_groups([])
+        self.endResetModel()
+
+    def set_filter(self, text):
+        """按搜索词过滤（不区分大小写），保留展开与选中状态"""
+        text = text.casefold()
+        if text != self._filter:
+            self._filter = text
+            self._relayout()
+
+    def _new_group(self, group_id, title, order_key=None):
+        return _Group(next(self._serials), group_id, title, order_key)
+
+    def _reset(self, groups):
+        self.beginResetModel()
+        self._set_groups(groups)
+        self.endResetModel()
+
+    def _set_groups(self, groups):
+        self._placeholder = None
+        self._groups = groups
+        self._by_serial = {group.serial: group for group in groups}
+        self._group_by_id = {group.id: group for group in groups}
+        self._group_of_child = {item_id: group for group in groups for item_id in group.ids}
+        self._update_visibility()
+
+    def _update_visibility(self):
+        text = self._filter
+        for group in self._groups:
+            if text:
+                group.rows = [position for position, title in enumerate(group.titles) if text in title.casefold()]
+                group.shown = bool(group.rows) or text in group.title.casefold()
+            else:
+                group.rows = None
+                group.shown = True
+            group.loaded = min(group.loaded, group.visible_count())
+        self._shown = [group for group in self._groups if group.shown] if text else self._groups
+        self._renumber()
+
+    def _renumber(self):
+        for row, group in enumerate(self._shown):
+            group.row = row
+
+    def _relayout(self):
+        """重算可见行后以 layoutChanged 通知视图，持久索引（选中、展开）按 id 对应到新的行"""
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        targets = [self._index_target(index) for index in old_indexes]
+        # 已展开过的分组至少保留一批，避免过滤条件放宽后只剩几行
+        loaded = {group.serial: group.loaded for group in self._groups}
+        self._update_visibility()
+        for group in self._groups:
+            if loaded.get(group.serial):
+                group.loaded = min(group.visible_count(), max(loaded[group.serial], BATCH_SIZE))
+            else:
+                group.loaded = 0
+        # 选中、当前的条目所在的行须已交给视图
+        for target in targets:
+            if target is not None and target[0] == 'child':
+                group = self._group_of_child.get(target[1])
+                row = group.row_of(group.position_of(target[1])) if group is not None else None
+                if row is not None and row >= group.loaded:
+                    group.loaded = row + 1
+        self.changePersistentIndexList(old_indexes, [self._target_index(target) for target in targets])
+        self.layoutChanged.emit()
+
+    def _index_target(self, index):
+        if not index.isValid() or self._placeholder is not None:
+            return None
+        if index.internalId() == 0:
+            group = self._group_at(index)
+            return ('group', group.serial) if group is not None else None
+        group = self._by_serial.get(index.internalId())
+        if group is None or index.row() >= group.loaded:
+            return None
+        return ('child', group.ids[group.position(index.row())])
+
+    def _target_index(self, target):
+        if target is None:
+            return QModelIndex()
+        kind, key = target
+        if kind == 'group':
+            group = self._by_serial.get(key)
+            return self.createIndex(group.row, 0, 0) if group is not None and group.shown else QModelIndex()
+        group = self._group_of_child.get(key)
+        if group is None or not group.shown:
+            return QModelIndex()
+        row = group.row_of(group.position_of(key))
+        if row is None or row >= group.loaded:
+            return QModelIndex()
+        return self.createIndex(row, 0, group.serial)
+
+    def _group_at(self, index):
+        # 顶层索引对应的分组（子条目索引、占位项返回 None）
+        if not index.isValid() or index.internalId() != 0 or self._placeholder is not None:
+            return None
+        return self._shown[index.row()] if index.row() < len(self._shown) else None
+
+    def _fetch(self, group, count):
+        count = min(count, group.visible_count())
+        if count > group.loaded and group.shown:
+            self.beginInsertRows(self.createIndex(group.row, 0, 0), group.loaded, count - 1)
+            group.loaded = count
+            self.endInsertRows()
+
+    # --- 逐行修改（子类在数据变更时调用） ---
+
+    def _insert_group(self, group, position):
+        self._by_serial[group.serial] = group
+        self._group_by_id[group.id] = group
+        for item_id in group.ids:
+            self._group_of_child[item_id] = group
+        if self._filter:
+            self._groups.insert(position, group)
+            self._relayout()
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._groups.insert(position, group)
+        self._renumber()
+        self.endInsertRows()
+
+    def _remove_group(self, group):
+        position = self._groups.index(group)
+        for item_id in group.ids:
+            self._group_of_child.pop(item_id, None)
+        del self._by_serial[group.serial]
+        del self._group_by_id[group.id]
+        if self._filter:
+            del self._groups[position]
+            group.shown = False
+            self._relayout()
+            return
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._groups[position]
+        group.shown = False
+        self._renumber()
+        self.endRemoveRows()
+
+    def _move_group(self, group, position):
+        # position 为移出该分组之后的列表中的位置
+        old_position = self._groups.index(group)
+        if self._filter:
+            del self._groups[old_position]
+            self._groups.insert(position, group)
+            self._relayout()
+            return
+        destination = position if position <= old_position else position + 1
+        if destination in (old_position, old_position + 1):
+            return
+        self.beginMoveRows(QModelIndex(), old_position, old_position, QModelIndex(), destination)
+        del self._groups[old_position]
+        self._groups.insert(position, group)
+        self._renumber()
+        self.endMoveRows()
+
+    def _set_group_title(self, group, title):
+        group.title = title
+        if self._filter:
+            self._relayout()
+        else:
+            index = self.createIndex(group.row, 0, 0)
+            self.dataChanged.emit(index, index)
+
+    def _insert_child(self, group, position, item_id, title, order_key=None):
+        self._group_of_child[item_id] = group
+        if self._filter:
+            group.insert(position, item_id, title, order_key)
+            self._relayout()
+            return
+        # 插入到已交给视图的行之间（或该分组已全部交出）时通知视图，否则留给之后的 fetchMore
+        exposed = position < group.loaded or group.loaded == len(group.ids)
+        if exposed:
+            self.beginInsertRows(self.createIndex(group.row, 0, 0), position, position)
+        group.insert(position, item_id, title, order_key)
+        if exposed:
+            group.loaded += 1
+            self.endInsertRows()
+
+    def _remove_child(self, group, position):
+        if self._filter:
+            self._group_of_child.pop(group.pop(position)[0], None)
+            self._relayout()
+            return
+        exposed = position < group.loaded
+        if exposed:
+            self.beginRemoveRows(self.createIndex(group.row, 0, 0), position, position)
+        self._group_of_child.pop(group.pop(position)[0], None)
+        if exposed:
+            group.loaded -= 1
+            self.endRemoveRows()
+
+    def _move_child(self, group, position, target, target_position, order_key=None):
+        """把子条目移到分组 target 的 target_position（移出之后的位置），同时更新排序键"""
+        if self._filter:
+            item_id, title, _old_key = group.pop(position)
+            target.insert(target_position, item_id, title, order_key)
+            self._group_of_child[item_id] = target
+            self._relayout()
+            return
+        if position < group.loaded and target_position >= target.loaded:
+            # 视图中的条目移到尚未交出的位置：先取到该位置，以便按移动通知视图（保留选中）
+            self._fetch(target, target_position + 1)
+        if target is group:
+            if position < group.loaded and target_position < group.loaded:
+                destination = target_position if target_position <= position else target_position + 1
+                moved = destination not in (position, position + 1)
+                parent = self.createIndex(group.row, 0, 0)
+                if moved:
+                    self.beginMoveRows(parent, position, position, parent, destination)
+                item_id, title, _old_key = group.pop(position)
+                group.insert(target_position, item_id, title, order_key)
+                if moved:
+                    self.endMoveRows()
+                return
+        elif position < group.loaded and (target_position < target.loaded or target.loaded == len(target.ids)):
+            self.beginMoveRows(self.createIndex(group.row, 0, 0), position, position,
+                               self.createIndex(target.row, 0, 0), target_position)
+            item_id, title, _old_key = group.pop(position)
+            target.insert(target_position, item_id, title, order_key)
+            self._group_of_child[item_id] = target
+            group.loaded -= 1
+            target.loaded += 1
+            self.endMoveRows()
+            return
+        # 移出或移入尚未交给视图的部分：按删除再插入处理
+        item_id, title = group.ids[position], group.titles[position]
+        self._remove_child(group, position)
+        self._insert_child(target, target_position, item_id, title, order_key)
+
+    def _set_child_title(self, group, position, title):
+        group.titles[position] = title
+        if self._filter:
+            self._relayout()
+        elif position < group.loaded:
+            index = self.createIndex(position, 0, group.serial)
+            self.dataChanged.emit(index, index)
+
+
+class ChapterTreeModel(LazyTreeModel):
+    """章节树：卷 → 章节，均按排序键（相同时按 id）排列"""
+
+    def _group_data(self, group, role):
+        if role == VOLUME_ID_ROLE:
+            return group.id
+        if role == ORDER_KEY_ROLE:
+            return group.order_key
+        return None
+
+    def _child_data(self, group, position, role):
+        if role == Qt.UserRole:
+            return group.ids[position]
+        if role == ORDER_KEY_ROLE:
+            return group.order_keys[position]
+        return None
+
+    def set_outline(self, volumes):
+        """按 DataManager.get_book_outline() 的结果重建"""
+        groups = []
+        for volume in volumes:
+            group = self._new_group(volume['id'], volume['name'], volume['order_key'])
+            chapters = volume['chapters']
+            group.ids = array('q', (chapter['id'] for chapter in chapters))
+            group.titles = [chapter['title'] for chapter in chapters]
+            group.order_keys = [chapter['order_key'] for chapter in chapters]
+            groups.append(group)
+        self._reset(groups)
+
+    def volume_index(self, volume_id):
+        return self.group_index(volume_id)
+
+    def chapter_index(self, chapter_id):
+        return self.child_index(chapter_id)
+
+    def has_volume(self, volume_id):
+        return volume_id in self._group_by_id
+
+    def has_chapter(self, chapter_id):
+        return chapter_id in self._group_of_child
+
+    def _volume_position(self, order_key, volume_id, groups):
+        return _bisect(len(groups), lambda i: (groups[i].order_key or "", groups[i].id), (order_key or "", volume_id))
+
+    def add_volume(self, volume_id, name, order_key):
+        if volume_id in self._group_by_id:
+            return
+        group = self._new_group(volume_id, name, order_key)
+        self._insert_group(group, self._volume_position(order_key, volume_id, self._groups))
+
+    def rename_volume(self, volume_id, name):
+        group = self._group_by_id.get(volume_id)
+        if group is not None and group.title != name:
+            self._set_group_title(group, name)
+
+    def move_volume(self, volume_id, order_key):
+        group = self._group_by_id.get(volume_id)
+        if group is None or group.order_key == order_key:
+            return
+        others = [other for other in self._groups if other is not group]
+        group.order_key = order_key
+        self._move_group(group, self._volume_position(order_key, volume_id, others))
+
+    def remove_volume(self, volume_id):
+        group = self._group_by_id.get(volume_id)
+        if group is not None:
+            self._remove_group(group)
+
+    def add_chapter(self, chapter_id, title, volume_id, order_key):
+        """在卷中按排序键插入章节；卷不存在时返回 False"""
+        group = self._group_by_id.get(volume_id)
+        if group is None:
+            return False
+        if chapter_id in self._group_of_child:
+            return self.move_chapter(chapter_id, volume_id, order_key)
+        position = _bisect(len(group.ids), lambda i: (group.order_keys[i] or "", group.ids[i]),
+                           (order_key or "", chapter_id))
+        self._insert_child(group, position, chapter_id, title, order_key)
+        return True
+
+    def move_chapter(self, chapter_id, volume_id, order_key):
+        """按新的卷与排序键移动章节；卷不存在时返回 False"""
+        target = self._group_by_id.get(volume_id)
+        group = self._group_of_child.get(chapter_id)
+        if target is None or group is None:
+            return False
+        position = group.position_of(chapter_id)
+        if target is group and group.order_keys[position] == order_key:
+            return True
+        # 目标位置按移出该章节之后的数组计算
+        skip = position if target is group else len(target.ids)
+        count = len(target.ids) - (1 if target is group else 0)
+        key_at = lambda i: (target.order_keys[i if i < skip else i + 1] or "", target.ids[i if i < skip else i + 1])
+        target_position = _bisect(count, key_at, (order_key or "", chapter_id))
+        self._move_child(group, position, target, target_position, order_key)
+        return True
+
+    def rename_chapter(self, chapter_id, title):
+        group = self._group_of_child.get(chapter_id)
+        if group is not None:
+            position = group.position_of(chapter_id)
+            if group.titles[position] != title:
+                self._set_child_title(group, position, title)
+
+    def remove_chapter(self, chapter_id):
+        group = self._group_of_child.get(chapter_id)
+        if group is not None:
+            self._remove_child(group, group.position_of(chapter_id))
+
+
+class BookTreeModel(LazyTreeModel):
+    """书籍树：分组 → 书籍；分组按名称、书籍按书名插入"""
+
+    def _group_data(self, group, role):
+        return "group" if role == Qt.UserRole else None
+
+    def _child_data(self, group, position, role):
+        return group.ids[position] if role == Qt.UserRole else None
+
+    def set_books(self, books_by_group):
+        """按 DataManager.get_books_and_groups() 的结果重建"""
+        groups = []
+        for group_name, books in books_by_group.items():
+            group = self._new_group(group_name, group_name)
+            group.ids = array('q', (book['id'] for book in books))
+            group.titles = [book['title'] for book in books]
+            group.order_keys = [None] * len(books)
+            groups.append(group)
+        self._reset(groups)
+
+    def book_index(self, book_id):
+        return self.child_index(book_id)
+
+    def book_title(self, book_id):
+        return self.child_title(book_id)
+
+    def book_group(self, book_id):
+        return self.child_group_id(book_id)
+
+    def neighbour_books(self, book_id, count=1):
+        """书籍树中排在该书之前、之后的各 count 本书（跨分组，按显示顺序），近的在前"""
+        if book_id not in self._group_of_child:
+            return []
+        book_ids = [child_id for each in self._shown for child_id in each.ids]
+        try:
+            position = book_ids.index(book_id)
+        except ValueError: # 所在分组被过滤隐藏
+            return []
+        neighbours = []
+        for distance in range(1, count + 1):
+            for other in (position + distance, position - distance):
+                if 0 <= other < len(book_ids):
+                    neighbours.append(book_ids[other])
+        return neighbours
+
+    def has_group(self, group_name):
+        return group_name in self._group_by_id
+
+    def _ensure_group(self, group_name):
+        group = self._group_by_id.get(group_name)
+        if group is None:
+            group = self._new_group(group_name, group_name)
+            self._insert_group(group, _bisect(len(self._groups), lambda i: self._groups[i].title, group_name))
+        return group
+
+    def _remove_if_empty(self, group):
+        if not group.ids:
+            self._remove_group(group)
+
+    def add_book(self, book_id, title, group_name):
+        if book_id in self._group_of_child:
+            self.move_book(book_id, group_name)
+            return
+        group = self._ensure_group(group_name)
+        self._insert_child(group, _bisect(len(group.ids), group.titles.__getitem__, title), book_id, title)
+
+    def rename_book(self, book_id, title):
+        group = self._group_of_child.get(book_id)
+        if group is not None:
+            position = group.position_of(book_id)
+            if group.titles[position] != title:
+                self._set_child_title(group, position, title)
+
+    def move_book(self, book_id, group_name):
+        """把书移到指定分组（分组不存在时创建，原分组空了则移除）"""
+        group = self._group_of_child.get(book_id)
+        if group is None or group.id == group_name:
+            return
+        target = self._ensure_group(group_name)
+        position = group.position_of(book_id)
+        title = group.titles[position]
+        self._move_child(group, position, target, _bisect(len(target.ids), target.titles.__getitem__, title))
+        self._remove_if_empty(group)
+
+    def remove_book(self, book_id):
+        group = self._group_of_child.get(book_id)
+        if group is not None:
+            self._remove_child(group, group.position_of(book_id))
+            self._remove_if_empty(group)
+
+
+class LazyFetcher(QObject):
+    """
+    QTreeView 只在展开分组或滚动到最底部时取下一批；已展开的分组若在视口中露出了已取部分的末尾，
+    在这里继续取，避免中间较长的分组只显示第一批。
+    """
+
+    def __init__(self, view):
+        super().__init__(view)
+        self._view = view
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._fetch_visible)
+        view.verticalScrollBar().valueChanged.connect(self.schedule)
+        view.expanded.connect(self.schedule)
+        model = view.model()
+        model.rowsInserted.connect(self.schedule)
+        model.layoutChanged.connect(self.schedule)
+        model.modelReset.connect(self.schedule)
+
+    def schedule(self, *args):
+        self._timer.start()
+
+    def _fetch_visible(self):
+        view, model = self._view, self._view.model()
+        height = view.viewport().height()
+        for row in range(model.rowCount()):
+            group_index = model.index(row, 0)
+            if not view.isExpanded(group_index) or not model.canFetchMore(group_index):
+                continue
+            count = model.rowCount(group_index)
+            rect = view.visualRect(model.index(count - 1, 0, group_index) if count else group_index)
+            if rect.isValid() and rect.bottom() >= 0 and rect.top() < height:
+                model.fetchMore(group_index) # 插入的行会再次触发检查
+                return